@@ -0,0 +1,6 @@
+"""基准测试 - 合成试卷PDF、模拟LLM服务商和端到端运行脚本（见 run_benchmark.py）"""
+
+from .synthetic_pdf import generate_exam_pdf
+from .simulated_provider import SimulatedProvider, SimulatedRateLimitError
+
+__all__ = ['generate_exam_pdf', 'SimulatedProvider', 'SimulatedRateLimitError']
@@ -0,0 +1,362 @@
+"""端到端基准测试 - 合成试卷PDF + 模拟LLM，输出可跨提交对比的JSON结果
+
+用法:
+    python benchmarks/run_benchmark.py                       # 默认场景
+    python benchmarks/run_benchmark.py --scenario smoke      # 快速冒烟
+    python benchmarks/run_benchmark.py --scenario throttled --compare benchmarks/results/<旧结果>.json
+
+每次运行在独立子进程和临时目录中执行完整流程（解析、渲染、识别、裁剪、入库），
+峰值内存和数据库互不影响；结果按提交哈希保存到 benchmarks/results/。
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import argparse
+import contextlib
+import hashlib
+import importlib.util
+import json
+import platform
+import resource
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_OUTPUT_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+# 预设场景：合成PDF的页面构成 + 流水线参数 + 模拟服务商参数
+SCENARIOS = {
+    "smoke": {
+        "pdf": {"text_pages": 2, "figure_pages": 1, "dense_pages": 1},
+        "pipeline": {"mode": "vision", "workers": 2},
+        "provider": {"latency": 0.05, "jitter": 0.2, "tokens_per_second": 0},
+    },
+    "default": {
+        "pdf": {"text_pages": 8, "figure_pages": 4, "dense_pages": 4},
+        "pipeline": {"mode": "vision", "workers": 4},
+        "provider": {"latency": 0.5, "jitter": 0.3, "tokens_per_second": 400},
+    },
+    "hybrid": {
+        "pdf": {"text_pages": 8, "figure_pages": 4, "dense_pages": 4},
+        "pipeline": {"mode": "hybrid", "workers": 4},
+        "provider": {"latency": 0.5, "jitter": 0.3, "tokens_per_second": 400},
+    },
+    "throttled": {
+        "pdf": {"text_pages": 8, "figure_pages": 4, "dense_pages": 4},
+        "pipeline": {"mode": "vision", "workers": 8, "adaptive_concurrency": True},
+        "provider": {"latency": 0.5, "jitter": 0.3, "tokens_per_second": 400,
+                     "max_concurrency": 3, "error_rate": 0.05},
+    },
+    "large": {
+        "pdf": {"text_pages": 40, "figure_pages": 20, "dense_pages": 20},
+        "pipeline": {"mode": "vision", "workers": 8},
+        "provider": {"latency": 0.5, "jitter": 0.3, "tokens_per_second": 400},
+    },
+}
+
+# 汇总指标：名称 -> 是否越大越好（对比时标注改进/退化）
+SUMMARY_METRICS = {
+    "pages_per_sec": True,
+    "page_p50_seconds": False,
+    "page_p95_seconds": False,
+    "wall_seconds": False,
+    "peak_rss_mb": False,
+    "db_rows_per_sec": True,
+}
+
+
+def run_worker(config_path: str):
+    """
+    子进程：执行一次完整流程并写出结果
+
+    Args:
+        config_path: 运行配置JSON路径（由 run_once 写出）
+    """
+    with open(config_path, encoding="utf-8") as f:
+        config = json.load(f)
+    run_dir = config["run_dir"]
+
+    # 配置在导入 src.config 之前通过环境变量设置（数据库、输出目录都在临时目录中）
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(run_dir, 'bench.db')}"
+    os.chdir(run_dir)
+
+    from src.utils import configure_metrics
+    from benchmarks.simulated_provider import SimulatedProvider
+
+    spec = importlib.util.spec_from_file_location("process_pdf", os.path.join(REPO_ROOT, "scripts", "process_pdf.py"))
+    process_pdf_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(process_pdf_module)
+
+    metrics_path = os.path.join(run_dir, "metrics.jsonl")
+    metrics = configure_metrics(metrics_path)
+    provider = SimulatedProvider(seed=config["seed"], **config["provider"])
+
+    start = time.perf_counter()
+    with open(os.path.join(run_dir, "pipeline.log"), "w", encoding="utf-8") as log, \
+            contextlib.redirect_stdout(log):
+        options = process_pdf_module.ProcessOptions(force=True, **config["pipeline"])
+        process_pdf_module.process_pdf(config["pdf_path"], options, llm=provider)
+    wall_seconds = time.perf_counter() - start
+    metrics.close()
+
+    result = summarize_run(metrics_path, os.path.join(run_dir, "bench.db"), wall_seconds)
+    result["provider"] = provider.stats()
+    with open(os.path.join(run_dir, "result.json"), "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+def summarize_run(metrics_path: str, db_path: str, wall_seconds: float) -> dict:
+    """
+    从指标明细和数据库统计一次运行的结果
+
+    Args:
+        metrics_path: 指标JSONL路径
+        db_path: SQLite数据库路径
+        wall_seconds: 流程总耗时
+
+    Returns:
+        dict: 吞吐、页面延迟分位数、峰值内存、入库速度和各阶段耗时
+    """
+    page_latencies = []
+    stages = {}
+    db_seconds = 0.0
+    with open(metrics_path, encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry["type"] != "span":
+                continue
+            stages[entry["name"]] = stages.get(entry["name"], 0.0) + entry["seconds"]
+            if entry["name"] == "page":
+                page_latencies.append(entry["seconds"])
+            elif entry["name"] == "db_save":
+                db_seconds += entry["seconds"]
+
+    db_rows = 0
+    if os.path.exists(db_path):
+        with contextlib.closing(sqlite3.connect(db_path)) as conn:
+            tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+            db_rows = sum(conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables)
+
+    return {
+        "ok": bool(page_latencies) and db_rows > 0,
+        "pages": len(page_latencies),
+        "wall_seconds": round(wall_seconds, 3),
+        "pages_per_sec": round(len(page_latencies) / wall_seconds, 3) if wall_seconds else 0.0,
+        "page_p50_seconds": round(_percentile(page_latencies, 50), 3),
+        "page_p95_seconds": round(_percentile(page_latencies, 95), 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "db_rows": db_rows,
+        "db_rows_per_sec": round(db_rows / db_seconds, 1) if db_seconds else 0.0,
+        "stage_seconds": {name: round(seconds, 3) for name, seconds in sorted(stages.items())},
+    }
+
+
+def _percentile(values: list, percent: float) -> float:
+    """线性插值分位数（空列表返回0）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _peak_rss_mb() -> float:
+    """当前进程的峰值常驻内存（MB；Linux单位为KB，macOS为字节）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_once(config: dict, work_dir: str, index: int) -> dict:
+    """
+    在子进程中执行一次运行
+
+    Args:
+        config: 场景配置（含 pdf_path）
+        work_dir: 本次基准测试的临时目录
+        index: 第几次运行
+
+    Returns:
+        dict: 运行结果（失败时 ok 为False并附带日志末尾）
+    """
+    run_dir = os.path.join(work_dir, f"run{index}")
+    os.makedirs(run_dir)
+    config_path = os.path.join(run_dir, "config.json")
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(dict(config, run_dir=run_dir), f, ensure_ascii=False)
+
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", config_path],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    result_path = os.path.join(run_dir, "result.json")
+    if process.returncode != 0 or not os.path.exists(result_path):
+        return {"ok": False, "error": (process.stderr or process.stdout)[-2000:]}
+    with open(result_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_benchmark(scenario: str, repeat: int = 3, seed: int = 0, overrides: dict = None, keep: bool = False) -> dict:
+    """
+    执行基准测试（先生成合成PDF，再重复运行完整流程）
+
+    Args:
+        scenario: 预设场景名称
+        repeat: 重复次数（汇总取中位数）
+        seed: 随机种子（PDF内容和模拟服务商）
+        overrides: 覆盖场景配置，如 {"pipeline": {"workers": 8}}
+        keep: 保留临时目录（查看日志和数据库）
+
+    Returns:
+        dict: 完整结果（环境信息、配置、每次运行结果和汇总）
+    """
+    from benchmarks.synthetic_pdf import generate_exam_pdf
+
+    config = {section: dict(values) for section, values in SCENARIOS[scenario].items()}
+    for section, values in (overrides or {}).items():
+        config[section].update(values)
+
+    work_dir = tempfile.mkdtemp(prefix="exam-bench-")
+    try:
+        pdf_path = os.path.join(work_dir, "synthetic.pdf")
+        pdf_info = generate_exam_pdf(pdf_path, seed=seed, **config["pdf"])
+        with open(pdf_path, "rb") as f:
+            pdf_info["sha256"] = hashlib.sha256(f.read()).hexdigest()
+        print(f"合成PDF: {pdf_info['pages']} 页，{pdf_info['questions']} 题（{pdf_path}）")
+
+        runs = []
+        for index in range(1, repeat + 1):
+            result = run_once(dict(config, pdf_path=pdf_path, seed=seed), work_dir, index)
+            runs.append(result)
+            if result["ok"]:
+                print(f"  第{index}次: {result['pages_per_sec']:.2f} 页/秒，"
+                      f"p50 {result['page_p50_seconds']:.2f}s，p95 {result['page_p95_seconds']:.2f}s，"
+                      f"峰值内存 {result['peak_rss_mb']:.0f}MB，入库 {result['db_rows_per_sec']:.0f} 行/秒")
+            else:
+                print(f"  第{index}次: 失败\n{result.get('error', '')}")
+    finally:
+        if keep:
+            print(f"  临时目录: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    ok_runs = [run for run in runs if run["ok"]]
+    summary = {
+        name: round(statistics.median(run[name] for run in ok_runs), 3) if ok_runs else None
+        for name in SUMMARY_METRICS
+    }
+    return {
+        "scenario": scenario,
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": config,
+        "seed": seed,
+        "pdf": pdf_info,
+        "runs": runs,
+        "summary": summary,
+    }
+
+
+def _git_commit() -> dict:
+    """当前提交哈希和工作区是否有未提交的修改"""
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+
+    return {
+        "hash": git("rev-parse", "HEAD") or "unknown",
+        "subject": git("log", "-1", "--format=%s"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+def save_result(result: dict, output_dir: str) -> str:
+    """按提交哈希保存结果，返回文件路径"""
+    os.makedirs(output_dir, exist_ok=True)
+    commit = result["commit"]
+    name = f"{commit['hash'][:10]}{'-dirty' if commit['dirty'] else ''}-{result['scenario']}.json"
+    path = os.path.join(output_dir, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def print_comparison(result: dict, baseline_path: str):
+    """与之前的结果对比汇总指标"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("config") != result["config"] or baseline.get("pdf", {}).get("sha256") != result["pdf"]["sha256"]:
+        print("  ⚠ 场景配置或合成PDF不同，对比结果仅供参考")
+
+    print(f"\n对比 {baseline['commit']['hash'][:10]}（{baseline['commit'].get('subject', '')}）:")
+    for name, higher_is_better in SUMMARY_METRICS.items():
+        old, new = baseline["summary"].get(name), result["summary"].get(name)
+        if not old or new is None:
+            continue
+        change = (new - old) / old * 100
+        better = change > 0 if higher_is_better else change < 0
+        mark = "" if abs(change) < 1 else ("（改进）" if better else "（退化）")
+        print(f"  - {name}: {old} → {new}（{change:+.1f}%）{mark}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='端到端基准测试（合成PDF + 模拟LLM）')
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--scenario', choices=list(SCENARIOS), default='default',
+                        help='预设场景（默认 default）')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，汇总取中位数（默认3）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子（默认0）')
+    parser.add_argument('--workers', type=int, default=None, help='覆盖场景的并发页数')
+    parser.add_argument('--latency', type=float, default=None, help='覆盖模拟服务商的基础延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=None, help='覆盖模拟服务商的随机429概率')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help='结果目录（默认 benchmarks/results）')
+    parser.add_argument('--compare', default=None, help='与之前的结果文件对比')
+    parser.add_argument('--keep', action='store_true', help='保留临时目录（日志、指标、数据库）')
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker)
+        return
+
+    overrides = {"pipeline": {}, "provider": {}}
+    if args.workers is not None:
+        overrides["pipeline"]["workers"] = args.workers
+    if args.latency is not None:
+        overrides["provider"]["latency"] = args.latency
+    if args.error_rate is not None:
+        overrides["provider"]["error_rate"] = args.error_rate
+
+    print("=" * 60)
+    print(f"基准测试场景: {args.scenario}（重复 {args.repeat} 次）")
+    print("=" * 60)
+    result = run_benchmark(args.scenario, repeat=args.repeat, seed=args.seed, overrides=overrides, keep=args.keep)
+
+    print("\n汇总（中位数）:")
+    for name, value in result["summary"].items():
+        print(f"  - {name}: {value}")
+    path = save_result(result, args.output_dir)
+    print(f"\n✓ 结果已写入: {path}")
+
+    if args.compare:
+        print_comparison(result, args.compare)
+
+    if not any(run["ok"] for run in result["runs"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""模拟LLM服务商 - 基准测试用，不访问网络，按配置模拟延迟、吞吐限制和错误"""
+
+import base64
+import json
+import random
+import struct
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from src.llm import BaseLLMProvider, LLMResponse, Message
+from src.llm.singleflight import request_fingerprint
+
+
+class SimulatedRateLimitError(Exception):
+    """模拟的限流错误（429，带 retry-after-ms 响应头，与SDK异常的判断方式一致）"""
+
+    status_code = 429
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        headers = {"retry-after-ms": str(int(retry_after * 1000))} if retry_after else {}
+        self.response = type("SimulatedResponse", (), {"status_code": 429, "headers": headers})()
+
+
+class SimulatedProvider(BaseLLMProvider):
+    """模拟的视觉模型服务商
+
+    延迟 = 基础延迟 × 对数正态抖动 + 输出token数 / 输出速度；超过请求的超时时间时
+    抛出 TimeoutError。服务端吞吐限制按同时处理的请求数和每分钟请求数模拟，超出时
+    与真实服务一样返回429，由自适应并发/密钥池的限流处理逻辑重试。
+
+    每次请求的随机数由随机种子、请求指纹和该请求的第几次尝试决定，多线程下
+    各请求的延迟、错误和返回内容也可复现，便于跨提交对比。
+    """
+
+    PRICING = {"input": 0.15, "output": 0.60}  # 每百万token（美元），与 gpt-4o-mini 同级
+
+    def __init__(
+        self,
+        api_key: str = "simulated",
+        latency: float = 1.0,
+        jitter: float = 0.3,
+        tokens_per_second: float = 200.0,
+        max_concurrency: int = 0,
+        requests_per_minute: int = 0,
+        error_rate: float = 0.0,
+        questions_per_call: int = 5,
+        figure_ratio: float = 0.3,
+        seed: int = 0,
+        **kwargs
+    ):
+        """
+        初始化模拟服务商
+
+        Args:
+            api_key: 占位密钥
+            latency: 基础延迟（秒，首token前的排队和预填充时间）
+            jitter: 延迟抖动（对数正态分布的sigma，0表示固定延迟）
+            tokens_per_second: 输出速度（token/秒，<=0表示不计输出时间）
+            max_concurrency: 服务端同时处理的请求数上限（0表示不限）
+            requests_per_minute: 每分钟请求数上限（0表示不限）
+            error_rate: 随机返回429的概率（模拟服务过载）
+            questions_per_call: 每次请求返回的题目数
+            figure_ratio: 带图形的题目比例（返回落在图片范围内的figure_bbox）
+            seed: 随机种子
+            **kwargs: 额外配置（default_model）
+        """
+        super().__init__(api_key, **kwargs)
+        self.default_model = kwargs.get("default_model", "simulated-vision")
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.error_rate = error_rate
+        self.questions_per_call = questions_per_call
+        self.figure_ratio = figure_ratio
+        self.seed = seed
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._recent = deque()                  # 最近一分钟内的请求时间
+        self._attempts: Dict[str, int] = {}     # 请求指纹 -> 已尝试次数
+        self.calls = 0
+        self.throttled = 0
+        self.timeouts = 0
+
+    def chat(
+        self,
+        messages: List[Message],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        """模拟一次请求"""
+        model = model or self.default_model
+        deadline = kwargs.get("deadline")
+        kwargs = self._apply_deadline(kwargs)
+        fingerprint = request_fingerprint(messages, model, temperature, max_tokens)
+
+        # 与真实服务商一样把图片编码为base64（计入客户端CPU开销）
+        start = time.perf_counter()
+        images = [self._read_image_bytes(image) for msg in messages for image in (msg.images or [])]
+        encoded_bytes = sum(len(base64.b64encode(data)) for data in images)
+        encode_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with self._lock:
+            attempt = self._attempts.get(fingerprint, 0)
+            self._attempts[fingerprint] = attempt + 1
+            self.calls += 1
+            self._admit()
+        rng = random.Random(f"{self.seed}:{fingerprint}:{attempt}")
+        try:
+            if self.error_rate and rng.random() < self.error_rate:
+                with self._lock:
+                    self.throttled += 1
+                raise SimulatedRateLimitError("simulated overload: too many requests", retry_after=rng.uniform(0.2, 1.0))
+
+            size = self._image_size(images[0]) if images else None
+            content, completion_tokens, finish_reason = self._build_content(rng, size, max_tokens)
+            delay = self.latency * (rng.lognormvariate(0, self.jitter) if self.jitter else 1.0)
+            if self.tokens_per_second > 0:
+                delay += completion_tokens / self.tokens_per_second
+
+            timeout = kwargs.get("timeout")
+            if timeout is not None and delay > timeout:
+                self._sleep(timeout, deadline)
+                with self._lock:
+                    self.timeouts += 1
+                raise TimeoutError(f"simulated request timed out after {timeout:.1f}s")
+            self._sleep(delay, deadline)
+        finally:
+            with self._lock:
+                self._active -= 1
+        network_seconds = time.perf_counter() - start
+
+        prompt_text = sum(len(msg.content) for msg in messages)
+        usage = {
+            "prompt_tokens": prompt_text // 2 + encoded_bytes // 1000,
+            "completion_tokens": completion_tokens,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        return LLMResponse(
+            content=content,
+            model=model,
+            usage=usage,
+            finish_reason=finish_reason,
+            timings={"encode": encode_seconds, "network": network_seconds}
+        )
+
+    def _admit(self):
+        """按服务端并发和每分钟请求数上限决定是否受理（调用方持有锁）"""
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] >= 60:
+            self._recent.popleft()
+
+        if self.max_concurrency and self._active >= self.max_concurrency:
+            self.throttled += 1
+            raise SimulatedRateLimitError("simulated rate limit: too many concurrent requests", retry_after=0.5)
+        if self.requests_per_minute and len(self._recent) >= self.requests_per_minute:
+            self.throttled += 1
+            raise SimulatedRateLimitError(
+                "simulated rate limit: requests per minute exceeded",
+                retry_after=60 - (now - self._recent[0])
+            )
+        self._active += 1
+        self._recent.append(now)
+
+    @staticmethod
+    def _sleep(seconds: float, deadline=None):
+        """等待（有截止时间时可被取消）"""
+        if deadline is not None:
+            deadline.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+    @staticmethod
+    def _image_size(data: bytes) -> Optional[tuple]:
+        """从PNG文件头读取图片尺寸（非PNG返回None）"""
+        if data[:8] == b"\x89PNG\r\n\x1a\n" and data[12:16] == b"IHDR":
+            return struct.unpack(">II", data[16:24])
+        return None
+
+    def _build_content(self, rng: random.Random, size: Optional[tuple], max_tokens: int):
+        """生成题目JSON，返回 (内容, 输出token数, 结束原因)
+
+        与真实服务商一样，超出 max_tokens 时截断内容并返回 finish_reason="length"
+        （按每token约2个字符折算）
+        """
+        questions = []
+        for index in range(self.questions_per_call):
+            has_figure = size is not None and rng.random() < self.figure_ratio
+            figure_bbox = None
+            if has_figure:
+                width, height = size
+                x1, y1 = rng.randint(0, width // 2), rng.randint(0, height * 3 // 4)
+                figure_bbox = [x1, y1, x1 + rng.randint(width // 8, width // 3), y1 + rng.randint(height // 16, height // 5)]
+            questions.append({
+                "question_text": f"模拟题目{index + 1}：下列说法中正确的是（ ）" + "材料" * rng.randint(5, 40),
+                "question_type": rng.choice(("single_choice", "multiple_choice")),
+                "has_figure": has_figure,
+                "figure_description": "模拟图形" if has_figure else None,
+                "figure_bbox": figure_bbox,
+                "options": [
+                    {"key": key, "text": f"选项{key}" + "内容" * rng.randint(1, 6), "has_figure": False, "figure_bbox": None}
+                    for key in "ABCD"
+                ],
+                "correct_answer": None,
+                "explanation": None,
+                "tags": {"company": [], "question_type": ["模拟"], "subject": [], "skill": []},
+                "difficulty": rng.choice(("easy", "medium", "hard")),
+            })
+        content = json.dumps({"questions": questions}, ensure_ascii=False)
+        if len(content) // 2 > max_tokens:
+            return content[:max_tokens * 2], max_tokens, "length"
+        return content, len(content) // 2, "stop"
+
+    def supports_vision(self) -> bool:
+        return True
+
+    def get_default_model(self) -> str:
+        return self.default_model
+
+    def estimate_cost(self, usage: Dict[str, int], model: Optional[str] = None) -> float:
+        input_cost = (usage["prompt_tokens"] / 1_000_000) * self.PRICING["input"]
+        output_cost = (usage["completion_tokens"] / 1_000_000) * self.PRICING["output"]
+        return input_cost + output_cost
+
+    def stats(self) -> Dict:
+        """请求、限流和超时次数"""
+        with self._lock:
+            return {"calls": self.calls, "throttled": self.throttled, "timeouts": self.timeouts}
@@ -0,0 +1,164 @@
+"""合成试卷PDF - 基准测试用，按随机种子生成可复现的页面"""
+
+import io
+import random
+from typing import Dict, List
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+
+
+# 页面类型 -> 每页题目数
+PAGE_KINDS = {
+    "text": 6,      # 纯文字选择题
+    "figure": 3,    # 每题带矢量图形和位图
+    "dense": 16,    # 小字号双栏，题目密集
+}
+
+CJK_FONT = "china-s"  # PyMuPDF 内置的简体中文字体
+
+STEMS = (
+    "下列关于{0}的说法中，正确的是（ ）",
+    "根据以下材料，关于{0}的推断最合理的是（ ）",
+    "下列选项中，与{0}的逻辑关系最相似的是（ ）",
+    "某单位统计了{0}的数据，由此可以推出（ ）",
+    "从所给的四个选项中，选择最合适的一个填入问号处，使{0}呈现一定的规律性（ ）",
+)
+TOPICS = ("市场经济", "生态保护", "数字政府", "城市规划", "图形推理", "数量关系", "资料分析", "法律常识")
+OPTION_WORDS = ("增长", "下降", "持平", "无法确定", "均衡", "分散", "集中", "交替", "对称", "旋转")
+
+
+def generate_exam_pdf(
+    path: str,
+    text_pages: int = 4,
+    figure_pages: int = 2,
+    dense_pages: int = 2,
+    seed: int = 0
+) -> Dict:
+    """
+    生成合成试卷PDF
+
+    每页都带题号和 A-D 选项，能通过页面预筛选；三类页面交替排列，
+    相同参数和随机种子生成的文件内容相同（便于跨提交对比）。
+
+    Args:
+        path: 输出路径
+        text_pages: 纯文字页数
+        figure_pages: 带图形页数（矢量图形 + 嵌入位图）
+        dense_pages: 密集页数（双栏小字号）
+        seed: 随机种子
+
+    Returns:
+        Dict: {"pages": 总页数, "questions": 总题目数, "kinds": 每页类型列表}
+    """
+    rng = random.Random(seed)
+    kinds = _interleave({"text": text_pages, "figure": figure_pages, "dense": dense_pages})
+
+    doc = fitz.open()
+    number = 1
+    for page_index, kind in enumerate(kinds, 1):
+        page = doc.new_page(width=595, height=842)  # A4
+        page.insert_text((260, 40), f"第 {page_index} 页", fontname=CJK_FONT, fontsize=9)
+        if kind == "dense":
+            number = _fill_dense_page(page, rng, number)
+        else:
+            number = _fill_page(page, rng, number, figures=kind == "figure")
+
+    # 固定元数据中的时间戳，保证输出字节稳定
+    doc.set_metadata({"title": f"synthetic-exam-{seed}", "creationDate": "", "modDate": ""})
+    doc.save(path, garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+    return {"pages": len(kinds), "questions": number - 1, "kinds": kinds}
+
+
+def _interleave(counts: Dict[str, int]) -> List[str]:
+    """按比例交替排列页面类型"""
+    total = sum(counts.values())
+    kinds = []
+    placed = {kind: 0 for kind in counts}
+    for _ in range(total):
+        kind = max(counts, key=lambda k: (counts[k] - placed[k]) / counts[k] if counts[k] else -1)
+        placed[kind] += 1
+        kinds.append(kind)
+    return kinds
+
+
+def _question_lines(rng: random.Random, number: int) -> List[str]:
+    """一道选择题的题干和选项行"""
+    stem = rng.choice(STEMS).format(rng.choice(TOPICS))
+    options = [f"{key}. {rng.choice(TOPICS)}{rng.choice(OPTION_WORDS)}" for key in "ABCD"]
+    return [f"{number}. {stem}"] + options
+
+
+def _fill_page(page: "fitz.Page", rng: random.Random, number: int, figures: bool) -> int:
+    """单栏页面（figures 为True时每题附带一个图形）"""
+    count = PAGE_KINDS["figure" if figures else "text"]
+    y = 70
+    for _ in range(count):
+        lines = _question_lines(rng, number)
+        page.insert_text((50, y), lines[0], fontname=CJK_FONT, fontsize=11)
+        y += 18
+        if figures:
+            _draw_figure(page, rng, fitz.Rect(70, y, 230, y + 100))
+            _insert_bitmap(page, rng, fitz.Rect(260, y, 400, y + 100))
+            y += 110
+        for option in lines[1:]:
+            page.insert_text((70, y), option, fontname=CJK_FONT, fontsize=11)
+            y += 16
+        y += 14
+        number += 1
+    return number
+
+
+def _fill_dense_page(page: "fitz.Page", rng: random.Random, number: int) -> int:
+    """双栏小字号页面"""
+    per_column = PAGE_KINDS["dense"] // 2
+    for column in range(2):
+        x = 40 + column * 280
+        y = 65
+        for _ in range(per_column):
+            lines = _question_lines(rng, number)
+            page.insert_text((x, y), lines[0][:22], fontname=CJK_FONT, fontsize=8)
+            y += 11
+            page.insert_text((x + 10, y), "   ".join(lines[1:3]), fontname=CJK_FONT, fontsize=8)
+            y += 11
+            page.insert_text((x + 10, y), "   ".join(lines[3:5]), fontname=CJK_FONT, fontsize=8)
+            y += 22
+            number += 1
+    return number
+
+
+def _draw_figure(page: "fitz.Page", rng: random.Random, rect: "fitz.Rect"):
+    """矢量图形（网格中的随机几何形状，类似图形推理题）"""
+    shape = page.new_shape()
+    cell = rect.width / 4
+    for col in range(4):
+        cell_rect = fitz.Rect(rect.x0 + col * cell, rect.y0, rect.x0 + (col + 1) * cell, rect.y0 + cell)
+        shape.draw_rect(cell_rect)
+        center = (cell_rect.tl + cell_rect.br) / 2
+        radius = cell * rng.uniform(0.15, 0.35)
+        if rng.random() < 0.5:
+            shape.draw_circle(center, radius)
+        else:
+            shape.draw_polyline([
+                center + (0, -radius), center + (radius, radius), center + (-radius, radius), center + (0, -radius)
+            ])
+    shape.draw_line(rect.bl + (0, -rect.height / 3), rect.br + (0, -rect.height / 3))
+    shape.finish(color=(0, 0, 0), width=0.8)
+    shape.commit()
+
+
+def _insert_bitmap(page: "fitz.Page", rng: random.Random, rect: "fitz.Rect"):
+    """嵌入位图（带噪点的灰度柱状图，PNG编码）"""
+    width, height = 280, 200
+    pixels = np.full((height, width), 255, dtype=np.uint8)
+    bars = 6
+    for index in range(bars):
+        bar_height = rng.randint(30, height - 20)
+        left = 20 + index * (width - 40) // bars
+        pixels[height - bar_height:height - 10, left:left + 24] = rng.randint(40, 160)
+    noise = np.random.default_rng(rng.randint(0, 2 ** 32 - 1)).integers(0, 12, size=pixels.shape, dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels - np.minimum(pixels, noise)).save(buffer, format="PNG")
+    page.insert_image(rect, stream=buffer.getvalue())
@@ -0,0 +1,98 @@
+"""对比 json / compact 两种输出格式的输出token和耗时（按页）"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.parsers import PDFParser
+from src.extractors import QuestionExtractor
+from src.extractors.question_extractor import RESPONSE_FORMATS
+
+
+def compare_page(extractors: dict, page_info: dict) -> dict:
+    """
+    用每种输出格式识别同一页，记录输出token、耗时和题目数
+
+    Args:
+        extractors: {格式: QuestionExtractor}
+        page_info: PDFParser.render_all_pages 返回的页面信息
+
+    Returns:
+        dict: {格式: {"completion_tokens", "seconds", "questions"}}
+    """
+    result = {}
+    for name, extractor in extractors.items():
+        start = time.perf_counter()
+        questions = extractor.extract_from_page_image(
+            page_info['image_bytes'],
+            page_info['page'],
+            figure_regions=page_info.get('figure_regions'),
+            offset=page_info['offset'],
+            text_blocks=page_info.get('text_blocks'),
+            question_count=page_info.get('question_count')
+        )
+        result[name] = {
+            "completion_tokens": (extractor.last_usage or {}).get("completion_tokens", 0),
+            "seconds": time.perf_counter() - start,
+            "questions": len(questions),
+        }
+    return result
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='对比 json / compact 输出格式的输出token')
+    parser.add_argument('pdf_path', help='PDF文件路径')
+    parser.add_argument('--pages', type=int, nargs='+', default=None, help='要对比的页码（默认全部）')
+    parser.add_argument('--local-figures', action='store_true', help='使用本地图形区域（figure_id）')
+    parser.add_argument('--text-assist', action='store_true', help='使用文本层辅助识别')
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    pdf_parser = PDFParser()
+    page_images = pdf_parser.render_all_pages(
+        args.pdf_path,
+        in_memory=True,
+        locate_figures=args.local_figures,
+        pages=args.pages,
+        text_blocks=args.text_assist
+    )
+
+    extractors = {name: QuestionExtractor(response_format=name) for name in RESPONSE_FORMATS}
+    totals = {name: {"completion_tokens": 0, "seconds": 0.0, "questions": 0} for name in RESPONSE_FORMATS}
+
+    print(f"{'页码':>4} | " + " | ".join(f"{name:>22}" for name in RESPONSE_FORMATS) + " | 节省")
+    for page_info in page_images:
+        result = compare_page(extractors, page_info)
+        for name, stats in result.items():
+            for field, value in stats.items():
+                totals[name][field] += value
+        cells = [
+            f"{stats['completion_tokens']:>6} tok {stats['seconds']:>5.1f}s {stats['questions']:>2}题"
+            for stats in result.values()
+        ]
+        print(f"{page_info['page']:>4} | " + " | ".join(f"{c:>22}" for c in cells)
+              + f" | {_saving(result):>5.1%}")
+
+    print("-" * 60)
+    for name, stats in totals.items():
+        print(f"{name:>8}: 输出 {stats['completion_tokens']} tokens，耗时 {stats['seconds']:.1f}s，"
+              f"题目 {stats['questions']} 道，成本 ${extractors[name].get_total_cost():.4f}")
+    print(f"输出token节省: {_saving(totals):.1%}")
+
+
+def _saving(result: dict) -> float:
+    """compact 相对 json 的输出token节省比例"""
+    baseline = result["json"]["completion_tokens"]
+    if not baseline:
+        return 0.0
+    return 1 - result["compact"]["completion_tokens"] / baseline
+
+
+if __name__ == "__main__":
+    main()
@@ -4,84 +4,431 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from dataclasses import dataclass
+from typing import Optional
+
+import fitz  # PyMuPDF
+
 from src.parsers import PDFParser
-from src.extractors import QuestionExtractor
+from src.extractors import QuestionExtractor, ModelRouter
 from src.storage import QuestionSaver
 from src.models import init_database, get_session
 from src.config import settings
-from src.utils import ImageCropper
+from src.llm import KeyPoolProvider, AIMDLimiter, Deadline, DeadlineExceeded, Cancelled
+from src.llm.providers.replay import ReplayProvider
+from src.utils import ImageCropper, DEFAULT_METRICS, span, configure_metrics, configure_profiling, PROFILE_MODES
+
+
+# 提取模式
+MODE_LABELS = {
+    "text": "文本提取",
+    "vision": "Vision（整页截图识别）",
+    "hybrid": "混合（纯文本页走文本提取，含图形/无文本层的页面走Vision）",
+}
+
+
+def extract_vision_page(
+    extractor: QuestionExtractor,
+    cropper: ImageCropper,
+    page_info: dict,
+    pdf_doc=None,
+    crop_dpi: int = 300,
+    parser: PDFParser = None,
+    tile_min_questions: int = 0
+) -> list:
+    """
+    识别单个页面图片并裁剪题目图片
+
+    Args:
+        extractor: 题目提取器
+        cropper: 图片裁剪工具
+        page_info: PDFParser.render_all_pages 返回的页面信息
+        pdf_doc: 已打开的PDF文档（提供时从PDF渲染裁剪区域）
+        crop_dpi: PDF裁剪分辨率
+        parser: PDF解析器（分块识别时用于切分页面）
+        tile_min_questions: 估计题目数达到该值时分块并发识别（0表示不分块）
+
+    Returns:
+        list: 题目列表
+    """
+    page_num = page_info['page']
+    page_image = page_info.get('image_bytes') or page_info['image_path']
+    question_count = page_info.get('question_count') or 0
+
+    tiles = []
+    if parser and tile_min_questions and question_count >= tile_min_questions:
+        tiles = parser.split_page_tiles(page_image, question_count)
+
+    if len(tiles) > 1:
+        # 分块结果的bbox已在 map_tile_bboxes 中修正并换算到整张上传图片
+        page_questions = extract_page_tiles(extractor, cropper, page_info, tiles)
+        refine = False
+    else:
+        page_questions = extractor.extract_from_page_image(
+            page_image,
+            page_num,
+            figure_regions=page_info.get('figure_regions'),
+            offset=page_info['offset'],
+            text_blocks=page_info.get('text_blocks'),
+            question_count=page_info.get('question_count'),
+            features=page_info.get('features')
+        )
+        refine = True
+
+    # 处理图片裁剪（整页一次解码；记录像素/PDF坐标比例，bbox为该页渲染图的像素坐标）
+    for q in page_questions:
+        q['page_scale'] = page_info['scale']
+    with span("crop"):
+        cropper.crop_page_figures(
+            page_image,
+            page_questions,
+            pdf_page=pdf_doc[page_num - 1] if pdf_doc else None,
+            page_scale=page_info['scale'],
+            clip_dpi=crop_dpi,
+            refine=refine,
+            offset=page_info['offset']
+        )
+    return page_questions
+
+
+def extract_page_tiles(
+    extractor: QuestionExtractor,
+    cropper: ImageCropper,
+    page_info: dict,
+    tiles: list
+) -> list:
+    """
+    并发识别密集页面的各个分块，并合并去重
+
+    每个分块只带上中心落在分块内的图形区域和文字块；
+    分块上的LLM bbox换算回整张上传图片的坐标。
 
+    Args:
+        extractor: 题目提取器
+        cropper: 图片裁剪工具
+        page_info: PDFParser.render_all_pages 返回的页面信息
+        tiles: PDFParser.split_page_tiles 的结果
+
+    Returns:
+        list: 合并后的题目列表
+    """
+    page_num = page_info['page']
+    page_dx, page_dy = page_info['offset']
+    page_height = tiles[-1]['offset'][1] + tiles[-1]['size'][1]
+    question_count = page_info.get('question_count') or 0
+    print(f"    密集页面（约{question_count}题），分为 {len(tiles)} 块并发识别")
+
+    def extract_tile(tile: dict) -> list:
+        with DEFAULT_METRICS.tags(page=page_num):
+            return _extract_tile(tile)
+
+    def _extract_tile(tile: dict) -> list:
+        tile_dx, tile_dy = tile['offset']
+        top = page_dy + tile_dy
+        bottom = top + tile['size'][1]
+
+        def in_tile(bbox) -> bool:
+            return top <= (bbox[1] + bbox[3]) / 2 < bottom
+
+        regions = page_info.get('figure_regions')
+        if regions is not None:
+            regions = [region for region in regions if in_tile(region['bbox'])]
+        blocks = [block for block in page_info.get('text_blocks') or [] if in_tile(block['bbox'])]
+
+        questions = extractor.extract_from_page_image(
+            tile['image_bytes'],
+            page_num,
+            figure_regions=regions,
+            offset=(page_dx + tile_dx, top),
+            text_blocks=blocks or None,
+            question_count=math.ceil(question_count * tile['size'][1] / page_height),
+            features=page_info.get('features')
+        )
+        return cropper.map_tile_bboxes(questions, tile['image_bytes'], tile['offset'])
+
+    with ThreadPoolExecutor(max_workers=len(tiles)) as executor:
+        tile_questions = list(executor.map(extract_tile, tiles))
+
+    questions = extractor.merge_tile_questions(tile_questions)
+    print(f"    ✓ 分块识别 {sum(len(qs) for qs in tile_questions)} 道，去重后 {len(questions)} 道")
+    return questions
+
+
+def run_page_jobs(process_page, page_jobs: list, workers: int, deadline: Deadline) -> list:
+    """
+    多线程识别页面
+
+    任一页失败或被中断（Ctrl+C）时取消截止时间：未开始的页面不再执行，进行中的页面
+    在下一次请求前停止；等所有线程结束后再抛出第一个错误，不遗留后台线程。
 
-def process_pdf(pdf_path: str, use_vision: bool = False, force: bool = False):
+    Args:
+        process_page: 处理单页的函数
+        page_jobs: 页面任务列表
+        workers: 线程数
+        deadline: 文档级截止时间
+
+    Returns:
+        list: 按任务顺序排列的结果
+    """
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(process_page, job) for job in page_jobs]
+        try:
+            wait(futures, return_when=FIRST_EXCEPTION)
+        except KeyboardInterrupt:
+            deadline.cancel()
+            print("\n  ⚠ 正在取消：未开始的页面不再处理，等待进行中的请求结束...")
+            raise
+        errors = [f.exception() for f in futures if f.done() and not f.cancelled() and f.exception()]
+        if errors:
+            deadline.cancel()
+            # 优先报告真正的错误，而不是因此被取消的其他页面
+            raise next((e for e in errors if not isinstance(e, Cancelled)), errors[0])
+        return [f.result() for f in futures]
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+@dataclass
+class ProcessOptions:
+    """process_pdf 的处理选项（默认值与命令行参数的默认值一致）
+
+    默认开启的优化：page_filter（调用LLM前跳过封面、考试说明、空白页、广告页，
+    --no-page-filter 关闭），以及配置项 single_flight（合并进程内相同的并发请求，
+    SINGLE_FLIGHT=false 关闭）。其余优化默认关闭，按需开启。
+    """
+    use_vision: bool = False                 # 使用Vision模式（整页截图识别）
+    force: bool = False                      # 强制重新处理（删除已有记录）
+    save_pages: bool = False                 # Vision模式下将页面图片保存到磁盘（调试用，默认只在内存中处理）
+    render_cache: bool = False               # 内存模式下读写页面渲染缓存（重跑/重试时复用已渲染的页面）
+    adaptive_dpi: bool = False               # 按页面字号、图片分辨率和绘图密度逐页选择渲染DPI
+    local_figures: bool = False              # 由PDF结构定位图形区域，模型只选择区域编号（不再猜测bbox坐标）
+    vector_crops: bool = False               # 图片裁剪直接从PDF按crop_dpi渲染（矢量清晰度，不依赖页面位图）
+    crop_dpi: int = 300                      # vector_crops 模式下的裁剪分辨率
+    trim_margins: bool = False               # 上传前裁掉页边空白（减少图片token）
+    mask_bands: tuple = (0.0, 0.0)           # 检测页边时忽略的页眉/页脚带（占页面高度的比例）
+    page_filter: bool = True                 # 调用LLM前跳过封面、考试说明、空白页、广告页
+    include_pages: Optional[list] = None     # 强制处理的页码（不参与预筛选）
+    skip_pages: Optional[list] = None        # 强制跳过的页码
+    mode: Optional[str] = None               # 提取模式 text/vision/hybrid（默认由use_vision决定）
+    text_assist: bool = False                # Vision模式下附带文本层文字块，模型只返回结构，文字由本地拼接
+    response_format: Optional[str] = None    # 模型输出格式 json/compact（默认读取配置）
+    tile_dense: bool = False                 # 题目密集的页面切成水平分块并发识别（降低单页延迟和截断）
+    route_models: bool = False               # 按页面复杂度在便宜模型和强模型之间路由
+    workers: int = 1                         # 并发识别的页数（配置多个API密钥时可按密钥数成倍提高吞吐）
+    adaptive_concurrency: bool = False       # 按延迟和限流自动调整在途请求数（AIMD），workers 至少为 CONCURRENCY_MAX
+    request_timeout: Optional[float] = None  # 单次LLM请求的超时（秒，默认读取配置 request_timeout）
+    document_timeout: Optional[float] = None  # 整个文档的处理时限（秒，默认读取配置，超时后停止且不保存结果）
+    replay_mode: Optional[str] = None        # record 录制LLM请求和响应 / replay 离线回放（默认读取配置）
+    replay_path: Optional[str] = None        # 录制文件路径（默认读取配置 replay_path）
+    replay_latency_scale: Optional[float] = None  # 回放延迟倍数（1为原始延迟，0为不等待，默认读取配置）
+
+
+def process_pdf(pdf_path: str, options: Optional[ProcessOptions] = None, llm=None):
     """
     处理单个PDF文件
 
     Args:
         pdf_path: PDF文件路径
-        use_vision: 是否使用Vision模式（整页截图识别）
-        force: 强制重新处理（删除已有记录）
+        options: 处理选项（默认 ProcessOptions()）
+        llm: 直接使用的LLM实例（基准测试的模拟服务商等），默认按配置创建
     """
+    options = options or ProcessOptions()
+    mode = options.mode or ("vision" if options.use_vision else "text")
+
     if not os.path.exists(pdf_path):
         print(f"错误: 文件不存在 - {pdf_path}")
         return
 
+    document_timeout = options.document_timeout
+    if document_timeout is None:
+        document_timeout = settings.document_timeout
+    deadline = Deadline(document_timeout, scope="document")
+
     print("="*60)
     print(f"处理PDF: {pdf_path}")
-    print(f"模式: {'Vision（整页截图识别）' if use_vision else '文本提取'}")
+    print(f"模式: {MODE_LABELS[mode]}")
     print("="*60)
 
     # 1. 解析PDF
     print("\n[1/4] 解析PDF...")
-    parser = PDFParser()
+    parser = PDFParser(render_cache_max_mb=settings.render_cache_max_mb)
 
     pdf_hash = parser.get_file_hash(pdf_path)
     print(f"  ✓ 文件哈希: {pdf_hash}")
+    DEFAULT_METRICS.set_tags(pdf_hash=pdf_hash)
 
     page_count = parser.get_page_count(pdf_path)
     print(f"  ✓ 页数: {page_count}")
 
+    # 预筛选：跳过不含题目的页面（不调用LLM）
+    if options.page_filter:
+        question_pages, skipped_pages = parser.filter_pages(
+            pdf_path,
+            include_pages=options.include_pages,
+            skip_pages=options.skip_pages
+        )
+        print(f"  ✓ 题目页: {len(question_pages)}，跳过: {len(skipped_pages)}")
+        for skipped in skipped_pages:
+            print(f"    - 第{skipped['page']}页 [{skipped['kind']}] {skipped['reason']}")
+    elif options.skip_pages:
+        question_pages = [p for p in range(1, page_count + 1) if p not in options.skip_pages]
+    else:
+        question_pages = None
+
     # 2. 提取题目
     print("\n[2/4] 提取题目...")
-    print(f"  使用LLM: {settings.llm_provider}")
 
-    extractor = QuestionExtractor()
+    router = None
+    if options.route_models:
+        router = ModelRouter.from_settings()
+        if router is None:
+            print("错误: 启用模型路由需要配置 ROUTER_CHEAP_MODEL 和 ROUTER_STRONG_MODEL")
+            return
+        print(f"  模型路由: 便宜 {router.cheap_model} / 强 {router.strong_model}（阈值 {router.threshold}）")
+
+    workers = options.workers
+    limiter = None
+    if options.adaptive_concurrency:
+        limiter = AIMDLimiter(initial=settings.concurrency_initial, max_limit=settings.concurrency_max)
+        workers = max(workers, settings.concurrency_max)
+        print(f"  自适应并发: 初始 {limiter.limit}，上限 {settings.concurrency_max}")
+    extractor = QuestionExtractor(
+        response_format=options.response_format, router=router, limiter=limiter,
+        request_timeout=options.request_timeout, deadline=deadline, llm=llm,
+        replay_mode=options.replay_mode, replay_path=options.replay_path,
+        replay_latency_scale=options.replay_latency_scale
+    )
+    print(f"  使用LLM: {extractor.provider_name}")
     questions = []
 
-    if use_vision:
-        # Vision模式：整页截图识别
-        print("  渲染页面为图片...")
-        page_images = parser.render_all_pages(pdf_path)
-        print(f"  ✓ 渲染了 {len(page_images)} 页")
-
-        # 初始化图片裁剪工具
-        cropper = ImageCropper()
-
-        # 逐页识别
-        for page_info in page_images:
-            page_num = page_info['page']
-            image_path = page_info['image_path']
-
-            print(f"\n  识别第 {page_num}/{len(page_images)} 页...")
-            page_questions = extractor.extract_from_page_image(image_path, page_num)
-            print(f"    ✓ 提取到 {len(page_questions)} 道题目")
-
-            # 处理图片裁剪
-            for q in page_questions:
-                q = cropper.process_question_figures(image_path, q)
-                questions.append(q)
-    else:
-        # 文本模式：提取文本后识别
-        text_content = parser.extract_text(pdf_path)
-        print(f"  ✓ 提取文本: {len(text_content)} 字符")
-
-        images = parser.extract_images(pdf_path)
-        print(f"  ✓ 提取图片: {len(images)} 张")
+    try:
+        if mode in ("vision", "hybrid"):
+            vision_pages = question_pages
+            text_routes = []
+            if mode == "hybrid":
+                # 混合模式：按文本层和图形为每页选择提取方式
+                routes = parser.route_pages(pdf_path, pages=question_pages)
+                vision_pages = [r['page'] for r in routes if r['route'] == 'vision']
+                text_routes = [r for r in routes if r['route'] == 'text']
+                print(f"  ✓ 页面路由: 文本 {len(text_routes)} 页，Vision {len(vision_pages)} 页")
+                for route in routes:
+                    print(f"    - 第{route['page']}页 → {route['route']}（{route['reason']}）")
+
+            page_images = []
+            if vision_pages is None or vision_pages:
+                print("  渲染页面为图片...")
+                page_images = parser.render_all_pages(
+                    pdf_path,
+                    in_memory=not options.save_pages,
+                    use_cache=options.render_cache,
+                    adaptive_dpi=options.adaptive_dpi,
+                    locate_figures=options.local_figures,
+                    trim_margins=options.trim_margins,
+                    mask_bands=options.mask_bands,
+                    pages=vision_pages,
+                    text_blocks=options.text_assist,
+                    page_features=options.route_models
+                )
+                print(f"  ✓ 渲染了 {len(page_images)} 页{'（已保存到磁盘）' if options.save_pages else '（内存）'}")
+                if options.adaptive_dpi and page_images:
+                    avg_dpi = sum(p['dpi'] for p in page_images) / len(page_images)
+                    print(f"  ✓ 自适应DPI: 平均 {avg_dpi:.0f}（{min(p['dpi'] for p in page_images)}-{max(p['dpi'] for p in page_images)}）")
+
+            # 初始化图片裁剪工具
+            cropper = ImageCropper()
+
+            # PyMuPDF文档对象不能跨线程共享：矢量裁剪时每个工作线程各自打开一份
+            thread_local = threading.local()
+            pdf_docs = []
+
+            def get_pdf_doc():
+                if not options.vector_crops:
+                    return None
+                if not hasattr(thread_local, 'pdf_doc'):
+                    thread_local.pdf_doc = fitz.open(pdf_path)
+                    pdf_docs.append(thread_local.pdf_doc)
+                return thread_local.pdf_doc
+
+            def process_page(job) -> list:
+                with DEFAULT_METRICS.tags(page=job[0]), span("page", route=job[1]):
+                    return _process_page(job)
+
+            def _process_page(job) -> list:
+                page_num, route, page_data = job
+                deadline.check()  # 已取消或文档超时时不再开始新页面
+                print(f"\n  识别第 {page_num}/{page_count} 页（{route}）...")
+                if route == 'vision':
+                    page_questions = extract_vision_page(
+                        extractor, cropper, page_data, get_pdf_doc(), options.crop_dpi,
+                        parser=parser,
+                        tile_min_questions=PDFParser.TILE_MIN_QUESTIONS if options.tile_dense else 0
+                    )
+                else:
+                    page_questions = extractor.extract_from_page_text(page_data['text'], page_num)
+                print(f"    ✓ 第{page_num}页提取到 {len(page_questions)} 道题目")
+                return page_questions
+
+            # 逐页识别（按页码顺序合并两种方式的结果；workers>1 时多页并发）
+            page_jobs = [(p['page'], 'vision', p) for p in page_images]
+            page_jobs += [(r['page'], 'text', r) for r in text_routes]
+            page_jobs.sort(key=lambda job: job[0])
+            try:
+                if workers > 1 and len(page_jobs) > 1:
+                    print(f"  并发识别: {min(workers, len(page_jobs))} 个线程")
+                    page_results = run_page_jobs(process_page, page_jobs, workers, deadline)
+                else:
+                    page_results = [process_page(job) for job in page_jobs]
+            finally:
+                for pdf_doc in pdf_docs:
+                    pdf_doc.close()
+            for page_questions in page_results:
+                questions.extend(page_questions)
+        else:
+            # 文本模式：提取文本后识别
+            text_content = parser.extract_text(pdf_path, pages=question_pages)
+            print(f"  ✓ 提取文本: {len(text_content)} 字符")
+
+            images = parser.extract_images(pdf_path)
+            print(f"  ✓ 提取图片: {len(images)} 张")
+
+            if text_content.strip():
+                questions = extractor.extract_from_text(text_content)
+                print(f"  ✓ 提取到 {len(questions)} 道题目")
+            else:
+                print("  ⚠ 没有文本内容，跳过提取")
+    except (KeyboardInterrupt, Cancelled, DeadlineExceeded) as e:
+        deadline.cancel()
+        if isinstance(e, DeadlineExceeded) and not extractor.deadline_misses.get(e.scope):
+            extractor.record_deadline_miss(e.scope)
+        reason = str(e) if isinstance(e, DeadlineExceeded) else "已中断"
+        print(f"\n  ⚠ 提取已停止（{reason}），本次结果不保存")
+        _print_deadline_misses(extractor)
+        return
 
-        if text_content.strip():
-            questions = extractor.extract_from_text(text_content)
-            print(f"  ✓ 提取到 {len(questions)} 道题目")
+    if router:
+        router.print_summary()
+    if limiter:
+        stats = limiter.stats()
+        print(f"  自适应并发: 当前上限 {stats['limit']}，成功 {stats['successes']}，"
+              f"限流 {stats['throttled']}，延迟突增 {stats['latency_spikes']}")
+    key_pool = _find_provider(extractor.llm, KeyPoolProvider)
+    if key_pool:
+        print("  密钥池统计:")
+        for key_stats in key_pool.stats():
+            status = "已隔离" if key_stats['quarantined'] else "正常"
+            print(f"    - {key_stats['key']}: {key_stats['calls']} 次调用，限流 {key_stats['rate_limited']} 次，{status}")
+    replay = _find_provider(extractor.llm, ReplayProvider)
+    if replay:
+        stats = replay.stats()
+        if stats['mode'] == 'record':
+            print(f"  录制: {stats['recorded']} 次请求 → {replay.path}")
         else:
-            print("  ⚠ 没有文本内容，跳过提取")
+            print(f"  回放: 命中 {stats['replayed']} 次，未命中 {stats['misses']} 次（延迟倍数 {replay.latency_scale}）")
+    _print_deadline_misses(extractor)
 
     if not questions:
         print("\n没有提取到题目，处理结束。")
@@ -104,7 +451,9 @@ def process_pdf(pdf_path: str, use_vision: bool = False, force: bool = False):
     session = get_session(engine)
 
     saver = QuestionSaver(session)
-    saved_count = saver.save_questions(questions, pdf_path, pdf_hash, force=force)
+    with span("db_save"):
+        saved_count = saver.save_questions(questions, pdf_path, pdf_hash, force=options.force)
+    DEFAULT_METRICS.count("questions_saved", saved_count)
 
     session.close()
 
@@ -117,16 +466,107 @@ def process_pdf(pdf_path: str, use_vision: bool = False, force: bool = False):
     print("处理成功！")
 
 
+def _print_deadline_misses(extractor: QuestionExtractor):
+    """输出截止时间超时次数（有超时时）"""
+    misses = extractor.deadline_misses
+    if any(misses.values()):
+        print(f"  截止时间: 单次请求超时 {misses.get('request', 0)} 次，文档超时 {misses.get('document', 0)} 次")
+
+
+def _find_provider(llm, provider_class):
+    """在包装链（ProviderWrapper.inner）中查找指定类型的提供商"""
+    while llm is not None:
+        if isinstance(llm, provider_class):
+            return llm
+        llm = getattr(llm, 'inner', None)
+    return None
+
+
+def _parse_pages(value: str) -> list:
+    """解析页码列表，如 "1,3,5-8" -> [1, 3, 5, 6, 7, 8]"""
+    pages = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            pages.extend(range(int(start), int(end) + 1))
+        else:
+            pages.append(int(part))
+    return pages
+
+
 def main():
     """主函数"""
     import argparse
 
-    parser = argparse.ArgumentParser(description='处理PDF文件并提取题目')
+    parser = argparse.ArgumentParser(
+        description='处理PDF文件并提取题目',
+        epilog='默认开启：页面预筛选（--no-page-filter 关闭）、合并相同的并发LLM请求（配置 SINGLE_FLIGHT=false 关闭）'
+    )
     parser.add_argument('pdf_path', help='PDF文件路径')
     parser.add_argument('--vision', action='store_true',
-                        help='使用Vision模式（整页截图识别，支持图片题目）')
+                        help='使用Vision模式（整页截图识别，支持图片题目），等同于 --mode vision')
+    parser.add_argument('--mode', choices=sorted(MODE_LABELS), default=None,
+                        help='提取模式: text（默认）/ vision / hybrid（按页选择文本或Vision）')
     parser.add_argument('--force', action='store_true',
                         help='强制重新处理（删除已有记录）')
+    parser.add_argument('--save-pages', action='store_true',
+                        help='Vision模式下将页面图片保存到磁盘（调试用）')
+    parser.add_argument('--render-cache', action='store_true',
+                        help='使用页面渲染缓存（按PDF哈希、页码、DPI缓存，重跑时直接复用）')
+    parser.add_argument('--adaptive-dpi', action='store_true',
+                        help='按页面字号、图片分辨率和绘图密度逐页选择渲染DPI')
+    parser.add_argument('--local-figures', action='store_true',
+                        help='由PDF结构定位图形区域，模型只返回区域编号（更少输出token，裁剪结果确定）')
+    parser.add_argument('--vector-crops', action='store_true',
+                        help='图片裁剪直接从PDF渲染（矢量清晰度）')
+    parser.add_argument('--crop-dpi', type=int, default=300,
+                        help='--vector-crops 模式下的裁剪分辨率（默认300）')
+    parser.add_argument('--trim-margins', action='store_true',
+                        help='上传前裁掉页边空白（减少图片token和上传字节）')
+    parser.add_argument('--mask-bands', type=float, nargs=2, default=(0.0, 0.0), metavar=('TOP', 'BOTTOM'),
+                        help='裁剪页边时忽略的页眉/页脚带，占页面高度的比例（如 0.05 0.04）')
+    parser.add_argument('--text-assist', action='store_true',
+                        help='Vision模式下附带PDF文本层，模型只返回题目结构，文字从文本层拼接（大幅减少输出token）')
+    parser.add_argument('--response-format', choices=['json', 'compact'], default=None,
+                        help='模型输出格式: json（完整字段名）/ compact（缩写字段，减少输出token），默认读取配置')
+    parser.add_argument('--tile-dense', action='store_true',
+                        help=f'题目密集（约{PDFParser.TILE_MIN_QUESTIONS}题以上）的页面在题间空白处切块并发识别')
+    parser.add_argument('--route-models', action='store_true',
+                        help='按页面复杂度在便宜模型和强模型之间路由（需配置 ROUTER_CHEAP_MODEL / ROUTER_STRONG_MODEL）')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='并发识别的页数（默认1；配置 OPENAI_API_KEYS 等多密钥时可设为密钥数的倍数）')
+    parser.add_argument('--adaptive-concurrency', action='store_true',
+                        help='按延迟和限流自动调整并发请求数（AIMD，上限见 CONCURRENCY_MAX）')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='单次LLM请求超时（秒，默认读取配置 REQUEST_TIMEOUT）')
+    parser.add_argument('--deadline', type=float, default=None,
+                        help='整个文档的处理时限（秒，超时后停止且不保存结果，默认读取配置 DOCUMENT_TIMEOUT）')
+    parser.add_argument('--metrics-jsonl', default=None,
+                        help='分阶段计时明细输出文件（JSONL，追加写入，默认读取配置 METRICS_JSONL_PATH）')
+    parser.add_argument('--metrics-prom', default=None,
+                        help='指标汇总输出文件（Prometheus文本格式，默认读取配置 METRICS_PROM_PATH）')
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                        help='按阶段分析：cpu（cProfile，每个阶段输出.prof）或 mem（tracemalloc，输出分配最多的代码行）')
+    parser.add_argument('--profile-dir', default=None,
+                        help='分析结果输出目录（默认 PROFILE_DIR/<PDF文件名>）')
+    parser.add_argument('--profile-top', type=int, default=25,
+                        help='分析报告中每个阶段列出的函数/代码行数（默认25）')
+    replay_group = parser.add_mutually_exclusive_group()
+    replay_group.add_argument('--record', metavar='FILE', default=None,
+                              help='录制LLM请求和响应到JSONL文件（之后可用 --replay 离线重跑）')
+    replay_group.add_argument('--replay', metavar='FILE', default=None,
+                              help='按录制文件回放LLM响应（不访问网络、不产生费用；渲染参数需与录制时一致）')
+    parser.add_argument('--replay-latency-scale', type=float, default=None,
+                        help='回放延迟倍数（1为原始延迟，0为不等待，默认读取配置 REPLAY_LATENCY_SCALE）')
+    parser.add_argument('--no-page-filter', action='store_true',
+                        help='不预筛选页面（默认开启预筛选：调用LLM前跳过封面、考试说明、空白页、广告页）')
+    parser.add_argument('--include-pages', type=_parse_pages, default=None,
+                        help='强制处理的页码，如 1,3,5-8')
+    parser.add_argument('--skip-pages', type=_parse_pages, default=None,
+                        help='强制跳过的页码，如 2,10-12')
 
     args = parser.parse_args()
 
@@ -134,8 +574,48 @@ def main():
     from dotenv import load_dotenv
     load_dotenv()
 
+    # 分阶段计时（配置了输出文件时启用）
+    metrics = configure_metrics(
+        args.metrics_jsonl or settings.metrics_jsonl_path,
+        args.metrics_prom or settings.metrics_prom_path
+    )
+
+    # 按阶段CPU/内存分析（开销较大，只在排查性能问题时开启）
+    profile_dir = args.profile_dir or os.path.join(
+        settings.profile_dir, os.path.splitext(os.path.basename(args.pdf_path))[0])
+    profiler = configure_profiling(args.profile, profile_dir, args.profile_top)
+
     # 处理PDF
-    process_pdf(args.pdf_path, use_vision=args.vision, force=args.force)
+    try:
+        options = ProcessOptions(
+            use_vision=args.vision, force=args.force,
+            save_pages=args.save_pages, render_cache=args.render_cache,
+            adaptive_dpi=args.adaptive_dpi, local_figures=args.local_figures,
+            vector_crops=args.vector_crops, crop_dpi=args.crop_dpi,
+            trim_margins=args.trim_margins, mask_bands=tuple(args.mask_bands),
+            page_filter=not args.no_page_filter, include_pages=args.include_pages,
+            skip_pages=args.skip_pages, mode=args.mode, text_assist=args.text_assist,
+            response_format=args.response_format, tile_dense=args.tile_dense,
+            route_models=args.route_models, workers=args.workers,
+            adaptive_concurrency=args.adaptive_concurrency,
+            request_timeout=args.timeout, document_timeout=args.deadline,
+            replay_mode='record' if args.record else ('replay' if args.replay else None),
+            replay_path=args.record or args.replay,
+            replay_latency_scale=args.replay_latency_scale
+        )
+        process_pdf(args.pdf_path, options)
+    finally:
+        if metrics.enabled:
+            print()
+            metrics.print_summary()
+            metrics.close()
+            for path in (metrics.jsonl_path, metrics.prom_path):
+                if path:
+                    print(f"  ✓ 指标已写入: {path}")
+        if profiler is not None:
+            paths = profiler.write_reports(os.path.basename(args.pdf_path))
+            configure_profiling(None)
+            print(f"  ✓ {args.profile} 分析结果已写入: {profiler.output_dir}（{len(paths)} 个文件，报告 {paths[0]}）")
 
 
 if __name__ == "__main__":
@@ -30,6 +30,50 @@ class Settings(BaseSettings):
     # 通义千问 API密钥 (备用字段，可选)
     qwen_api_key: Optional[str] = None
 
+    # 多密钥（逗号分隔）：配置后请求在多个密钥间按负载分摊，突破单账号限流
+    # 限流的密钥自动冷却，额度耗尽的密钥自动隔离；未配置时使用上面的单个密钥
+    claude_api_keys: Optional[str] = None
+    openai_api_keys: Optional[str] = None
+    # 与 OPENAI_API_KEYS 一一对应的API端点（逗号分隔，只填一个时所有密钥共用）
+    openai_base_urls: Optional[str] = None
+    # 密钥被限流后的默认冷却时间（秒，响应头没有retry-after时使用）
+    key_cooldown_seconds: float = 10.0
+
+    # 自适应并发（--adaptive-concurrency）：初始和最大在途请求数
+    concurrency_initial: int = 4
+    concurrency_max: int = 32
+
+    # 合并进程内同时进行的相同请求（同一PDF重复提交、不同PDF中的相同页面只付一次费）
+    single_flight: bool = True
+
+    # HTTP连接池：同一进程内相同端点和密钥的请求共用长连接（超时单位：秒）
+    http_max_connections: int = 100
+    http_max_keepalive: int = 20
+    http_keepalive_expiry: float = 60.0
+    http_connect_timeout: float = 10.0
+    http_read_timeout: float = 600.0
+    # 启用HTTP/2（需要 pip install h2，未安装时使用HTTP/1.1）
+    http2: bool = True
+
+    # 截止时间（秒）：单次LLM请求的超时，以及整个文档的处理时限（不设置表示不限时）
+    # 可用 --timeout / --deadline 覆盖。默认都不限时：max_tokens 最高可达16000且截断时加倍重试，
+    # 固定的单次超时会让原本能完成的长输出超时并按全价重试
+    request_timeout: Optional[float] = None
+    document_timeout: Optional[float] = None
+
+    # 分阶段计时输出（--metrics-jsonl / --metrics-prom 可覆盖）：JSONL明细和Prometheus文本格式汇总
+    metrics_jsonl_path: Optional[str] = None
+    metrics_prom_path: Optional[str] = None
+
+    # 按阶段CPU/内存分析（--profile cpu|mem 启用）的输出目录，实际输出到其中以PDF文件名命名的子目录
+    profile_dir: str = "profiles"
+
+    # 录制/回放（--record / --replay 可覆盖）：record 录制真实服务商的请求和响应，
+    # replay 按录制文件离线回放（不访问网络、不产生费用），延迟按 replay_latency_scale 缩放
+    replay_mode: Optional[str] = None
+    replay_path: str = "data/replay/llm_replay.jsonl"
+    replay_latency_scale: float = 1.0
+
     # ==================== 模型配置 ====================
     # Claude模型名称
     claude_model: str = "claude-3-5-sonnet-20241022"
@@ -57,6 +101,18 @@ class Settings(BaseSettings):
     pdf_dir: str = "data/pdfs"
     image_dir: str = "data/images"
 
+    # 页面渲染缓存大小上限（MB），超出后按最近使用时间淘汰
+    render_cache_max_mb: int = 1024
+
+    # 模型路由：简单页面用便宜模型，复杂页面（图形、公式、扫描件、密集页）用强模型
+    # 两者都配置后可用 --route-models 启用；便宜模型结果校验失败时自动升级到强模型
+    router_cheap_model: Optional[str] = None
+    router_strong_model: Optional[str] = None
+    router_threshold: float = 0.5
+
+    # 模型输出格式: "json"（完整字段名）或 "compact"（缩写字段，减少输出token）
+    response_format: str = "json"
+
     # 日志
     log_level: str = "INFO"
 
@@ -1,5 +1,6 @@
 """题目提取模块"""
 
 from .question_extractor import QuestionExtractor
+from .model_router import ModelRouter
 
-__all__ = ['QuestionExtractor']
+__all__ = ['QuestionExtractor', 'ModelRouter']
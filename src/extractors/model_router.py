@@ -0,0 +1,206 @@
+"""模型路由 - 按页面复杂度选择便宜模型或强模型"""
+
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from src.config import settings
+
+
+# 公式/数学符号（用于估计公式密度）。不含 = + / % _ 等ASCII符号：
+# 它们在日期、网址、百分数和普通标点里同样常见，会把纯文字页面误判为公式页
+FORMULA_PATTERN = re.compile(r"[×÷√∑∫∠°π≤≥≠±∞⊥∥△∽≌∈∉⊆∪∩→←]")
+
+# 题号/选项标记（与 PDFParser 的 QUESTION_PATTERN、OPTION_PATTERN 一致），用于判断文本中是否有题目
+QUESTION_MARKER_PATTERN = re.compile(
+    r"(?m)^\s*(?:\d{1,3}\s*[\.．、\)）]|第\s*\d{1,3}\s*题)|(?:^|\s|\(|（)[A-H]\s*[\.．、:：\)）]"
+)
+
+
+class ModelRouter:
+    """基于本地页面特征的模型路由
+
+    每个页面/文本批次按图形数量、公式密度、题目密度和文本层情况打分（0-1），
+    分数低于阈值走便宜快速的模型，否则走强模型；便宜模型的结果校验失败时升级到强模型重试。
+    所有路由决策及其成本、耗时都会记录下来，用于事后分析。
+    """
+
+    # 打分权重
+    FIGURE_WEIGHT = 0.4          # 图形数量（3个及以上记满分）
+    FORMULA_WEIGHT = 0.3         # 公式符号占比（达到 FULL_FORMULA_RATIO 记满分）
+    SCANNED_WEIGHT = 0.4         # 没有可用文本层（扫描件）
+    DENSE_WEIGHT = 0.2           # 题目密集页面
+    FULL_FIGURE_COUNT = 3
+    MIN_FORMULA_RATIO = 0.005    # 公式符号占比低于该值不计分（零星的°、→等）
+    FULL_FORMULA_RATIO = 0.05
+    DENSE_QUESTION_COUNT = 10
+    MIN_TEXT_CHARS = 50
+
+    def __init__(self, cheap_model: str, strong_model: str, threshold: float = 0.5):
+        """
+        初始化模型路由
+
+        Args:
+            cheap_model: 便宜快速的模型（简单页面）
+            strong_model: 强模型（复杂页面，以及校验失败后的升级）
+            threshold: 复杂度分数达到该值时使用强模型
+        """
+        self.cheap_model = cheap_model
+        self.strong_model = strong_model
+        self.threshold = threshold
+        self.decisions: List[Dict] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> Optional["ModelRouter"]:
+        """根据配置创建路由（未配置便宜/强模型时返回None）"""
+        if not (settings.router_cheap_model and settings.router_strong_model):
+            return None
+        return cls(
+            settings.router_cheap_model,
+            settings.router_strong_model,
+            threshold=settings.router_threshold
+        )
+
+    def score(self, features: Dict) -> Tuple[float, List[str]]:
+        """
+        计算页面复杂度分数
+
+        Args:
+            features: 页面特征，支持以下字段（缺失的字段不计分）
+                text: 文本层内容, text_chars: 文本层字符数,
+                figure_count: 图形区域数（缺失时按 image_count 和 drawing_count 估计）,
+                question_count / question_marker_count: 题目数,
+                vision: 是否为整页图片识别
+
+        Returns:
+            Tuple[float, List[str]]: (0-1的分数, 计分依据)
+        """
+        score = 0.0
+        reasons = []
+
+        figure_count = features.get("figure_count")
+        if figure_count is None:
+            figure_count = features.get("image_count", 0) + (1 if features.get("drawing_count", 0) >= 20 else 0)
+        if figure_count:
+            score += self.FIGURE_WEIGHT * min(figure_count / self.FULL_FIGURE_COUNT, 1.0)
+            reasons.append(f"{figure_count}个图形")
+
+        text = features.get("text") or ""
+        text_chars = features.get("text_chars", len(text.strip()))
+        if text:
+            formula_ratio = len(FORMULA_PATTERN.findall(text)) / max(len(text), 1)
+            if formula_ratio >= self.MIN_FORMULA_RATIO:
+                score += self.FORMULA_WEIGHT * min(formula_ratio / self.FULL_FORMULA_RATIO, 1.0)
+                reasons.append(f"公式符号{formula_ratio:.1%}")
+
+        if features.get("vision") and text_chars < self.MIN_TEXT_CHARS:
+            score += self.SCANNED_WEIGHT
+            reasons.append("无文本层")
+
+        question_count = features.get("question_count") or features.get("question_marker_count") or 0
+        if question_count >= self.DENSE_QUESTION_COUNT:
+            score += self.DENSE_WEIGHT
+            reasons.append(f"约{question_count}题")
+
+        return min(score, 1.0), reasons
+
+    def expects_questions(self, features: Dict) -> bool:
+        """
+        根据文本层/页面分类判断页面上是否应当有题目（结果为空时据此决定是否升级到强模型）
+
+        Args:
+            features: 页面特征（见 score）
+
+        Returns:
+            bool: 题目数、题号/选项标记数或文本中的标记表明有题目时返回True；
+                扫描件等没有可用文本层的页面无从判断，返回False
+        """
+        if features.get("question_count") or features.get("question_marker_count"):
+            return True
+        if features.get("option_count", 0) >= 2:
+            return True
+        return bool(QUESTION_MARKER_PATTERN.search(features.get("text") or ""))
+
+    def choose(self, features: Dict) -> Dict:
+        """
+        为页面选择模型
+
+        Returns:
+            Dict: {"tier": "cheap/strong", "model": 模型名, "score": 分数, "reason": 依据}
+        """
+        score, reasons = self.score(features)
+        tier = "strong" if score >= self.threshold else "cheap"
+        return {
+            "tier": tier,
+            "model": self.strong_model if tier == "strong" else self.cheap_model,
+            "score": score,
+            "reason": "、".join(reasons) or "无复杂特征"
+        }
+
+    def escalate(self, decision: Dict, problem: str) -> Dict:
+        """校验失败后升级到强模型"""
+        return {
+            "tier": "strong",
+            "model": self.strong_model,
+            "score": decision["score"],
+            "reason": f"升级：{problem}",
+            "escalated": True
+        }
+
+    def record(self, label: str, decision: Dict, cost: float, seconds: float, problem: Optional[str] = None):
+        """
+        记录一次路由决策的结果
+
+        Args:
+            label: 页面/批次标识（如 "第3页"）
+            decision: choose/escalate 的结果
+            cost: 本次调用成本（美元）
+            seconds: 本次调用耗时（秒）
+            problem: 结果校验失败的原因（通过时为None）
+        """
+        with self._lock:
+            self.decisions.append({
+                "label": label,
+                **decision,
+                "cost": cost,
+                "seconds": seconds,
+                "problem": problem
+            })
+
+    def summary(self) -> Dict[str, Dict]:
+        """
+        按模型档位汇总调用次数、成本和耗时
+
+        Returns:
+            Dict: {"cheap": {"calls", "cost", "seconds", "failed"}, "strong": {..., "escalated"}}
+        """
+        result = {
+            tier: {"model": model, "calls": 0, "cost": 0.0, "seconds": 0.0, "failed": 0, "escalated": 0}
+            for tier, model in (("cheap", self.cheap_model), ("strong", self.strong_model))
+        }
+        with self._lock:
+            decisions = list(self.decisions)
+        for decision in decisions:
+            stats = result[decision["tier"]]
+            stats["calls"] += 1
+            stats["cost"] += decision["cost"]
+            stats["seconds"] += decision["seconds"]
+            stats["failed"] += 1 if decision["problem"] else 0
+            stats["escalated"] += 1 if decision.get("escalated") else 0
+        return result
+
+    def print_summary(self):
+        """打印路由汇总"""
+        print("  模型路由汇总:")
+        for tier, stats in self.summary().items():
+            if not stats["calls"]:
+                continue
+            avg = stats["seconds"] / stats["calls"]
+            line = (f"    - {tier}（{stats['model']}）: {stats['calls']} 次，成本 ${stats['cost']:.4f}，"
+                    f"总耗时 {stats['seconds']:.1f}s（平均 {avg:.1f}s）")
+            if stats["failed"]:
+                line += f"，校验失败 {stats['failed']} 次"
+            if stats["escalated"]:
+                line += f"，其中升级 {stats['escalated']} 次"
+            print(line)
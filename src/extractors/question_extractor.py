@@ -1,23 +1,127 @@
 """题目提取器 - 使用LLM提取结构化题目"""
 
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import json
-from src.llm import LLMFactory, Message, MessageRole
+import re
+import threading
+import time
+from src.llm import (
+    LLMFactory, BaseLLMProvider, LLMResponse, Message, MessageRole, ImageInput,
+    AIMDLimiter, AdaptiveConcurrencyProvider, SingleFlightProvider,
+    configure_http_clients, Deadline, DeadlineExceeded
+)
 from src.config import settings
+from src.utils.metrics import DEFAULT_METRICS, span
+from .model_router import ModelRouter
+
+
+# 选项标记（如 "A."、"(B)"、"C、"），用于拆分同一行中的多个选项
+OPTION_MARKER_PATTERN = re.compile(r"(?<![^\s(（])([A-H])\s*[\.．、:：\)）]\s*")
+CJK_PATTERN = re.compile(r"[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]")
+
+# 输出格式：json（完整字段名）/ compact（缩写字段，减少输出token）
+RESPONSE_FORMATS = ("json", "compact")
+COMPACT_QUESTION_TYPES = {"s": "single_choice", "m": "multiple_choice"}
+COMPACT_DIFFICULTIES = {"e": "easy", "m": "medium", "h": "hard"}
+COMPACT_TAG_FIELDS = ("company", "question_type", "subject", "skill")
+
+# 输出token预算：按题目数/文本长度估算，乘以安全系数后限制在 [MIN, MAX] 内
+DEFAULT_MAX_TOKENS = 8000    # 没有任何估计依据时的初始预算
+MIN_MAX_TOKENS = 1024
+MAX_MAX_TOKENS = 16000
+MAX_TOKENS_MARGIN = 1.5
+MAX_TOKENS_OVERHEAD = 256
+# 每道题的输出token（按 (输出格式, 是否文本层辅助) 区分）
+OUTPUT_TOKENS_PER_QUESTION = {
+    ("json", False): 400,
+    ("json", True): 220,
+    ("compact", False): 200,
+    ("compact", True): 100,
+}
+# 文本提取时每个输入字符对应的输出token（模型会转写全部文字并加上JSON结构）
+TEXT_OUTPUT_TOKENS_PER_CHAR = {"json": 1.5, "compact": 1.0}
+
+# 分块去重：规范化题干至少这么长时才按前缀判断重复（避免短题干误合并）
+MIN_DEDUP_PREFIX = 8
 
 
 class QuestionExtractor:
     """基于LLM的题目提取器"""
 
-    def __init__(self):
-        """初始化提取器"""
-        self.llm = self._create_llm_from_config()
-        self.total_cost = 0.0
+    def __init__(
+        self,
+        response_format: Optional[str] = None,
+        router: Optional[ModelRouter] = None,
+        limiter: Optional[AIMDLimiter] = None,
+        request_timeout: Optional[float] = None,
+        deadline: Optional[Deadline] = None,
+        llm: Optional[BaseLLMProvider] = None,
+        replay_mode: Optional[str] = None,
+        replay_path: Optional[str] = None,
+        replay_latency_scale: Optional[float] = None
+    ):
+        """
+        初始化提取器
 
-    def _create_llm_from_config(self):
-        """根据配置创建LLM实例"""
+        Args:
+            response_format: 模型输出格式 json/compact（默认读取配置 response_format）
+            router: 模型路由（按页面复杂度选择便宜/强模型，默认不路由，始终使用默认模型）
+            limiter: 自适应并发控制器（提供时按延迟和限流自动调整在途请求数）
+            request_timeout: 单次LLM请求的超时（秒，默认读取配置 request_timeout）
+            deadline: 文档级截止时间（所有请求共享；取消它会让进行中的提取尽快停止）
+            llm: 直接使用的LLM实例（如基准测试的模拟服务商），默认按配置创建；
+                同样按配置包装自适应并发和请求合并
+            replay_mode: record 录制真实服务商的请求和响应 / replay 离线回放（默认读取配置 replay_mode）
+            replay_path: 录制文件路径（默认读取配置 replay_path）
+            replay_latency_scale: 回放延迟倍数（默认读取配置 replay_latency_scale）
+        """
+        self.response_format = response_format or settings.response_format
+        if self.response_format not in RESPONSE_FORMATS:
+            raise ValueError(f"不支持的输出格式: {self.response_format}，可选: {', '.join(RESPONSE_FORMATS)}")
+
+        self.replay_mode = replay_mode or settings.replay_mode
+        self.replay_path = replay_path or settings.replay_path
+        self.replay_latency_scale = (replay_latency_scale if replay_latency_scale is not None
+                                     else settings.replay_latency_scale)
+        if llm is not None:
+            self.provider_name = type(llm).__name__
+        else:
+            self.provider_name = "replay" if self.replay_mode == "replay" else settings.llm_provider
+        self.llm = self._wrap_llm(llm, limiter) if llm is not None else self._create_llm_from_config(limiter)
+        self.total_cost = 0.0
+        self.last_usage: Optional[Dict] = None  # 最近一次调用的token用量
+        self._last_output_tokens: Optional[int] = None  # 上一次调用的输出token（估算下一页预算）
+        self._lock = threading.Lock()  # 分块并发识别时保护成本统计
+        self._local = threading.local()  # 当前线程本次提取的成本（模型路由记录用）
+        self.router = router
+        self.request_timeout = request_timeout if request_timeout is not None else settings.request_timeout
+        self.deadline = deadline or Deadline()
+        self.deadline_misses = {"request": 0, "document": 0}  # 各范围截止时间的超时次数
+
+    def _create_llm_from_config(self, limiter: Optional[AIMDLimiter] = None):
+        """根据配置创建LLM实例
+
+        包装顺序（由内到外）：单密钥/密钥池 -> 录制 -> 自适应并发 -> 请求合并，
+        合并在最外层，等待共享结果的请求不占用并发名额；录制紧贴真实服务商，
+        记录的是实际请求耗时（不含排队）。回放模式不创建真实服务商，也不需要API密钥。
+        """
         provider = settings.llm_provider
 
+        if self.replay_mode == "replay":
+            llm = LLMFactory.create(
+                "replay", "", mode="replay", path=self.replay_path, latency_scale=self.replay_latency_scale
+            )
+            return self._wrap_llm(llm, limiter)
+
+        configure_http_clients(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive,
+            keepalive_expiry=settings.http_keepalive_expiry,
+            connect_timeout=settings.http_connect_timeout,
+            read_timeout=settings.http_read_timeout,
+            http2=settings.http2
+        )
+
         # 根据provider选择对应的API key
         api_key_map = {
             "claude": settings.claude_api_key,
@@ -25,8 +129,16 @@ class QuestionExtractor:
             "zhipu": settings.openai_api_key,  # 智谱AI使用OPENAI_API_KEY
         }
 
+        # 多密钥配置（逗号分隔）优先
+        api_keys_map = {
+            "claude": settings.claude_api_keys,
+            "openai": settings.openai_api_keys,
+            "zhipu": settings.openai_api_keys,
+        }
+        api_keys = self._split_list(api_keys_map.get(provider))
+
         api_key = api_key_map.get(provider)
-        if not api_key:
+        if not api_key and not api_keys:
             raise ValueError(f"未配置 {provider} 的API密钥")
 
         # 额外配置
@@ -40,7 +152,41 @@ class QuestionExtractor:
         elif provider == "zhipu":
             extra_config["default_model"] = settings.openai_model  # 使用OPENAI_MODEL配置
 
-        return LLMFactory.create(provider, api_key, **extra_config)
+        llm = self._create_provider(provider, api_key, api_keys, extra_config)
+        if self.replay_mode == "record":
+            llm = LLMFactory.create("replay", "", mode="record", path=self.replay_path, inner=llm)
+            print(f"  录制LLM请求: {self.replay_path}")
+        return self._wrap_llm(llm, limiter)
+
+    @staticmethod
+    def _wrap_llm(llm: BaseLLMProvider, limiter: Optional[AIMDLimiter] = None) -> BaseLLMProvider:
+        """按配置包装自适应并发和请求合并"""
+        if limiter is not None:
+            llm = AdaptiveConcurrencyProvider(llm, limiter)
+        if settings.single_flight:
+            llm = SingleFlightProvider(llm)
+        return llm
+
+    def _create_provider(self, provider: str, api_key: Optional[str], api_keys: List[str], extra_config: Dict):
+        """创建单密钥提供商，或多密钥时创建密钥池"""
+        if len(api_keys) > 1:
+            base_urls = self._split_list(settings.openai_base_urls) if provider == "openai" else []
+            if base_urls:
+                extra_config.pop("base_url", None)
+            print(f"  使用密钥池: {len(api_keys)} 个密钥")
+            return LLMFactory.create_pool(
+                provider, api_keys,
+                base_urls=base_urls or None,
+                cooldown=settings.key_cooldown_seconds,
+                **extra_config
+            )
+
+        return LLMFactory.create(provider, api_key or api_keys[0], **extra_config)
+
+    @staticmethod
+    def _split_list(value: Optional[str]) -> List[str]:
+        """拆分逗号分隔的配置项"""
+        return [item.strip() for item in (value or "").split(",") if item.strip()]
 
     def extract_from_text(self, text: str, batch_size: int = 3000) -> List[Dict]:
         """
@@ -64,6 +210,8 @@ class QuestionExtractor:
     def _extract_single_batch(self, text: str) -> List[Dict]:
         """处理单批文本"""
         prompt = self._build_text_extraction_prompt(text)
+        if self.response_format == "compact":
+            prompt += self._build_compact_format_rules()
 
         messages = [
             Message(
@@ -76,19 +224,15 @@ class QuestionExtractor:
             )
         ]
 
-        # 调用LLM
-        response = self.llm.chat(messages, temperature=0.3, max_tokens=16000)
+        # 按文本长度估算输出预算
+        max_tokens = self.estimate_max_tokens(text_chars=len(text))
 
-        # 记录成本
-        cost = self.llm.estimate_cost(response.usage)
-        self.total_cost += cost
-        print(f"    本次调用成本: ${cost:.4f}, 累计成本: ${self.total_cost:.4f}")
-        print(f"    Token使用: {response.usage}")
+        def run(model):
+            response = self._chat(messages, max_tokens, model)
+            # 解析返回的JSON
+            return self._parse_response(response.content), response
 
-        # 解析返回的JSON
-        questions = self._parse_response(response.content)
-
-        return questions
+        return self._run_routed(f"文本批次（{len(text)}字符）", {"text": text, "text_chars": len(text)}, run)
 
     def _extract_in_batches(self, text: str, batch_size: int) -> List[Dict]:
         """分批提取题目"""
@@ -121,6 +265,226 @@ class QuestionExtractor:
 
         return all_questions
 
+    def estimate_max_tokens(
+        self,
+        question_count: Optional[int] = None,
+        text_chars: Optional[int] = None,
+        layout: bool = False
+    ) -> int:
+        """
+        估算本次请求的输出token上限（留有安全余量，截断时由 _chat 自动加倍重试）
+
+        依据优先级：文本字符数（文本提取会转写全部文字）> 文本层估计的题目数 >
+        上一页实际输出token > 默认值。录制/回放模式下不使用上一页的输出token：
+        并发时"上一页"取决于完成顺序，预算（以及是否截断重试）就无法复现。
+
+        Args:
+            question_count: 页面估计题目数（PDFParser.estimate_question_count）
+            text_chars: 待提取文本的字符数（文本模式）
+            layout: 是否为文本层辅助识别（模型不转写文字，输出更短）
+
+        Returns:
+            int: max_tokens
+        """
+        if text_chars:
+            estimate = text_chars * TEXT_OUTPUT_TOKENS_PER_CHAR[self.response_format]
+        elif question_count:
+            estimate = question_count * OUTPUT_TOKENS_PER_QUESTION[(self.response_format, layout)]
+        elif self._last_output_tokens and not self.replay_mode:
+            estimate = self._last_output_tokens
+        else:
+            return DEFAULT_MAX_TOKENS
+
+        budget = int(estimate * MAX_TOKENS_MARGIN) + MAX_TOKENS_OVERHEAD
+        return max(MIN_MAX_TOKENS, min(budget, MAX_MAX_TOKENS))
+
+    def _chat(self, messages: List[Message], max_tokens: int, model: Optional[str] = None):
+        """
+        调用LLM并记录成本；输出因max_tokens被截断时加倍预算重试，避免丢题
+
+        每次请求的截止时间为 request_timeout 与文档剩余时间中较早者；超时时记录
+        deadline_misses 并抛出 DeadlineExceeded。
+
+        Args:
+            messages: 消息列表
+            max_tokens: 初始输出token上限
+            model: 使用的模型（默认为默认模型）
+
+        Returns:
+            LLMResponse: 最终响应
+        """
+        while True:
+            response = self._chat_with_deadline(messages, model=model, temperature=0.3, max_tokens=max_tokens)
+            cost = self._response_cost(response, model)
+            self._local.cost = getattr(self._local, 'cost', 0.0) + cost
+            with self._lock:
+                self.last_usage = response.usage
+                self.total_cost += cost
+                total_cost = self.total_cost
+            DEFAULT_METRICS.count("llm_cost_usd", cost, provider=self.provider_name,
+                                  model=model or self.llm.get_default_model())
+            print(f"    本次调用成本: ${cost:.4f}, 累计成本: ${total_cost:.4f}")
+            print(f"    Token使用: {response.usage}（max_tokens={max_tokens}）")
+
+            completion_tokens = response.usage.get("completion_tokens", 0)
+            # 仅当确实是我们给的预算导致截断时才重试（部分服务商忽略max_tokens参数）
+            if not response.truncated or completion_tokens < max_tokens * 0.9:
+                break
+            if max_tokens >= MAX_MAX_TOKENS:
+                print(f"    ⚠ 输出在max_tokens={max_tokens}处被截断，结果可能不完整")
+                break
+            max_tokens = min(max_tokens * 2, MAX_MAX_TOKENS)
+            print(f"    ⚠ 输出被截断，以max_tokens={max_tokens}重试...")
+
+        self._last_output_tokens = response.usage.get("completion_tokens") or self._last_output_tokens
+        return response
+
+    def _response_cost(self, response: LLMResponse, model: Optional[str] = None) -> float:
+        """一次调用的成本（共享其他并发请求结果的调用没有产生费用）"""
+        if response.shared:
+            return 0.0
+        return self.llm.estimate_cost(response.usage, model)
+
+    def _chat_with_deadline(self, messages: List[Message], **kwargs):
+        """在请求级截止时间内调用LLM，超时时记录到 deadline_misses，取消时抛出 Cancelled"""
+        deadline = self.deadline.child(self.request_timeout, scope="request")
+        tags = {"provider": self.provider_name, "model": kwargs.get("model") or self.llm.get_default_model()}
+        try:
+            with span("llm", **tags), deadline.activate():
+                response = self.llm.chat(messages, deadline=deadline, **kwargs)
+            # 拆分LLM调用耗时：排队（并发名额/密钥）、消息编码、网络
+            for name, seconds in response.timings.items():
+                DEFAULT_METRICS.record(f"llm_{name}", seconds, **tags)
+            if not response.shared:
+                for kind in ("prompt_tokens", "completion_tokens"):
+                    DEFAULT_METRICS.count("llm_tokens", response.usage.get(kind, 0), kind=kind, **tags)
+            return response
+        except Exception as e:
+            exceeded = deadline.wrap_error(e)
+            if exceeded is None:
+                raise
+            if isinstance(exceeded, DeadlineExceeded):
+                self.record_deadline_miss(exceeded.scope)
+                print(f"    ⚠ {exceeded}")
+            if exceeded is e:
+                raise
+            raise exceeded from e
+
+    def record_deadline_miss(self, scope: str):
+        """记录一次截止时间超时（scope: request/document）"""
+        with self._lock:
+            self.deadline_misses[scope] = self.deadline_misses.get(scope, 0) + 1
+        DEFAULT_METRICS.count("deadline_misses", scope=scope)
+
+    def _run_routed(self, label: str, features: Dict, run) -> List[Dict]:
+        """
+        按模型路由执行一次提取：先按页面复杂度选择模型，便宜模型结果校验失败时升级到强模型重试
+
+        Args:
+            label: 页面/批次标识（记录路由决策用）
+            features: 页面特征（见 ModelRouter.score）
+            run: 执行提取的函数 run(model) -> (题目列表, LLMResponse)
+
+        Returns:
+            List[Dict]: 题目列表
+        """
+        if self.router is None:
+            questions, _ = run(None)
+            return questions
+
+        decision = self.router.choose(features)
+        print(f"    模型路由: {decision['model']}（{decision['tier']}，复杂度 {decision['score']:.2f}：{decision['reason']}）")
+        while True:
+            self._local.cost = 0.0
+            start = time.perf_counter()
+            questions, response = run(decision['model'])
+            problem = self._validate_questions(questions, response, features)
+            self.router.record(label, decision, self._local.cost, time.perf_counter() - start, problem)
+
+            if not problem:
+                return questions
+            if decision['tier'] == 'strong':
+                print(f"    ⚠ 结果校验失败（{problem}）")
+                return questions
+            print(f"    ⚠ 结果校验失败（{problem}），升级到强模型 {self.router.strong_model} 重试...")
+            decision = self.router.escalate(decision, problem)
+
+    def _validate_questions(self, questions: List[Dict], response, features: Dict) -> Optional[str]:
+        """
+        校验提取结果，返回失败原因（通过时返回None）
+
+        结果为空只在文本层/页面分类显示有题号或选项标记时才算失败：
+        说明页、答题卡等本就没有题目的页面不必再交给强模型重试。
+        """
+        if response.truncated:
+            return "输出被截断"
+        if not questions:
+            return "未解析出题目" if self.router.expects_questions(features) else None
+        for q in questions:
+            if not q.get('question_text'):
+                return "题干为空"
+            if q.get('question_type') not in ("single_choice", "multiple_choice"):
+                return f"题型无效: {q.get('question_type')}"
+            if len(q.get('options') or []) < 2:
+                return "选项不足"
+        return None
+
+    def extract_from_page_text(self, text: str, page_num: int) -> List[Dict]:
+        """
+        从单页文本提取题目（混合模式下的纯文本页）
+
+        Args:
+            text: 页面文本层内容
+            page_num: 页码
+
+        Returns:
+            List[Dict]: 题目列表（带page_number）
+        """
+        questions = self._extract_single_batch(text)
+
+        for q in questions:
+            q['page_number'] = page_num
+
+        return questions
+
+    def merge_tile_questions(self, tile_questions: List[List[Dict]]) -> List[Dict]:
+        """
+        合并同一页各分块的识别结果，去除重叠区域中重复识别的题目
+
+        相邻分块重叠处的题目可能被识别两次（或在一块中只识别出被切开的前半部分）：
+        规范化后题干相同、或一方是另一方前缀的视为同一题，保留文字更完整的一个。
+
+        Args:
+            tile_questions: 按分块从上到下排列的题目列表
+
+        Returns:
+            List[Dict]: 合并后的题目列表
+        """
+        merged: List[Dict] = []
+        keys: List[str] = []
+        for questions in tile_questions:
+            for q in questions:
+                key = re.sub(r"[\s\W_]+", "", str(q.get('question_text') or ''))
+                duplicate = None
+                if key:
+                    for i, existing in enumerate(keys):
+                        if existing == key or (
+                            min(len(existing), len(key)) >= MIN_DEDUP_PREFIX and
+                            (key.startswith(existing) or existing.startswith(key))
+                        ):
+                            duplicate = i
+                            break
+                if duplicate is None:
+                    merged.append(q)
+                    keys.append(key)
+                elif len(key) > len(keys[duplicate]) or (
+                    len(key) == len(keys[duplicate]) and
+                    len(q.get('options') or []) > len(merged[duplicate].get('options') or [])
+                ):
+                    merged[duplicate] = q
+                    keys[duplicate] = key
+        return merged
+
     def extract_from_image(self, image_path: str, context: str = "") -> List[Dict]:
         """
         从图片提取题目
@@ -149,8 +513,8 @@ class QuestionExtractor:
             )
         ]
 
-        response = self.llm.chat(messages, temperature=0.3, max_tokens=8000)
-        cost = self.llm.estimate_cost(response.usage)
+        response = self._chat_with_deadline(messages, temperature=0.3, max_tokens=8000)
+        cost = self._response_cost(response)
         self.total_cost += cost
         print(f"本次调用成本: ${cost:.4f}, 累计成本: ${self.total_cost:.4f}")
 
@@ -158,13 +522,34 @@ class QuestionExtractor:
 
         return questions
 
-    def extract_from_page_image(self, image_path: str, page_num: int) -> List[Dict]:
+    def extract_from_page_image(
+        self,
+        image: ImageInput,
+        page_num: int,
+        figure_regions: Optional[List[Dict]] = None,
+        offset: Tuple[int, int] = (0, 0),
+        text_blocks: Optional[List[Dict]] = None,
+        question_count: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        features: Optional[Dict] = None
+    ) -> List[Dict]:
         """
         从整页图片提取题目（带图片区域识别）
 
         Args:
-            image_path: 页面图片路径
+            image: 页面图片路径，或内存中的PNG字节
             page_num: 页码（用于上下文）
+            figure_regions: 本地检测到的候选图形区域（PDFParser.locate_figures 的结果）。
+                提供时模型只返回区域编号 figure_id，figure_bbox 由本地区域坐标填充
+            offset: 上传图片左上角在整页图上的像素坐标（裁掉页边后上传时不为0），
+                用于将区域坐标换算到上传图片上
+            text_blocks: 页面文本层文字块（PDFParser.get_text_blocks 的结果）。
+                提供时模型只返回文字块编号，题目文字由本地从文本层拼接（大幅减少输出token）；
+                为空（扫描件、无文本层）时使用普通整页识别
+            question_count: 按文本层估计的题目数，用于估算输出token预算（见 estimate_max_tokens）
+            max_tokens: 直接指定输出token上限（默认自动估算，被截断时自动加倍重试）
+            features: 页面特征（PDFParser.analyze_page 的结果），供模型路由打分；
+                默认由图形区域、文字块和题目数推断
 
         Returns:
             List[Dict]: 题目列表（包含figure_bbox信息）
@@ -179,7 +564,12 @@ class QuestionExtractor:
                 f"  - 智谱AI: glm-4v"
             )
 
-        prompt = self._build_page_vision_prompt(page_num)
+        if text_blocks:
+            prompt = self._build_page_layout_prompt(page_num, text_blocks, figure_regions, offset)
+        else:
+            prompt = self._build_page_vision_prompt(page_num, figure_regions, offset)
+        if self.response_format == "compact":
+            prompt += self._build_compact_format_rules(layout=bool(text_blocks))
 
         messages = [
             Message(
@@ -189,17 +579,31 @@ class QuestionExtractor:
             Message(
                 role=MessageRole.USER,
                 content=prompt,
-                images=[image_path]
+                images=[image]
             )
         ]
 
-        response = self.llm.chat(messages, temperature=0.3, max_tokens=16000)
-        cost = self.llm.estimate_cost(response.usage)
-        self.total_cost += cost
-        print(f"    本次调用成本: ${cost:.4f}, 累计成本: ${self.total_cost:.4f}")
-        print(f"    Token使用: {response.usage}")
+        if max_tokens is None:
+            max_tokens = self.estimate_max_tokens(question_count, layout=bool(text_blocks))
 
-        questions = self._parse_response(response.content)
+        def run(model):
+            response = self._chat(messages, max_tokens, model)
+            questions = self._parse_response(response.content)
+
+            if text_blocks:
+                self._rebuild_from_text_blocks(questions, text_blocks)
+
+            if figure_regions is not None:
+                self._resolve_figure_regions(questions, figure_regions)
+            return questions, response
+
+        features = dict(features or {}, vision=True)
+        features.setdefault("question_count", question_count)
+        if figure_regions is not None:
+            features.setdefault("figure_count", len(figure_regions))
+        if text_blocks and "text" not in features:
+            features["text"] = "\n".join(block['text'] for block in text_blocks)
+        questions = self._run_routed(f"第{page_num}页", features, run)
 
         # 为每道题添加页码信息
         for q in questions:
@@ -207,6 +611,29 @@ class QuestionExtractor:
 
         return questions
 
+    def _resolve_figure_regions(self, questions: List[Dict], figure_regions: List[Dict]):
+        """将模型返回的区域编号 figure_id 替换为本地检测的区域坐标"""
+        regions = {region['id']: region for region in figure_regions}
+
+        def resolve(item: Dict):
+            figure_id = str(item.get('figure_id') or '').strip().upper()
+            if figure_id.isdigit():
+                figure_id = f"F{figure_id}"
+            region = regions.get(figure_id)
+            if region:
+                item['has_figure'] = True
+                item['figure_bbox'] = list(region['bbox'])
+                item['figure_pdf_bbox'] = list(region['pdf_bbox'])
+            else:
+                # 未选择区域或编号无效：不裁剪
+                item['figure_id'] = None
+                item['figure_bbox'] = None
+
+        for q in questions:
+            resolve(q)
+            for option in q.get('options') or []:
+                resolve(option)
+
     def _build_text_extraction_prompt(self, text: str) -> str:
         """构建文本提取提示词"""
         return f"""
@@ -278,8 +705,19 @@ class QuestionExtractor:
 3. 必须返回有效的JSON格式
 """
 
-    def _build_page_vision_prompt(self, page_num: int) -> str:
-        """构建整页识别提示词（带图形区域检测）"""
+    def _build_page_vision_prompt(
+        self,
+        page_num: int,
+        figure_regions: Optional[List[Dict]] = None,
+        offset: Tuple[int, int] = (0, 0)
+    ) -> str:
+        """构建整页识别提示词（带图形区域检测）
+
+        提供 figure_regions 时，图形位置已由PDF结构确定，模型只需为题干/选项选择区域编号。
+        """
+        figure_field, option_figure_none, option_figure, figure_rules, option_figure_rule = \
+            self._build_figure_prompt_parts(figure_regions, offset)
+
         return f"""
 你正在分析第{page_num}页的试卷图片。请识别并提取所有题目。
 
@@ -291,19 +729,19 @@ class QuestionExtractor:
             "question_type": "single_choice/multiple_choice",
             "has_figure": true/false,
             "figure_description": "图形描述（如：流程图、几何图形等）",
-            "figure_bbox": [x1, y1, x2, y2],
+            {figure_field},
             "options": [
                 {{
                     "key": "A",
                     "text": "选项文字",
                     "has_figure": false,
-                    "figure_bbox": null
+                    {option_figure_none}
                 }},
                 {{
                     "key": "B",
                     "text": "选项文字",
                     "has_figure": true,
-                    "figure_bbox": [x1, y1, x2, y2]
+                    {option_figure}
                 }}
             ],
             "correct_answer": null,
@@ -322,16 +760,7 @@ class QuestionExtractor:
 重要说明：
 1. **has_figure字段**：仅当题目或选项包含真正的图片（图表、几何图形、流程图等）时设为true。纯文字内容设为false。
 
-2. **figure_bbox坐标**（⚠️ 重要）：
-   - 格式：[左上x, 左上y, 右下x, 右下y]
-   - **必须使用绝对像素坐标，不要使用归一化坐标！**
-   - 从图片左上角(0,0)开始计算
-   - 例如：如果图片宽度1600px，高度1200px，图形在图片中间位置(400, 300)到(800, 600)，
-     则返回 [400, 300, 800, 600]
-   - **不要**返回 [0.25, 0.25, 0.5, 0.5] 这样的归一化坐标
-   - **不要**返回 [250, 250, 500, 500] 这样基于1000范围的坐标
-   - 如果没有图片，设为null
-   - 坐标应尽量精确地框住图形区域，可以留10-20像素的边距
+{figure_rules}
 
 3. **question_type**：只能是 "single_choice"（单选）或 "multiple_choice"（多选）
 
@@ -339,7 +768,7 @@ class QuestionExtractor:
    - 如果图片中标注了答案，设置correct_answer
    - 如果没有答案，设为null
 
-5. **选项图片**：如果某个选项本身是一张图片（如图形选择题），为该选项设置has_figure=true和对应的figure_bbox
+5. **选项图片**：如果某个选项本身是一张图片（如图形选择题），{option_figure_rule}
 
 6. **JSON格式要求（非常重要！）**：
    - 必须返回完整的JSON，包含页面中的所有题目
@@ -351,24 +780,316 @@ class QuestionExtractor:
 请仔细分析图片，完整提取页面中的所有题目（不要省略）。必须返回完整、有效的JSON格式，包含所有题目，不使用注释或省略符号。
 """
 
-    def _parse_response(self, content: str) -> List[Dict]:
-        """解析LLM返回的JSON"""
-        try:
-            # 尝试提取JSON（有些LLM会在markdown代码块中返回）
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0]
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0]
+    def _build_page_layout_prompt(
+        self,
+        page_num: int,
+        text_blocks: List[Dict],
+        figure_regions: Optional[List[Dict]] = None,
+        offset: Tuple[int, int] = (0, 0)
+    ) -> str:
+        """构建文本层辅助识别提示词
+
+        页面文字已由PDF文本层给出并编号，模型只返回题目结构（题干/选项引用的文字块编号、
+        图形、题型等），不再转写文字，题目文字由 _rebuild_from_text_blocks 在本地拼接。
+        """
+        figure_field, option_figure_none, option_figure, figure_rules, option_figure_rule = \
+            self._build_figure_prompt_parts(figure_regions, offset)
+        block_lines = "\n".join(f"{block['id']}: {block['text']}" for block in text_blocks)
 
-            # 清理JSON：移除注释和不完整的内容
-            content = self._clean_json(content.strip())
+        return f"""
+你正在分析第{page_num}页的试卷图片。页面文字已从PDF文本层提取并按阅读顺序编号如下：
 
-            data = json.loads(content)
-            return data.get("questions", [])
-        except Exception as e:
-            print(f"解析LLM响应失败: {e}")
-            print(f"原始响应: {content[:500]}...")
+{block_lines}
+
+请结合图片识别页面中的所有题目，**不要转写文字**，只用文字块编号描述题目结构。
+
+返回JSON格式：
+{{
+    "questions": [
+        {{
+            "stem": ["B1", "B2"],
+            "question_type": "single_choice/multiple_choice",
+            "has_figure": true/false,
+            {figure_field},
+            "options": [
+                {{"key": "A", "blocks": ["B3"], "has_figure": false, {option_figure_none}}},
+                {{"key": "B", "blocks": ["B3"], "has_figure": true, {option_figure}}}
+            ],
+            "correct_answer": null,
+            "tags": {{
+                "company": [],
+                "question_type": [],
+                "subject": [],
+                "skill": []
+            }},
+            "difficulty": "easy/medium/hard"
+        }}
+    ]
+}}
+
+重要说明：
+1. **stem / blocks**：题干和选项所在的文字块编号，按顺序列出；连续的多个块可写成 "B3-B6"。
+   - 同一行有多个选项（如 "A. 1  B. 2  C. 3"）时，每个选项都引用这一行的编号即可，程序会自动按选项字母拆分
+   - 页眉、页脚、页码、答题说明等不属于题目的文字块不要引用
+   - 只有当内容不在上述文字块中（如图片里的文字、公式）时，才额外填写 "text" 字段给出文字
+
+{figure_rules}
+
+3. **question_type**：只能是 "single_choice"（单选）或 "multiple_choice"（多选）
+
+4. **答案处理**：如果图片中标注了答案，设置correct_answer；没有答案设为null
+
+5. **选项图片**：如果某个选项本身是一张图片（如图形选择题），{option_figure_rule}，blocks设为[]
+
+6. **JSON格式要求**：必须返回完整、有效的JSON，包含页面中的所有题目，不使用注释或省略号。
+"""
+
+    def _rebuild_from_text_blocks(self, questions: List[Dict], text_blocks: List[Dict]):
+        """根据模型返回的文字块编号，从文本层拼接题干和选项文字"""
+        texts = {block['id']: block['text'] for block in text_blocks}
+        order = [block['id'] for block in text_blocks]
+
+        for q in questions:
+            stem = self._join_block_texts(self._expand_block_ids(q.pop('stem', None), order), texts)
+            extra_text = q.pop('text', None)
+            q['question_text'] = stem or q.get('question_text') or extra_text
+
+            for option in q.get('options') or []:
+                key = str(option.get('key') or '').strip().upper()
+                option['key'] = key
+                block_text = self._join_block_texts(
+                    self._expand_block_ids(option.pop('blocks', None), order), texts
+                )
+                if block_text:
+                    option['text'] = self._split_option_text(block_text, key)
+                else:
+                    option['text'] = option.get('text') or ''
+
+    @staticmethod
+    def _expand_block_ids(ids, order: List[str]) -> List[str]:
+        """展开文字块编号列表，支持 "B3-B6" 区间写法和逗号分隔的字符串"""
+        if not ids:
             return []
+        if isinstance(ids, str):
+            ids = re.split(r"[,，\s]+", ids)
+
+        index = {block_id: i for i, block_id in enumerate(order)}
+        result = []
+        for item in ids:
+            item = str(item).strip().upper()
+            if not item:
+                continue
+            parts = [p.strip() for p in item.split('-', 1)]
+            parts = [p if p.startswith('B') else f"B{p}" for p in parts]
+            if len(parts) == 2 and parts[0] in index and parts[1] in index:
+                start, end = sorted((index[parts[0]], index[parts[1]]))
+                result.extend(order[start:end + 1])
+            elif parts[0] in index:
+                result.append(parts[0])
+        # 去重并保持顺序
+        return list(dict.fromkeys(result))
+
+    @staticmethod
+    def _join_block_texts(block_ids: List[str], texts: Dict[str, str]) -> str:
+        """拼接多行文字：中文换行处直接相连，西文单词之间补空格"""
+        result = ""
+        for block_id in block_ids:
+            text = texts.get(block_id, "")
+            if not text:
+                continue
+            if result and not (CJK_PATTERN.match(result[-1]) or CJK_PATTERN.match(text[0])):
+                result += " "
+            result += text
+        return result
+
+    @staticmethod
+    def _split_option_text(text: str, key: str) -> str:
+        """从选项所在行中截取指定选项字母的文字（一行包含多个选项时按选项标记拆分）"""
+        markers = list(OPTION_MARKER_PATTERN.finditer(text))
+        for i, marker in enumerate(markers):
+            if marker.group(1) != key:
+                continue
+            end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+            return text[marker.end():end].rstrip(" \t(（")
+        return text.strip()
+
+    def _build_figure_prompt_parts(
+        self,
+        figure_regions: Optional[List[Dict]] = None,
+        offset: Tuple[int, int] = (0, 0)
+    ) -> Tuple[str, str, str, str, str]:
+        """构建提示词中与图形位置相关的字段示例和规则（整页识别与文本层辅助识别共用）
+
+        Returns:
+            Tuple: (题干图形字段, 无图选项字段, 有图选项字段, 图形规则, 选项图片规则)
+        """
+        if figure_regions is not None:
+            figure_field = '"figure_id": "F1"'
+            option_figure_none = '"figure_id": null'
+            option_figure = '"figure_id": "F2"'
+            figure_rules = self._build_figure_region_rules(figure_regions, offset)
+            option_figure_rule = "为该选项设置has_figure=true和对应的figure_id"
+        else:
+            figure_field = '"figure_bbox": [x1, y1, x2, y2]'
+            option_figure_none = '"figure_bbox": null'
+            option_figure = '"figure_bbox": [x1, y1, x2, y2]'
+            figure_rules = """2. **figure_bbox坐标**（⚠️ 重要）：
+   - 格式：[左上x, 左上y, 右下x, 右下y]
+   - **必须使用绝对像素坐标，不要使用归一化坐标！**
+   - 从图片左上角(0,0)开始计算
+   - 例如：如果图片宽度1600px，高度1200px，图形在图片中间位置(400, 300)到(800, 600)，
+     则返回 [400, 300, 800, 600]
+   - **不要**返回 [0.25, 0.25, 0.5, 0.5] 这样的归一化坐标
+   - **不要**返回 [250, 250, 500, 500] 这样基于1000范围的坐标
+   - 如果没有图片，设为null
+   - 坐标应尽量精确地框住图形区域，可以留10-20像素的边距"""
+            option_figure_rule = "为该选项设置has_figure=true和对应的figure_bbox"
+
+        return figure_field, option_figure_none, option_figure, figure_rules, option_figure_rule
+
+    def _build_figure_region_rules(self, figure_regions: List[Dict], offset: Tuple[int, int] = (0, 0)) -> str:
+        """构建候选图形区域说明（区域由PDF结构检测得到，坐标换算到上传图片上）"""
+        if not figure_regions:
+            return """2. **figure_id**：本页没有检测到图形区域，所有figure_id都设为null。"""
+
+        dx, dy = offset
+        region_lines = "\n".join(
+            f"   - {region['id']}: {[region['bbox'][0] - dx, region['bbox'][1] - dy, region['bbox'][2] - dx, region['bbox'][3] - dy]}"
+            for region in figure_regions
+        )
+        return f"""2. **figure_id（图形区域编号）**：
+   本页已检测到以下候选图形区域（像素坐标 [左上x, 左上y, 右下x, 右下y]）：
+{region_lines}
+   - 不需要输出坐标，只需为包含图形的题干或选项填写对应的区域编号（如 "F1"）
+   - 每个区域最多对应一个题干或选项；不属于任何题目的区域忽略即可
+   - 如果没有图片，设为null"""
+
+    def _build_compact_format_rules(self, layout: bool = False) -> str:
+        """构建紧凑输出格式说明（追加在提示词末尾，覆盖上面示例中的字段名）
+
+        Args:
+            layout: 文本层辅助模式（题干/选项引用文字块编号）
+        """
+        if layout:
+            stem_field = '"s": ["B1", "B2"]'
+            option_text = '"b": ["B3"]'
+            text_rules = "   - s=stem（题干文字块编号），b=blocks（选项文字块编号），需要时 t=text"
+        else:
+            stem_field = '"t": "题目文字"'
+            option_text = '"t": "选项文字"'
+            text_rules = "   - t=question_text（题干）/ text（选项文字）"
+
+        return f"""
+
+## 输出格式（紧凑版，必须使用）
+为减少输出长度，请改用下面的缩写字段输出（含义与上面的字段一一对应）：
+{{"q": [{{{stem_field}, "y": "s", "f": "F1", "o": [{{"k": "A", {option_text}}}, {{"k": "B", {option_text}, "f": "F2", "c": 1}}], "a": "B", "g": [["企业"], ["题型"], ["学科"], ["技能"]], "d": "m"}}]}}
+
+字段说明：
+{text_rules}
+   - y=question_type："s"=single_choice，"m"=multiple_choice
+   - f=图形（figure_bbox 坐标数组或 figure_id 区域编号），有图形时才输出，has_figure 由是否有 f 决定
+   - o=options，k=key，c=is_correct：正确选项输出 "c": 1，错误选项省略 c
+   - a=correct_answer，e=explanation
+   - g=tags，按 [company, question_type, subject, skill] 顺序的四个数组
+   - d=difficulty："e"=easy，"m"=medium，"h"=hard
+   - 值为 null、false 或空数组的字段直接省略，不要输出
+"""
+
+    def _decode_compact(self, items: List) -> List[Dict]:
+        """将紧凑格式还原为标准题目字典（与 _build_compact_format_rules 对应）"""
+        questions = []
+        for item in items or []:
+            if not isinstance(item, dict):
+                continue
+            options = [opt for opt in item.get("o") or [] if isinstance(opt, dict)]
+            # 错误选项按省略规则不输出 c：题目给出了答案（a 或某个选项的 c）时，缺少 c 即为错误，
+            # 否则无从判断，保持 None
+            has_answer = bool(item.get("a")) or any(opt.get("c") for opt in options)
+            question = {
+                "question_text": item.get("t"),
+                "question_type": COMPACT_QUESTION_TYPES.get(item.get("y"), item.get("y")),
+                **self._decode_compact_figure(item.get("f")),
+                "options": [],
+                "correct_answer": item.get("a"),
+                "explanation": item.get("e"),
+                "tags": self._decode_compact_tags(item.get("g")),
+                "difficulty": COMPACT_DIFFICULTIES.get(item.get("d"), item.get("d")),
+            }
+            if "s" in item:
+                question["stem"] = item["s"]
+
+            for opt in options:
+                is_correct = opt.get("c")
+                if is_correct is None and has_answer:
+                    is_correct = False
+                option = {
+                    "key": opt.get("k"),
+                    "text": opt.get("t"),
+                    **self._decode_compact_figure(opt.get("f")),
+                    "is_correct": bool(is_correct) if is_correct is not None else None,
+                }
+                if "b" in opt:
+                    option["blocks"] = opt["b"]
+                question["options"].append(option)
+            questions.append(question)
+        return questions
+
+    @staticmethod
+    def _decode_compact_figure(value) -> Dict:
+        """紧凑格式的图形字段：坐标数组 -> figure_bbox，字符串 -> figure_id"""
+        return {
+            "has_figure": bool(value),
+            "figure_bbox": value if isinstance(value, list) and value else None,
+            "figure_id": value if isinstance(value, str) and value else None,
+        }
+
+    @staticmethod
+    def _decode_compact_tags(value) -> Dict:
+        """紧凑格式的标签：[company, question_type, subject, skill] 四个数组"""
+        if isinstance(value, dict):
+            return value
+        tags = {}
+        for name, tag_values in zip(COMPACT_TAG_FIELDS, value or []):
+            tags[name] = tag_values if isinstance(tag_values, list) else [tag_values]
+        for name in COMPACT_TAG_FIELDS:
+            tags.setdefault(name, [])
+        return tags
+
+    @staticmethod
+    def _is_compact_list(questions: List) -> bool:
+        """题目数组是否为紧凑格式（有缩写字段 y/o，没有标准字段 question_type）"""
+        return any(
+            isinstance(q, dict) and "question_type" not in q and ("y" in q or "o" in q)
+            for q in questions or []
+        )
+
+    def _parse_response(self, content: str) -> List[Dict]:
+        """解析LLM返回的JSON"""
+        with span("parse"):
+            try:
+                # 尝试提取JSON（有些LLM会在markdown代码块中返回）
+                if "```json" in content:
+                    content = content.split("```json")[1].split("```")[0]
+                elif "```" in content:
+                    content = content.split("```")[1].split("```")[0]
+
+                # 清理JSON：移除注释和不完整的内容
+                content = self._clean_json(content.strip())
+
+                data = json.loads(content)
+                if "questions" not in data and "q" in data:
+                    # 紧凑格式（见 _build_compact_format_rules）
+                    return self._decode_compact(data["q"])
+                questions = data.get("questions", [])
+                if self._is_compact_list(questions):
+                    # 直接返回了紧凑格式的题目数组（_clean_json 已包装为 questions）
+                    return self._decode_compact(questions)
+                return questions
+            except Exception as e:
+                print(f"解析LLM响应失败: {e}")
+                print(f"原始响应: {content[:500]}...")
+                return []
 
     def _clean_json(self, content: str) -> str:
         """清理JSON字符串，移除注释和不完整的内容"""
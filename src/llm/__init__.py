@@ -1,12 +1,31 @@
 """LLM模块"""
 
-from .base import BaseLLMProvider, Message, MessageRole, LLMResponse
+from .base import BaseLLMProvider, ProviderWrapper, Message, MessageRole, LLMResponse, ImageInput
 from .factory import LLMFactory
+from .key_pool import KeyPoolProvider
+from .concurrency import AIMDLimiter, AdaptiveConcurrencyProvider
+from .singleflight import SingleFlight, SingleFlightProvider, request_fingerprint
+from .http_clients import HTTPClientRegistry, get_http_client, configure_http_clients
+from .deadline import Deadline, DeadlineExceeded, Cancelled
 
 __all__ = [
     'BaseLLMProvider',
+    'ProviderWrapper',
     'Message',
     'MessageRole',
     'LLMResponse',
-    'LLMFactory'
+    'ImageInput',
+    'LLMFactory',
+    'KeyPoolProvider',
+    'AIMDLimiter',
+    'AdaptiveConcurrencyProvider',
+    'SingleFlight',
+    'SingleFlightProvider',
+    'request_fingerprint',
+    'HTTPClientRegistry',
+    'get_http_client',
+    'configure_http_clients',
+    'Deadline',
+    'DeadlineExceeded',
+    'Cancelled'
 ]
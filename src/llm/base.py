@@ -1,11 +1,16 @@
 """LLM提供商抽象基类"""
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Dict, Optional, Union
+from dataclasses import dataclass, field
 from enum import Enum
 
 
+# 图片输入：文件路径，或已编码的图片字节（PNG/JPEG等，内存渲染模式下使用）
+ImageInput = Union[str, bytes]
+
+
 class MessageRole(Enum):
     """消息角色"""
     SYSTEM = "system"
@@ -18,7 +23,7 @@ class Message:
     """统一的消息格式"""
     role: MessageRole
     content: str
-    images: Optional[List[str]] = None  # 图片路径或base64
+    images: Optional[List[ImageInput]] = None  # 图片路径或已编码的图片字节
 
 
 @dataclass
@@ -28,6 +33,16 @@ class LLMResponse:
     model: str
     usage: Dict[str, int]  # {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150}
     raw_response: Optional[Dict] = None  # 原始响应，用于调试
+    finish_reason: Optional[str] = None  # 结束原因（stop/length/max_tokens 等，统一为小写）
+    # 各环节耗时（秒）：encode 消息/图片编码，network SDK请求，queue_wait 等待并发名额/密钥
+    timings: Dict[str, float] = field(default_factory=dict)
+    # 是否共享了另一个相同并发请求的结果（请求合并）：usage 仍为实际用量，但这次调用没有产生费用
+    shared: bool = False
+
+    @property
+    def truncated(self) -> bool:
+        """输出是否因达到max_tokens而被截断"""
+        return self.finish_reason in ("length", "max_tokens")
 
 
 class BaseLLMProvider(ABC):
@@ -44,6 +59,51 @@ class BaseLLMProvider(ABC):
         self.api_key = api_key
         self.config = kwargs
 
+    @staticmethod
+    def _read_image_bytes(image: ImageInput) -> bytes:
+        """读取图片内容（路径则读文件，字节则直接返回）"""
+        if isinstance(image, (bytes, bytearray)):
+            return bytes(image)
+        with open(image, "rb") as img_file:
+            return img_file.read()
+
+    @staticmethod
+    def _guess_media_type(image: ImageInput, data: bytes) -> str:
+        """推断图片MIME类型（优先按文件头判断，其次按路径后缀）"""
+        if data.startswith(b"\x89PNG"):
+            return "image/png"
+        if data.startswith(b"\xff\xd8"):
+            return "image/jpeg"
+        if data.startswith(b"GIF8"):
+            return "image/gif"
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return "image/webp"
+
+        if isinstance(image, str):
+            media_type_map = {
+                ".jpg": "image/jpeg",
+                ".jpeg": "image/jpeg",
+                ".png": "image/png",
+                ".gif": "image/gif",
+                ".webp": "image/webp"
+            }
+            return media_type_map.get(Path(image).suffix.lower(), "image/jpeg")
+        return "image/png"
+
+    @staticmethod
+    def _apply_deadline(kwargs: Dict) -> Dict:
+        """
+        取出 deadline 参数（见 src.llm.deadline.Deadline），换算为SDK的单次请求超时
+
+        已取消或已超时时直接抛出异常，不再发送请求。
+        """
+        deadline = kwargs.pop("deadline", None)
+        if deadline is not None:
+            timeout = deadline.timeout()
+            if timeout is not None:
+                kwargs["timeout"] = timeout
+        return kwargs
+
     @abstractmethod
     def chat(
         self,
@@ -61,7 +121,7 @@ class BaseLLMProvider(ABC):
             model: 模型名称（如果为None，使用默认模型）
             temperature: 温度参数
             max_tokens: 最大token数
-            **kwargs: 其他模型特定参数
+            **kwargs: 其他模型特定参数（deadline: 截止时间，换算为本次请求的超时）
 
         Returns:
             LLMResponse: 统一的响应对象
@@ -79,14 +139,58 @@ class BaseLLMProvider(ABC):
         pass
 
     @abstractmethod
-    def estimate_cost(self, usage: Dict[str, int]) -> float:
+    def estimate_cost(self, usage: Dict[str, int], model: Optional[str] = None) -> float:
         """
         估算API调用成本（美元）
 
         Args:
             usage: token使用情况
+            model: 实际调用的模型（默认为默认模型）
 
         Returns:
             float: 成本（美元）
         """
         pass
+
+
+class ProviderWrapper(BaseLLMProvider):
+    """包装另一个提供商的基类（并发控制、请求合并等横切逻辑）
+
+    子类只需重写 chat；模型能力、默认模型和定价都委托给被包装的提供商。
+    """
+
+    def __init__(self, inner: BaseLLMProvider):
+        """
+        Args:
+            inner: 被包装的提供商
+        """
+        super().__init__(api_key=inner.api_key, **inner.config)
+        self.inner = inner
+
+    @property
+    def default_model(self) -> str:
+        """默认模型（与被包装的提供商一致）"""
+        return self.inner.default_model
+
+    def chat(
+        self,
+        messages: List[Message],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        """直接转发给被包装的提供商"""
+        return self.inner.chat(messages, model=model, temperature=temperature, max_tokens=max_tokens, **kwargs)
+
+    def supports_vision(self) -> bool:
+        """是否支持视觉输入"""
+        return self.inner.supports_vision()
+
+    def get_default_model(self) -> str:
+        """获取默认模型名称"""
+        return self.inner.get_default_model()
+
+    def estimate_cost(self, usage: Dict[str, int], model: Optional[str] = None) -> float:
+        """估算成本"""
+        return self.inner.estimate_cost(usage, model)
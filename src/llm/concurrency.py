@@ -0,0 +1,216 @@
+"""自适应并发控制（AIMD）"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.utils.metrics import DEFAULT_METRICS
+from .base import ProviderWrapper, BaseLLMProvider, Message, LLMResponse
+from .errors import is_rate_limit_error, retry_after
+from .deadline import Deadline
+
+
+class AIMDLimiter:
+    """加性增、乘性减（AIMD）的并发上限控制器
+
+    - 请求成功且延迟平稳：每完成约 limit 个请求，上限 +1（加性增）
+    - 被限流（429）或延迟突增（超过基线的 latency_tolerance 倍）：上限乘以 decrease（乘性减），
+      同一批在途请求只触发一次下调，避免一次限流风暴把上限压到最低
+    - 延迟基线为所有成功请求耗时的慢速指数滑动平均，突增的样本同样计入：上游延迟持续变化
+      （换了更慢的模型、所在区域变忙）后基线随之移动，不再判为突增，上限可以重新加性增长。
+      比较的是原始耗时而不是每token耗时：短输出的固定预填充/首token时间按token平摊后
+      数值很大，会被误判为突增
+
+    上限的整数部分每次变化（以及初始值）都输出到 concurrency_limit 仪表盘指标。
+    """
+
+    BASELINE_ALPHA = 0.1   # 延迟基线的平滑系数
+    WARMUP_SAMPLES = 5     # 收集足够样本后才做延迟突增判断
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        decrease: float = 0.5,
+        latency_tolerance: float = 2.0
+    ):
+        """
+        初始化并发控制器
+
+        Args:
+            initial: 初始并发上限
+            min_limit: 并发上限下限
+            max_limit: 并发上限上限
+            decrease: 限流/延迟突增时上限乘以的系数
+            latency_tolerance: 延迟超过基线的该倍数视为突增
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._in_flight = 0
+        self._baseline: Optional[float] = None
+        self._samples = 0
+        self._decrease_epoch = 0    # 每次下调后递增；下调前发出的请求不再触发下调
+        self._cond = threading.Condition()
+
+        self.successes = 0
+        self.throttled = 0
+        self.latency_spikes = 0
+        self.history: List[Dict] = []  # 上限变化记录
+        DEFAULT_METRICS.gauge("concurrency_limit", self.limit)
+
+    @property
+    def limit(self) -> int:
+        """当前并发上限"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """当前在途请求数"""
+        return self._in_flight
+
+    def acquire(self, deadline: Optional[Deadline] = None) -> int:
+        """
+        等待直到在途请求数低于上限，占用一个名额
+
+        Args:
+            deadline: 截止时间（等待期间超时或取消时抛出异常，不占用名额）
+
+        Returns:
+            int: 占用时的下调轮次（release 时传回）
+        """
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait(deadline.wait_timeout() if deadline is not None else None)
+            self._in_flight += 1
+            return self._decrease_epoch
+
+    def release(
+        self,
+        epoch: int,
+        latency: Optional[float] = None,
+        throttled: bool = False
+    ):
+        """
+        归还名额并根据结果调整上限
+
+        Args:
+            epoch: acquire 返回的下调轮次
+            latency: 请求耗时（秒，失败时为None）
+            throttled: 是否被限流
+        """
+        with self._cond:
+            self._in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                self._backoff(epoch, "限流")
+            elif latency is not None:
+                spike = (self._samples >= self.WARMUP_SAMPLES and
+                         latency > self._baseline * self.latency_tolerance)
+                self._samples += 1
+                self._baseline = latency if self._baseline is None else (
+                    self._baseline + self.BASELINE_ALPHA * (latency - self._baseline)
+                )
+                if spike:
+                    self.latency_spikes += 1
+                    self._backoff(epoch, f"延迟突增 {latency:.1f}s")
+                else:
+                    self.successes += 1
+                    # 加性增：每完成 limit 个成功请求，上限 +1
+                    self._set_limit(self._limit + 1 / self._limit, "")
+            self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        """当前状态（可作为监控指标输出）"""
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "successes": self.successes,
+                "throttled": self.throttled,
+                "latency_spikes": self.latency_spikes,
+                "latency_baseline": self._baseline,
+            }
+
+    def _backoff(self, epoch: int, reason: str):
+        """乘性减（同一轮在途请求只下调一次）"""
+        if epoch != self._decrease_epoch:
+            return
+        self._decrease_epoch += 1
+        self._set_limit(self._limit * self.decrease, reason)
+
+    def _set_limit(self, value: float, reason: str):
+        """更新上限并记录整数部分的变化"""
+        old = self.limit
+        self._limit = max(float(self.min_limit), min(value, float(self.max_limit)))
+        if self.limit != old:
+            self.history.append({"time": time.time(), "limit": self.limit, "reason": reason or "增加"})
+            DEFAULT_METRICS.gauge("concurrency_limit", self.limit)
+            if reason:
+                print(f"    ⚠ 并发上限下调: {old} → {self.limit}（{reason}）")
+
+
+class AdaptiveConcurrencyProvider(ProviderWrapper):
+    """用 AIMDLimiter 控制在途请求数的提供商包装
+
+    限流错误会反馈给控制器并在等待后重试（优先使用 retry-after），其他错误直接抛出。
+    """
+
+    def __init__(
+        self,
+        inner: BaseLLMProvider,
+        limiter: Optional[AIMDLimiter] = None,
+        max_retries: int = 5,
+        backoff: float = 2.0
+    ):
+        """
+        Args:
+            inner: 被包装的提供商
+            limiter: 并发控制器（默认使用默认参数新建）
+            max_retries: 限流后的最大重试次数
+            backoff: 限流重试的基础等待时间（秒，按重试次数指数增长）
+        """
+        super().__init__(inner)
+        self.limiter = limiter or AIMDLimiter()
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def chat(
+        self,
+        messages: List[Message],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        """在并发上限内发送请求，限流时反馈控制器并重试"""
+        deadline = kwargs.get("deadline")
+        queue_wait = 0.0
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            epoch = self.limiter.acquire(deadline)
+            queue_wait += time.perf_counter() - start
+            start = time.perf_counter()
+            try:
+                response = self.inner.chat(
+                    messages, model=model, temperature=temperature, max_tokens=max_tokens, **kwargs
+                )
+            except Exception as e:
+                throttled = is_rate_limit_error(e)
+                self.limiter.release(epoch, throttled=throttled)
+                if not throttled or attempt == self.max_retries:
+                    raise
+                delay = retry_after(e) or self.backoff * (2 ** attempt)
+                if deadline is not None:
+                    deadline.sleep(delay)
+                else:
+                    time.sleep(delay)
+                continue
+
+            self.limiter.release(epoch, latency=time.perf_counter() - start)
+            response.timings["queue_wait"] = response.timings.get("queue_wait", 0.0) + queue_wait
+            return response
@@ -0,0 +1,176 @@
+"""截止时间与取消 - 在提取流程中逐层传递"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from .errors import is_timeout_error
+
+
+# 截止时间范围的显示名称
+SCOPE_LABELS = {
+    "request": "单次请求",
+    "document": "文档",
+}
+
+
+_local = threading.local()  # 当前线程正在执行的请求的截止时间（见 Deadline.activate）
+
+
+def current_deadline() -> Optional["Deadline"]:
+    """当前线程正在执行的请求的截止时间（没有时返回None）"""
+    return getattr(_local, "deadline", None)
+
+
+class Cancelled(Exception):
+    """操作已被取消（Ctrl+C 或其他任务失败后主动取消）"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """超过截止时间"""
+
+    def __init__(self, scope: str, message: str = ""):
+        """
+        Args:
+            scope: 超时的截止时间范围（request 单次请求 / document 整个文档）
+            message: 说明
+        """
+        super().__init__(message or f"超过{SCOPE_LABELS.get(scope, scope)}截止时间")
+        self.scope = scope
+
+
+class Deadline:
+    """截止时间 + 取消信号
+
+    子截止时间（child）取自身时限与父截止时间中较早的一个，并共享父级的取消信号：
+    文档级截止时间下为每次请求派生请求级截止时间，取消文档会让所有请求尽快停止。
+
+    阻塞等待（并发名额、密钥冷却、等待合并请求的结果）按 POLL_INTERVAL 分段，
+    以便及时发现取消；已发出的HTTP请求以剩余时间作为SDK超时。SDK内部的重试
+    在发送前经HTTP客户端的请求钩子检查当前线程的截止时间（见 activate），
+    取消或超时后不再重发。
+    """
+
+    POLL_INTERVAL = 0.2  # 阻塞等待时检查取消信号的间隔（秒）
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        scope: str = "document",
+        parent: Optional["Deadline"] = None
+    ):
+        """
+        初始化截止时间
+
+        Args:
+            timeout: 时限（秒），None或<=0表示不限时（仍可被取消）
+            scope: 范围名称（request/document，超时时记录在 DeadlineExceeded.scope 中）
+            parent: 父截止时间
+        """
+        self.scope = scope
+        self.expires_at = time.monotonic() + timeout if timeout and timeout > 0 else None
+        self._cancel_event = parent._cancel_event if parent else threading.Event()
+
+        # 父截止时间更早时，以父级为准（超时归属父级范围）
+        if parent and parent.expires_at is not None and (
+                self.expires_at is None or parent.expires_at < self.expires_at):
+            self.expires_at = parent.expires_at
+            self.scope = parent.scope
+
+    def child(self, timeout: Optional[float], scope: str = "request") -> "Deadline":
+        """派生子截止时间（不晚于自身，共享取消信号）"""
+        return Deadline(timeout, scope=scope, parent=self)
+
+    def remaining(self) -> Optional[float]:
+        """剩余时间（秒，不限时返回None）"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """是否已超时"""
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已取消"""
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """取消（父子截止时间共享同一取消信号）"""
+        self._cancel_event.set()
+
+    def check(self):
+        """已取消时抛出 Cancelled，已超时时抛出 DeadlineExceeded"""
+        if self._cancel_event.is_set():
+            raise Cancelled("操作已取消")
+        if self.expired:
+            raise DeadlineExceeded(self.scope)
+
+    def timeout(self, default: Optional[float] = None) -> Optional[float]:
+        """
+        本次调用可用的超时时间（先检查取消和超时）
+
+        Args:
+            default: 不限时时返回的默认值
+
+        Returns:
+            float: 剩余时间与 default 中较小者（都没有时返回None）
+        """
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return remaining if default is None else min(remaining, default)
+
+    def wait_timeout(self, limit: Optional[float] = None) -> float:
+        """阻塞等待的单次时长：不超过剩余时间、limit 和 POLL_INTERVAL"""
+        return max(0.0, self.timeout(min(limit, self.POLL_INTERVAL) if limit is not None else self.POLL_INTERVAL))
+
+    def sleep(self, seconds: float):
+        """可被取消的 sleep，超过截止时间时抛出 DeadlineExceeded"""
+        end = time.monotonic() + seconds
+        while True:
+            left = end - time.monotonic()
+            if left <= 0:
+                break
+            self._cancel_event.wait(self.wait_timeout(left))
+        self.check()
+
+    def wait(self, event: threading.Event):
+        """等待事件，期间可被取消，超过截止时间时抛出 DeadlineExceeded"""
+        while not event.wait(self.wait_timeout()):
+            pass
+
+    @contextmanager
+    def activate(self):
+        """在当前线程内设为正在执行的请求的截止时间（供HTTP请求钩子检查）"""
+        previous = current_deadline()
+        _local.deadline = self
+        try:
+            yield self
+        finally:
+            _local.deadline = previous
+
+    def wrap_error(self, exc: BaseException) -> Optional[BaseException]:
+        """
+        将调用中的异常归因到截止时间
+
+        SDK会把请求钩子抛出的异常包装成自己的连接错误，因此已取消/已超时时
+        按截止时间的状态判断，而不只看异常类型。
+
+        Args:
+            exc: 调用中抛出的异常
+
+        Returns:
+            Cancelled/DeadlineExceeded: 因取消或超时失败时返回（已是这两类异常时原样返回），否则None
+        """
+        if isinstance(exc, (Cancelled, DeadlineExceeded)):
+            return exc
+        if self.cancelled:
+            return Cancelled("操作已取消")
+        if self.expired or is_timeout_error(exc):
+            return DeadlineExceeded(self.scope, f"{SCOPE_LABELS.get(self.scope, self.scope)}超时: {exc}")
+        return None
@@ -0,0 +1,133 @@
+"""LLM调用错误分类（不依赖具体SDK，按状态码、结构化错误码和错误信息判断）"""
+
+import re
+from typing import Optional, Set
+
+
+# 额度/余额耗尽的错误码（OpenAI、智谱AI、通义千问等，按完整错误码匹配，不区分大小写）
+QUOTA_CODES = frozenset({
+    "insufficient_quota",            # OpenAI 及兼容服务
+    "billing_hard_limit_reached",    # OpenAI: 达到账单上限
+    "1113",                          # 智谱AI: 账户欠费/余额不足
+    "arrearage",                     # 通义千问(DashScope): 账户欠费
+})
+
+# 额度/余额耗尽的错误信息（没有结构化错误码的服务，如 Claude 的 credit balance）
+QUOTA_PHRASES = (
+    "exceeded your current quota",
+    "credit balance is too low",
+    "余额不足",
+    "欠费",
+)
+
+# 限流的错误码
+RATE_LIMIT_CODES = frozenset({
+    "rate_limit_exceeded",    # OpenAI
+    "rate_limit_error",       # Claude
+    "1302",                   # 智谱AI: 并发数过高
+    "1303",                   # 智谱AI: 请求频率过高
+})
+
+# 通义千问(DashScope)的限流错误码前缀（Throttling.RateQuota、Throttling.AllocationQuota 等）
+RATE_LIMIT_CODE_PREFIXES = ("throttling",)
+
+# 限流的错误信息（状态码缺失时按信息判断）
+RATE_LIMIT_PHRASES = (
+    "rate limit",
+    "rate_limit",
+    "too many requests",
+)
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """读取异常中的HTTP状态码（没有时返回None）"""
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def error_codes(exc: BaseException) -> Set[str]:
+    """
+    读取异常中的错误码（小写）
+
+    结构化错误码来自 exc.code / exc.type 和响应体（exc.body 或 exc.body["error"]）中的
+    code / type；错误信息中的错误码按完整单词提取（如 "1113"、"Throttling.AllocationQuota"），
+    避免 "quota"、"1113" 之类的片段误匹配到无关的信息。
+    """
+    candidates = [getattr(exc, "code", None), getattr(exc, "type", None)]
+    body = getattr(exc, "body", None)
+    if isinstance(body, dict):
+        candidates += [body.get("code"), body.get("type")]
+        error = body.get("error")
+        if isinstance(error, dict):
+            candidates += [error.get("code"), error.get("type")]
+
+    codes = {str(code).lower() for code in candidates if isinstance(code, (str, int)) and not isinstance(code, bool)}
+    codes.update(token.strip(".") for token in re.findall(r"[\w.]+", str(exc).lower()))
+    codes.discard("")
+    return codes
+
+
+def _has_rate_limit_signal(codes: Set[str], message: str) -> bool:
+    """错误码或信息是否指向限流"""
+    if codes & RATE_LIMIT_CODES:
+        return True
+    if any(code.startswith(RATE_LIMIT_CODE_PREFIXES) for code in codes):
+        return True
+    return any(phrase in message for phrase in RATE_LIMIT_PHRASES)
+
+
+def _has_quota_signal(codes: Set[str], message: str) -> bool:
+    """错误码或信息是否指向额度/余额耗尽"""
+    if codes & QUOTA_CODES:
+        return True
+    return any(phrase in message for phrase in QUOTA_PHRASES)
+
+
+def is_quota_error(exc: BaseException) -> bool:
+    """
+    是否为额度/余额耗尽（该密钥短时间内不会恢复，应隔离）
+
+    402，或带有额度耗尽错误码/信息的错误（OpenAI 的 insufficient_quota 也是429）。
+    同时带有限流标记的错误（如通义千问的 Throttling.AllocationQuota "Allocated quota
+    exceeded"）按限流处理：误把限流当作欠费会把可用的密钥长时间隔离。
+    """
+    codes, message = error_codes(exc), str(exc).lower()
+    if _has_rate_limit_signal(codes, message):
+        return False
+    if status_code(exc) == 402:
+        return True
+    return _has_quota_signal(codes, message)
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """是否为限流（稍后重试即可恢复）"""
+    codes, message = error_codes(exc), str(exc).lower()
+    if _has_rate_limit_signal(codes, message):
+        return True
+    if is_quota_error(exc):
+        return False
+    return status_code(exc) == 429
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """从响应头读取建议的重试等待时间（秒），没有时返回None"""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def is_timeout_error(exc: BaseException) -> bool:
+    """是否为请求超时（连接/读取超时，各SDK的超时异常类名都包含 Timeout）"""
+    if isinstance(exc, TimeoutError):
+        return True
+    return any("Timeout" in cls.__name__ for cls in type(exc).__mro__)
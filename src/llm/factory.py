@@ -1,19 +1,29 @@
 """LLM工厂类"""
 
-from typing import Optional
+import importlib
+from typing import List, Optional, Union
 from .base import BaseLLMProvider
-from .providers.claude import ClaudeProvider
-from .providers.openai import OpenAIProvider
-from .providers.zhipu import ZhipuProvider
+from .key_pool import KeyPoolProvider
 
 
 class LLMFactory:
-    """LLM工厂类"""
+    """LLM工厂类
+
+    服务商按点分路径注册，只有在 create 用到时才导入对应模块和SDK：
+    导入 src.llm 不再加载 anthropic/openai/zhipuai，未安装的SDK也只影响对应的服务商。
+    """
 
     _providers = {
-        "claude": ClaudeProvider,
-        "openai": OpenAIProvider,
-        "zhipu": ZhipuProvider,  # 智谱AI原生SDK
+        "claude": f"{__package__}.providers.claude.ClaudeProvider",
+        "openai": f"{__package__}.providers.openai.OpenAIProvider",
+        "zhipu": f"{__package__}.providers.zhipu.ZhipuProvider",  # 智谱AI原生SDK
+    }
+
+    # 服务商SDK的安装包名（导入失败时提示）
+    _packages = {
+        "claude": "anthropic",
+        "openai": "openai",
+        "zhipu": "zhipuai",
     }
 
     @classmethod
@@ -34,7 +44,22 @@ class LLMFactory:
         Returns:
             BaseLLMProvider: LLM实例
         """
-        provider_class = cls._providers.get(provider_name.lower())
+        provider_class = cls.get_provider_class(provider_name)
+        return provider_class(api_key=api_key, **kwargs)
+
+    @classmethod
+    def get_provider_class(cls, provider_name: str) -> type:
+        """
+        获取服务商类（按需导入，导入后缓存）
+
+        Args:
+            provider_name: 服务商名称
+
+        Returns:
+            type: 服务商类
+        """
+        name = provider_name.lower()
+        provider_class = cls._providers.get(name)
 
         if not provider_class:
             raise ValueError(
@@ -42,18 +67,70 @@ class LLMFactory:
                 f"支持的服务商: {', '.join(cls._providers.keys())}"
             )
 
-        return provider_class(api_key=api_key, **kwargs)
+        if isinstance(provider_class, str):
+            module_path, _, class_name = provider_class.rpartition(".")
+            try:
+                module = importlib.import_module(module_path)
+            except ImportError as e:
+                package = cls._packages.get(name)
+                hint = f"，请安装: pip install {package}" if package else ""
+                raise ImportError(f"无法加载LLM服务商 {name}（{e}）{hint}") from e
+            provider_class = getattr(module, class_name)
+            if not (isinstance(provider_class, type) and issubclass(provider_class, BaseLLMProvider)):
+                raise TypeError(f"{provider_class} 必须继承 BaseLLMProvider")
+            cls._providers[name] = provider_class
+
+        return provider_class
+
+    @classmethod
+    def create_pool(
+        cls,
+        provider_name: str,
+        api_keys: List[str],
+        base_urls: Optional[List[str]] = None,
+        cooldown: float = 10.0,
+        **kwargs
+    ) -> BaseLLMProvider:
+        """
+        创建多密钥LLM实例（每个密钥一个独立客户端，请求按负载分摊）
+
+        Args:
+            provider_name: 服务商名称
+            api_keys: API密钥列表
+            base_urls: 与密钥一一对应的API端点（只给一个时所有密钥共用）
+            cooldown: 密钥被限流后的默认冷却时间（秒）
+            **kwargs: 额外配置（同 create）
+
+        Returns:
+            BaseLLMProvider: 只有一个密钥时返回普通实例，否则返回 KeyPoolProvider
+        """
+        if not api_keys:
+            raise ValueError("至少需要一个API密钥")
+        if base_urls and len(base_urls) not in (1, len(api_keys)):
+            raise ValueError(f"base_urls 数量（{len(base_urls)}）必须为1或与密钥数量（{len(api_keys)}）一致")
+
+        providers = []
+        for i, api_key in enumerate(api_keys):
+            config = dict(kwargs)
+            if base_urls:
+                config["base_url"] = base_urls[i if len(base_urls) > 1 else 0]
+            providers.append(cls.create(provider_name, api_key, **config))
+
+        if len(providers) == 1:
+            return providers[0]
+        return KeyPoolProvider(providers, cooldown=cooldown)
 
     @classmethod
-    def register_provider(cls, name: str, provider_class: type):
+    def register_provider(cls, name: str, provider_class: Union[type, str]):
         """
         注册新的LLM服务商
 
         Args:
             name: 服务商名称
-            provider_class: 服务商类（必须继承BaseLLMProvider）
+            provider_class: 服务商类（必须继承BaseLLMProvider），
+                或其点分路径（如 "mypkg.providers.MyProvider"，首次 create 时才导入）
         """
-        if not issubclass(provider_class, BaseLLMProvider):
+        if not isinstance(provider_class, str) and not issubclass(provider_class, BaseLLMProvider):
             raise TypeError(f"{provider_class} 必须继承 BaseLLMProvider")
 
         cls._providers[name.lower()] = provider_class
@@ -62,3 +139,7 @@ class LLMFactory:
     def list_providers(cls) -> list:
         """列出所有支持的服务商"""
         return list(cls._providers.keys())
+
+
+# 录制/回放（离线重跑）不是真实服务商，通过扩展接口注册
+LLMFactory.register_provider("replay", f"{__package__}.providers.replay.ReplayProvider")
@@ -0,0 +1,188 @@
+"""进程级HTTP客户端注册表 - 复用连接池和长连接"""
+
+import atexit
+import hashlib
+import importlib.util
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .deadline import current_deadline
+
+
+class HTTPClientRegistry:
+    """按 (服务商, 端点, 密钥) 复用带连接池的HTTP客户端
+
+    每次创建 QuestionExtractor / 服务商实例都会新建SDK客户端，默认各自持有独立连接池，
+    高并发下大量请求花在TCP/TLS握手上。注册表让同一进程内相同端点和密钥的SDK客户端
+    共用一个HTTP客户端：连接保持长连接，在请求之间复用；安装了 h2 时启用HTTP/2多路复用。
+
+    注册表不依赖具体的httpx实现：SDK各自的客户端类（如 anthropic.DefaultHttpxClient，
+    或 zhipuai 使用的 httpx.Client）由调用方传入，Limits/Timeout 从同一个包中获取。
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 600.0,
+        write_timeout: float = 30.0,
+        pool_timeout: float = 30.0,
+        http2: bool = True
+    ):
+        """
+        初始化注册表
+
+        Args:
+            max_connections: 每个客户端的最大连接数
+            max_keepalive_connections: 每个客户端保持的空闲长连接数
+            keepalive_expiry: 空闲长连接保留时间（秒）
+            connect_timeout: 建立连接超时（秒）
+            read_timeout: 读取响应超时（秒，非流式请求要等整个输出生成完，与SDK默认的600秒一致）
+            write_timeout: 发送请求超时（秒，包含上传图片）
+            pool_timeout: 等待连接池空闲连接的超时（秒）
+            http2: 是否启用HTTP/2（需要安装 h2，未安装时自动退回HTTP/1.1）
+        """
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, str, str], Any] = {}
+        self._options: Dict[str, Any] = {}
+        self._retired: List[Any] = []  # 配置变化前创建的客户端（持有者可能仍在使用，退出时关闭）
+        self.created = 0
+        self.reused = 0
+        self.configure(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            write_timeout=write_timeout,
+            pool_timeout=pool_timeout,
+            http2=http2
+        )
+
+    @property
+    def http2(self) -> bool:
+        """是否实际启用HTTP/2"""
+        return self._options["http2"] and importlib.util.find_spec("h2") is not None
+
+    def configure(self, **options):
+        """
+        更新连接池和超时配置
+
+        配置变化后，之后获取的客户端按新配置创建；已发出的客户端仍由持有者继续使用，
+        不立即关闭，而是在 close_all 时与当前客户端一起关闭（避免连接池泄漏）。
+
+        Args:
+            **options: 与 __init__ 同名的参数
+        """
+        with self._lock:
+            merged = {**self._options, **options}
+            if merged != self._options:
+                self._options = merged
+                self._retired.extend(self._clients.values())
+                self._clients.clear()
+
+    def get(self, provider: str, base_url: Optional[str], api_key: str, client_class: type):
+        """
+        获取（或创建）共享的HTTP客户端
+
+        Args:
+            provider: 服务商名称
+            base_url: API端点（None表示SDK默认端点）
+            api_key: API密钥（只以哈希形式参与键值，不保存原文）
+            client_class: SDK使用的httpx客户端类
+
+        Returns:
+            共享的HTTP客户端，可作为SDK的 http_client 参数
+        """
+        key_hash = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16] if api_key else ""
+        cache_key = (provider, base_url or "", key_hash)
+
+        with self._lock:
+            client = self._clients.get(cache_key)
+            if client is not None and not client.is_closed:
+                self.reused += 1
+                return client
+
+            client = self._build(client_class)
+            self._clients[cache_key] = client
+            self.created += 1
+            return client
+
+    def _build(self, client_class: type):
+        """按当前配置创建客户端"""
+        httpx_module = self._httpx_module(client_class)
+        options = self._options
+        limits = httpx_module.Limits(
+            max_connections=options["max_connections"],
+            max_keepalive_connections=options["max_keepalive_connections"],
+            keepalive_expiry=options["keepalive_expiry"]
+        )
+        timeout = httpx_module.Timeout(
+            connect=options["connect_timeout"],
+            read=options["read_timeout"],
+            write=options["write_timeout"],
+            pool=options["pool_timeout"]
+        )
+        return client_class(
+            limits=limits,
+            timeout=timeout,
+            http2=self.http2,
+            event_hooks={"request": [_check_deadline]}
+        )
+
+    @staticmethod
+    def _httpx_module(client_class: type):
+        """找到客户端类所属的httpx包（SDK可能使用httpx或其分支）"""
+        for base in client_class.__mro__:
+            module = sys.modules.get(base.__module__.split(".")[0])
+            if module is not None and hasattr(module, "Limits") and hasattr(module, "Timeout"):
+                return module
+        raise TypeError(f"{client_class} 不是httpx客户端类")
+
+    def stats(self) -> Dict:
+        """客户端数量和复用次数"""
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "retired": len(self._retired),
+                "created": self.created,
+                "reused": self.reused,
+                "http2": self.http2
+            }
+
+    def close_all(self):
+        """关闭所有客户端，包括配置变化前创建的（进程退出时调用）"""
+        with self._lock:
+            clients = list(self._clients.values()) + self._retired
+            self._clients.clear()
+            self._retired = []
+        for client in clients:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+
+def _check_deadline(request):
+    """请求钩子：每次发送前（包括SDK内部重试）检查当前线程的截止时间"""
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check()
+
+
+# 进程级默认注册表
+DEFAULT_REGISTRY = HTTPClientRegistry()
+atexit.register(DEFAULT_REGISTRY.close_all)
+
+
+def get_http_client(provider: str, base_url: Optional[str], api_key: str, client_class: type):
+    """从默认注册表获取共享的HTTP客户端（参见 HTTPClientRegistry.get）"""
+    return DEFAULT_REGISTRY.get(provider, base_url, api_key, client_class)
+
+
+def configure_http_clients(**options):
+    """更新默认注册表的连接池和超时配置（参见 HTTPClientRegistry.configure）"""
+    DEFAULT_REGISTRY.configure(**options)
@@ -0,0 +1,170 @@
+"""API密钥池 - 同一服务商的多个密钥分摊请求"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .base import BaseLLMProvider, Message, LLMResponse
+from .errors import is_quota_error, is_rate_limit_error, retry_after
+from .deadline import Deadline
+
+
+@dataclass
+class KeySlot:
+    """密钥池中一个密钥的状态"""
+    provider: BaseLLMProvider
+    label: str                    # 脱敏后的密钥（日志用）
+    in_flight: int = 0            # 正在进行的请求数
+    cooldown_until: float = 0.0   # 限流冷却截止时间（time.monotonic）
+    quarantined: bool = False     # 额度耗尽，不再分配请求
+    calls: int = 0
+    rate_limited: int = 0
+    last_error: Optional[str] = None
+
+
+class KeyPoolProvider(BaseLLMProvider):
+    """多密钥LLM提供商
+
+    每个密钥（可搭配各自的base_url）对应一个独立的提供商实例和客户端，
+    请求分配给当前进行中请求最少的可用密钥：
+    - 限流（429）的密钥进入冷却期（优先使用响应头的 retry-after），请求换其他密钥重试
+    - 额度耗尽的密钥被隔离，不再分配请求
+    - 所有密钥都在冷却时等待最早结束的冷却期；全部被隔离时报错
+    """
+
+    def __init__(self, providers: List[BaseLLMProvider], cooldown: float = 10.0, max_attempts: Optional[int] = None):
+        """
+        初始化密钥池
+
+        Args:
+            providers: 每个密钥对应的提供商实例（同一服务商、同一默认模型）
+            cooldown: 限流后的默认冷却时间（秒，响应头没有 retry-after 时使用）
+            max_attempts: 单次请求最多尝试次数（默认为密钥数的3倍，至少10次）
+        """
+        if not providers:
+            raise ValueError("密钥池至少需要一个密钥")
+        super().__init__(api_key=None)
+        self.slots = [KeySlot(provider, self._mask(provider.api_key)) for provider in providers]
+        self.cooldown = cooldown
+        self.max_attempts = max_attempts or max(len(providers) * 3, 10)
+        self._cond = threading.Condition()
+
+    @property
+    def primary(self) -> BaseLLMProvider:
+        """第一个密钥的提供商（模型能力、定价以它为准）"""
+        return self.slots[0].provider
+
+    @property
+    def default_model(self) -> str:
+        """默认模型（与第一个密钥一致）"""
+        return self.primary.default_model
+
+    def chat(
+        self,
+        messages: List[Message],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        """选择负载最低的可用密钥发送请求，限流或额度耗尽时换密钥重试"""
+        last_error: Optional[BaseException] = None
+        deadline = kwargs.get("deadline")
+        queue_wait = 0.0
+        for _ in range(self.max_attempts):
+            start = time.perf_counter()
+            slot = self._acquire(deadline)
+            queue_wait += time.perf_counter() - start
+            try:
+                response = slot.provider.chat(
+                    messages, model=model, temperature=temperature, max_tokens=max_tokens, **kwargs
+                )
+            except Exception as e:
+                if not self._release(slot, e):
+                    raise
+                last_error = e
+                continue
+            self._release(slot)
+            response.timings["queue_wait"] = response.timings.get("queue_wait", 0.0) + queue_wait
+            return response
+
+        raise RuntimeError(f"密钥池重试 {self.max_attempts} 次仍失败: {last_error}") from last_error
+
+    def _acquire(self, deadline: Optional[Deadline] = None) -> KeySlot:
+        """取得负载最低的可用密钥（都在冷却时等待，等待可被截止时间/取消打断）"""
+        with self._cond:
+            while True:
+                active = [slot for slot in self.slots if not slot.quarantined]
+                if not active:
+                    raise RuntimeError("密钥池中所有密钥都因额度耗尽被隔离")
+
+                now = time.monotonic()
+                ready = [slot for slot in active if slot.cooldown_until <= now]
+                if ready:
+                    slot = min(ready, key=lambda s: (s.in_flight, s.calls))
+                    slot.in_flight += 1
+                    slot.calls += 1
+                    return slot
+
+                wait = min(slot.cooldown_until for slot in active) - now
+                self._cond.wait(deadline.wait_timeout(wait) if deadline is not None else wait)
+
+    def _release(self, slot: KeySlot, error: Optional[BaseException] = None) -> bool:
+        """
+        归还密钥并根据错误更新其状态
+
+        Returns:
+            bool: 错误是否可以换密钥重试（限流或额度耗尽）
+        """
+        with self._cond:
+            slot.in_flight -= 1
+            retryable = False
+            if error is not None:
+                slot.last_error = str(error)[:200]
+                if is_quota_error(error):
+                    slot.quarantined = True
+                    retryable = True
+                    print(f"    ⚠ 密钥 {slot.label} 额度耗尽，已隔离")
+                elif is_rate_limit_error(error):
+                    wait = retry_after(error) or self.cooldown
+                    slot.cooldown_until = time.monotonic() + wait
+                    slot.rate_limited += 1
+                    retryable = True
+                    print(f"    ⚠ 密钥 {slot.label} 被限流，冷却 {wait:.0f}s")
+            self._cond.notify_all()
+            return retryable
+
+    def stats(self) -> List[Dict]:
+        """各密钥的调用统计"""
+        with self._cond:
+            return [
+                {
+                    "key": slot.label,
+                    "calls": slot.calls,
+                    "in_flight": slot.in_flight,
+                    "rate_limited": slot.rate_limited,
+                    "quarantined": slot.quarantined,
+                    "last_error": slot.last_error,
+                }
+                for slot in self.slots
+            ]
+
+    def supports_vision(self) -> bool:
+        """是否支持视觉输入"""
+        return self.primary.supports_vision()
+
+    def get_default_model(self) -> str:
+        """获取默认模型名称"""
+        return self.primary.get_default_model()
+
+    def estimate_cost(self, usage: Dict[str, int], model: Optional[str] = None) -> float:
+        """估算成本（各密钥同一服务商，定价相同）"""
+        return self.primary.estimate_cost(usage, model)
+
+    @staticmethod
+    def _mask(api_key: Optional[str]) -> str:
+        """密钥脱敏：只保留末4位"""
+        if not api_key:
+            return "<none>"
+        return f"...{api_key[-4:]}"
@@ -1,6 +1,25 @@
-"""LLM提供商适配器"""
+"""LLM提供商适配器
 
-from .claude import ClaudeProvider
-from .openai import OpenAIProvider
+各适配器依赖对应服务商的SDK，按需导入：访问 ClaudeProvider 等属性时才加载对应模块。
+"""
 
-__all__ = ['ClaudeProvider', 'OpenAIProvider']
+import importlib
+
+_PROVIDER_MODULES = {
+    'ClaudeProvider': '.claude',
+    'OpenAIProvider': '.openai',
+    'ZhipuProvider': '.zhipu',
+    'ReplayProvider': '.replay',
+}
+
+__all__ = ['ClaudeProvider', 'OpenAIProvider', 'ZhipuProvider', 'ReplayProvider']
+
+
+def __getattr__(name):
+    """延迟导入适配器类（PEP 562）"""
+    module_name = _PROVIDER_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -2,9 +2,10 @@
 
 import anthropic
 import base64
-from pathlib import Path
+import time
 from typing import List, Optional, Dict
-from ..base import BaseLLMProvider, Message, LLMResponse, MessageRole
+from ..base import BaseLLMProvider, Message, LLMResponse, MessageRole, ImageInput
+from ..http_clients import get_http_client
 
 
 class ClaudeProvider(BaseLLMProvider):
@@ -24,7 +25,11 @@ class ClaudeProvider(BaseLLMProvider):
 
     def __init__(self, api_key: str, **kwargs):
         super().__init__(api_key, **kwargs)
-        self.client = anthropic.Anthropic(api_key=api_key)
+        # 同一进程内相同密钥的实例共用连接池（长连接、HTTP/2）
+        http_client = kwargs.get("http_client") or get_http_client(
+            "claude", None, api_key, anthropic.DefaultHttpxClient
+        )
+        self.client = anthropic.Anthropic(api_key=api_key, http_client=http_client, timeout=http_client.timeout)
         self.default_model = kwargs.get("default_model", "claude-3-5-sonnet-20241022")
 
     def chat(
@@ -38,9 +43,12 @@ class ClaudeProvider(BaseLLMProvider):
         """发送Claude API请求"""
 
         model = model or self.default_model
+        kwargs = self._apply_deadline(kwargs)
 
         # 转换消息格式
+        start = time.perf_counter()
         claude_messages = self._convert_messages(messages)
+        encode_seconds = time.perf_counter() - start
 
         # 提取system消息
         system_message = None
@@ -50,13 +58,16 @@ class ClaudeProvider(BaseLLMProvider):
                 break
 
         # 调用API
+        start = time.perf_counter()
         response = self.client.messages.create(
             model=model,
             max_tokens=max_tokens,
             temperature=temperature,
             system=system_message,
-            messages=claude_messages
+            messages=claude_messages,
+            **kwargs
         )
+        network_seconds = time.perf_counter() - start
 
         # 转换响应格式
         return LLMResponse(
@@ -67,7 +78,9 @@ class ClaudeProvider(BaseLLMProvider):
                 "completion_tokens": response.usage.output_tokens,
                 "total_tokens": response.usage.input_tokens + response.usage.output_tokens
             },
-            raw_response=response.model_dump() if hasattr(response, 'model_dump') else None
+            raw_response=response.model_dump() if hasattr(response, 'model_dump') else None,
+            finish_reason=response.stop_reason,
+            timings={"encode": encode_seconds, "network": network_seconds}
         )
 
     def _convert_messages(self, messages: List[Message]) -> List[dict]:
@@ -89,8 +102,8 @@ class ClaudeProvider(BaseLLMProvider):
 
             # 添加图片
             if msg.images:
-                for img_path in msg.images:
-                    content.append(self._encode_image(img_path))
+                for image in msg.images:
+                    content.append(self._encode_image(image))
 
             claude_messages.append({
                 "role": msg.role.value,
@@ -99,21 +112,13 @@ class ClaudeProvider(BaseLLMProvider):
 
         return claude_messages
 
-    def _encode_image(self, image_path: str) -> dict:
-        """编码图片为base64"""
-        with open(image_path, "rb") as img_file:
-            image_data = base64.standard_b64encode(img_file.read()).decode("utf-8")
+    def _encode_image(self, image: ImageInput) -> dict:
+        """编码图片为base64（支持文件路径或内存中的图片字节）"""
+        data = self._read_image_bytes(image)
+        image_data = base64.standard_b64encode(data).decode("utf-8")
 
         # 检测图片格式
-        suffix = Path(image_path).suffix.lower()
-        media_type_map = {
-            ".jpg": "image/jpeg",
-            ".jpeg": "image/jpeg",
-            ".png": "image/png",
-            ".gif": "image/gif",
-            ".webp": "image/webp"
-        }
-        media_type = media_type_map.get(suffix, "image/jpeg")
+        media_type = self._guess_media_type(image, data)
 
         return {
             "type": "image",
@@ -130,9 +135,9 @@ class ClaudeProvider(BaseLLMProvider):
     def get_default_model(self) -> str:
         return self.default_model
 
-    def estimate_cost(self, usage: Dict[str, int]) -> float:
+    def estimate_cost(self, usage: Dict[str, int], model: Optional[str] = None) -> float:
         """估算成本"""
-        model = self.default_model
+        model = model or self.default_model
         pricing = self.PRICING.get(model, self.PRICING["claude-3-5-sonnet-20241022"])
 
         input_cost = (usage["prompt_tokens"] / 1_000_000) * pricing["input"]
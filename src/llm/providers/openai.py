@@ -2,8 +2,10 @@
 
 import openai
 import base64
+import time
 from typing import List, Optional, Dict
 from ..base import BaseLLMProvider, Message, LLMResponse, MessageRole
+from ..http_clients import get_http_client
 
 
 class OpenAIProvider(BaseLLMProvider):
@@ -22,9 +24,16 @@ class OpenAIProvider(BaseLLMProvider):
 
     def __init__(self, api_key: str, **kwargs):
         super().__init__(api_key, **kwargs)
+        base_url = kwargs.get("base_url")  # 支持自定义base_url
+        # 同一进程内相同端点和密钥的实例共用连接池（长连接、HTTP/2）
+        http_client = kwargs.get("http_client") or get_http_client(
+            "openai", base_url, api_key, openai.DefaultHttpxClient
+        )
         self.client = openai.OpenAI(
             api_key=api_key,
-            base_url=kwargs.get("base_url")  # 支持自定义base_url
+            base_url=base_url,
+            http_client=http_client,
+            timeout=http_client.timeout
         )
         self.default_model = kwargs.get("default_model", "gpt-4o-mini")
 
@@ -39,11 +48,15 @@ class OpenAIProvider(BaseLLMProvider):
         """发送OpenAI API请求"""
 
         model = model or self.default_model
+        kwargs = self._apply_deadline(kwargs)
 
         # 转换消息格式
+        start = time.perf_counter()
         openai_messages = self._convert_messages(messages)
+        encode_seconds = time.perf_counter() - start
 
         # 调用API
+        start = time.perf_counter()
         response = self.client.chat.completions.create(
             model=model,
             messages=openai_messages,
@@ -51,6 +64,7 @@ class OpenAIProvider(BaseLLMProvider):
             max_tokens=max_tokens,
             **kwargs
         )
+        network_seconds = time.perf_counter() - start
 
         return LLMResponse(
             content=response.choices[0].message.content,
@@ -60,7 +74,9 @@ class OpenAIProvider(BaseLLMProvider):
                 "completion_tokens": response.usage.completion_tokens,
                 "total_tokens": response.usage.total_tokens
             },
-            raw_response=response.model_dump() if hasattr(response, 'model_dump') else None
+            raw_response=response.model_dump() if hasattr(response, 'model_dump') else None,
+            finish_reason=response.choices[0].finish_reason,
+            timings={"encode": encode_seconds, "network": network_seconds}
         )
 
     def _convert_messages(self, messages: List[Message]) -> List[dict]:
@@ -79,10 +95,11 @@ class OpenAIProvider(BaseLLMProvider):
 
             # 添加图片
             if msg.images:
-                for img_path in msg.images:
+                for image in msg.images:
+                    data = self._read_image_bytes(image)
+                    img_base64 = base64.standard_b64encode(data).decode("utf-8")
                     # 智谱AI GLM-4V: 直接使用base64，不需要data URI前缀
                     if "glm" in self.default_model.lower():
-                        img_base64 = self._encode_image(img_path)
                         content.append({
                             "type": "image_url",
                             "image_url": {
@@ -91,10 +108,11 @@ class OpenAIProvider(BaseLLMProvider):
                         })
                     else:
                         # OpenAI/Qwen等: 使用完整的data URI
+                        media_type = self._guess_media_type(image, data)
                         content.append({
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{self._encode_image(img_path)}"
+                                "url": f"data:{media_type};base64,{img_base64}"
                             }
                         })
 
@@ -109,11 +127,6 @@ class OpenAIProvider(BaseLLMProvider):
 
         return openai_messages
 
-    def _encode_image(self, image_path: str) -> str:
-        """编码图片为base64"""
-        with open(image_path, "rb") as img_file:
-            return base64.standard_b64encode(img_file.read()).decode("utf-8")
-
     def supports_vision(self) -> bool:
         """检查模型是否支持视觉输入"""
         model = self.default_model.lower()
@@ -134,8 +147,8 @@ class OpenAIProvider(BaseLLMProvider):
     def get_default_model(self) -> str:
         return self.default_model
 
-    def estimate_cost(self, usage: Dict[str, int]) -> float:
-        model = self.default_model
+    def estimate_cost(self, usage: Dict[str, int], model: Optional[str] = None) -> float:
+        model = model or self.default_model
         pricing = self.PRICING.get(model, self.PRICING["gpt-4o-mini"])
 
         input_cost = (usage["prompt_tokens"] / 1_000_000) * pricing["input"]
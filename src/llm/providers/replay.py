@@ -0,0 +1,241 @@
+"""录制/回放提供商 - 离线、确定性地重跑完整流程"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from ..base import BaseLLMProvider, LLMResponse, Message
+from ..singleflight import request_fingerprint
+
+
+REPLAY_MODES = ("record", "replay")
+
+
+class ReplayMissError(LookupError):
+    """回放文件中没有该请求的记录"""
+
+
+class ReplayProvider(BaseLLMProvider):
+    """录制真实服务商的请求和响应，之后按原始（或缩放的）延迟回放
+
+    - record: 包装真实服务商（inner），每次成功的调用追加一行JSONL：请求指纹、
+      响应内容、用量、结束原因、耗时，以及该模型的单价（回放时估算成本用）
+    - replay: 不访问网络，按请求指纹返回录制的响应，等待 录制耗时 × latency_scale
+
+    请求指纹与请求合并相同（src.llm.singleflight.request_fingerprint），但不含 max_tokens：
+    输出预算可能随并发完成顺序变化，截断后的加倍重试也与首次请求同一指纹。图片按内容
+    哈希计算，因此回放时页面的渲染参数（DPI、裁边、文本层辅助等）必须与录制时一致。
+    文件中不保存图片和提示词原文，只保存指纹。同一指纹录制了多次时按录制顺序轮流返回
+    （截断的响应之后是加倍预算重试的响应）。
+    """
+
+    def __init__(
+        self,
+        api_key: str = "",
+        mode: str = "replay",
+        path: str = "data/replay/llm_replay.jsonl",
+        inner: Optional[BaseLLMProvider] = None,
+        inner_provider: Optional[str] = None,
+        latency_scale: float = 1.0,
+        **kwargs
+    ):
+        """
+        初始化录制/回放提供商
+
+        Args:
+            api_key: 录制时传给 inner_provider 的API密钥（回放时不需要）
+            mode: record 录制 / replay 回放
+            path: 录制文件路径（JSONL，录制时追加写入）
+            inner: 录制时包装的真实服务商实例
+            inner_provider: 未提供 inner 时，录制用的服务商名称（由 LLMFactory 创建）
+            latency_scale: 回放延迟倍数（1为原始延迟，0为不等待）
+            **kwargs: 额外配置（default_model 等，录制时一并传给 inner_provider）
+        """
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"不支持的回放模式: {mode}，可选: {', '.join(REPLAY_MODES)}")
+
+        super().__init__(api_key, **kwargs)
+        self.mode = mode
+        self.path = path
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self.inner = None
+        self._pricing: Dict[str, Dict[str, float]] = {}  # 模型 -> 每百万token单价
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+        if mode == "record":
+            if inner is None:
+                if not inner_provider:
+                    raise ValueError("录制模式需要 inner 或 inner_provider")
+                from ..factory import LLMFactory
+                inner = LLMFactory.create(inner_provider, api_key, **kwargs)
+            self.inner = inner
+            self.default_model = inner.get_default_model()
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        else:
+            self._records: Dict[str, List[Dict]] = {}
+            self._next: Dict[str, int] = {}
+            self.default_model = kwargs.get("default_model")
+            self._load()
+
+    def _load(self):
+        """读取录制文件"""
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"回放文件不存在: {self.path}（先用 record 模式录制）")
+
+        with open(self.path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 录制中断时最后一行可能不完整
+                    print(f"  ⚠ 回放文件第{line_number}行无法解析，已跳过")
+                    continue
+                self._records.setdefault(record["fingerprint"], []).append(record)
+                if record.get("pricing"):
+                    self._pricing[record["model"]] = record["pricing"]
+                if self.default_model is None:
+                    self.default_model = record.get("default_model")
+
+        print(f"  回放文件: {self.path}（{sum(len(r) for r in self._records.values())} 条记录）")
+
+    def chat(
+        self,
+        messages: List[Message],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        """录制模式转发给真实服务商并记录；回放模式返回录制的响应"""
+        model = model or self.get_default_model()
+        request_kwargs = {name: value for name, value in kwargs.items() if name not in ("deadline", "timeout")}
+        # max_tokens 不参与指纹（见类说明），仍记录在文件中便于排查
+        fingerprint = request_fingerprint(messages, model, temperature, None, **request_kwargs)
+
+        if self.mode == "record":
+            return self._record(fingerprint, messages, model, temperature, max_tokens, **kwargs)
+        return self._replay(fingerprint, model, **kwargs)
+
+    def _record(self, fingerprint: str, messages: List[Message], model: str,
+                temperature: float, max_tokens: int, **kwargs) -> LLMResponse:
+        """调用真实服务商并追加一条记录（失败的调用不录制）"""
+        start = time.perf_counter()
+        response = self.inner.chat(messages, model=model, temperature=temperature, max_tokens=max_tokens, **kwargs)
+        latency = time.perf_counter() - start
+
+        record = {
+            "fingerprint": fingerprint,
+            "recorded_at": round(time.time(), 3),
+            "model": model,
+            "default_model": self.default_model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "latency": round(latency, 4),
+            "timings": {name: round(seconds, 4) for name, seconds in response.timings.items()},
+            "pricing": self._model_pricing(model),
+            "response": {
+                "content": response.content,
+                "model": response.model,
+                "usage": response.usage,
+                "finish_reason": response.finish_reason,
+            },
+        }
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.recorded += 1
+        return response
+
+    def _model_pricing(self, model: str) -> Dict[str, float]:
+        """真实服务商的单价（每百万token，美元），从 estimate_cost 反推"""
+        with self._lock:
+            pricing = self._pricing.get(model)
+        if pricing is None:
+            million = 1_000_000
+            pricing = {
+                "input": self.inner.estimate_cost(
+                    {"prompt_tokens": million, "completion_tokens": 0, "total_tokens": million}, model),
+                "output": self.inner.estimate_cost(
+                    {"prompt_tokens": 0, "completion_tokens": million, "total_tokens": million}, model),
+            }
+            with self._lock:
+                self._pricing[model] = pricing
+        return pricing
+
+    def _replay(self, fingerprint: str, model: str, **kwargs) -> LLMResponse:
+        """返回录制的响应，并按缩放后的录制耗时等待"""
+        deadline = kwargs.get("deadline")
+        kwargs = self._apply_deadline(kwargs)
+
+        with self._lock:
+            records = self._records.get(fingerprint)
+            if not records:
+                self.misses += 1
+                raise ReplayMissError(
+                    f"回放文件中没有该请求（模型 {model}，指纹 {fingerprint[:12]}）："
+                    f"请确认提示词、模型和页面渲染参数与录制时一致"
+                )
+            index = self._next.get(fingerprint, 0)
+            self._next[fingerprint] = index + 1
+            record = records[index % len(records)]
+            self.replayed += 1
+
+        start = time.perf_counter()
+        delay = record["latency"] * self.latency_scale
+        timeout = kwargs.get("timeout")
+        if timeout is not None and delay > timeout:
+            self._sleep(timeout, deadline)
+            raise TimeoutError(f"回放请求超时（录制耗时 {record['latency']:.1f}s，超时 {timeout:.1f}s）")
+        self._sleep(delay, deadline)
+
+        response = record["response"]
+        return LLMResponse(
+            content=response["content"],
+            model=response["model"],
+            usage=dict(response["usage"]),
+            finish_reason=response.get("finish_reason"),
+            timings={"network": time.perf_counter() - start}
+        )
+
+    @staticmethod
+    def _sleep(seconds: float, deadline=None):
+        """等待（有截止时间时可被取消）"""
+        if seconds <= 0:
+            return
+        if deadline is not None:
+            deadline.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+    def supports_vision(self) -> bool:
+        if self.inner is not None:
+            return self.inner.supports_vision()
+        return True
+
+    def get_default_model(self) -> str:
+        return self.default_model or ""
+
+    def estimate_cost(self, usage: Dict[str, int], model: Optional[str] = None) -> float:
+        if self.inner is not None:
+            return self.inner.estimate_cost(usage, model)
+
+        pricing = self._pricing.get(model or self.default_model)
+        if not pricing:
+            return 0.0
+        input_cost = (usage.get("prompt_tokens", 0) / 1_000_000) * pricing["input"]
+        output_cost = (usage.get("completion_tokens", 0) / 1_000_000) * pricing["output"]
+        return input_cost + output_cost
+
+    def stats(self) -> Dict:
+        """录制/回放/未命中次数"""
+        with self._lock:
+            return {"mode": self.mode, "recorded": self.recorded, "replayed": self.replayed, "misses": self.misses}
@@ -1,9 +1,12 @@
 """智谱AI原生SDK适配器"""
 
 import base64
+import time
 from typing import List, Optional, Dict
+import httpx
 from zhipuai import ZhipuAI
-from ..base import BaseLLMProvider, Message, LLMResponse, MessageRole
+from ..base import BaseLLMProvider, Message, LLMResponse, MessageRole, ImageInput
+from ..http_clients import get_http_client
 
 
 class ZhipuProvider(BaseLLMProvider):
@@ -26,7 +29,9 @@ class ZhipuProvider(BaseLLMProvider):
 
     def __init__(self, api_key: str, **kwargs):
         super().__init__(api_key, **kwargs)
-        self.client = ZhipuAI(api_key=api_key)
+        # 同一进程内相同密钥的实例共用连接池（长连接、HTTP/2）
+        http_client = kwargs.get("http_client") or get_http_client("zhipu", None, api_key, httpx.Client)
+        self.client = ZhipuAI(api_key=api_key, http_client=http_client, timeout=http_client.timeout)
         self.default_model = kwargs.get("default_model", "glm-4v")
 
     def chat(
@@ -40,6 +45,7 @@ class ZhipuProvider(BaseLLMProvider):
         """发送智谱AI API请求"""
 
         model = model or self.default_model
+        kwargs = self._apply_deadline(kwargs)
 
         # 智谱AI GLM-4V的max_tokens限制（根据官方文档）
         # GLM-4V: 最大输出约4096-8192（保守）
@@ -51,7 +57,9 @@ class ZhipuProvider(BaseLLMProvider):
             max_tokens = max_limit
 
         # 转换消息格式
+        start = time.perf_counter()
         zhipu_messages = self._convert_messages(messages)
+        encode_seconds = time.perf_counter() - start
 
         # 构建API参数（只包含必需参数，避免1210错误）
         api_params = {
@@ -69,7 +77,9 @@ class ZhipuProvider(BaseLLMProvider):
         api_params.update(kwargs)
 
         # 调用API
+        start = time.perf_counter()
         response = self.client.chat.completions.create(**api_params)
+        network_seconds = time.perf_counter() - start
 
         # 提取响应
         choice = response.choices[0]
@@ -83,7 +93,9 @@ class ZhipuProvider(BaseLLMProvider):
                 "completion_tokens": response.usage.completion_tokens,
                 "total_tokens": response.usage.total_tokens
             },
-            raw_response=response.model_dump() if hasattr(response, 'model_dump') else None
+            raw_response=response.model_dump() if hasattr(response, 'model_dump') else None,
+            finish_reason=choice.finish_reason,
+            timings={"encode": encode_seconds, "network": network_seconds}
         )
 
     def _convert_messages(self, messages: List[Message]) -> List[dict]:
@@ -129,8 +141,8 @@ class ZhipuProvider(BaseLLMProvider):
 
             # 智谱AI要求：图片必须在文本之前！
             # 先添加图片（智谱AI使用纯base64字符串，不需要data URI前缀）
-            for img_path in msg.images:
-                img_base64 = self._encode_image(img_path)
+            for image in msg.images:
+                img_base64 = self._encode_image(image)
                 content.append({
                     "type": "image_url",
                     "image_url": {
@@ -157,10 +169,9 @@ class ZhipuProvider(BaseLLMProvider):
 
         return zhipu_messages
 
-    def _encode_image(self, image_path: str) -> str:
-        """编码图片为base64"""
-        with open(image_path, "rb") as img_file:
-            return base64.b64encode(img_file.read()).decode("utf-8")
+    def _encode_image(self, image: ImageInput) -> str:
+        """编码图片为base64（支持文件路径或内存中的图片字节）"""
+        return base64.b64encode(self._read_image_bytes(image)).decode("utf-8")
 
     def supports_vision(self) -> bool:
         """检查模型是否支持视觉输入"""
@@ -171,9 +182,9 @@ class ZhipuProvider(BaseLLMProvider):
     def get_default_model(self) -> str:
         return self.default_model
 
-    def estimate_cost(self, usage: Dict[str, int]) -> float:
+    def estimate_cost(self, usage: Dict[str, int], model: Optional[str] = None) -> float:
         """估算成本（人民币）"""
-        model = self.default_model
+        model = model or self.default_model
         pricing = self.PRICING.get(model, self.PRICING["glm-4v"])
 
         # 智谱AI按千tokens计费
@@ -0,0 +1,179 @@
+"""请求合并（single-flight）- 相同的并发请求只发送一次"""
+
+import dataclasses
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from .base import ProviderWrapper, BaseLLMProvider, Message, LLMResponse
+from .deadline import Cancelled, Deadline, DeadlineExceeded
+
+
+def request_fingerprint(
+    messages: List[Message],
+    model: Optional[str],
+    temperature: float,
+    max_tokens: Optional[int],
+    **kwargs
+) -> str:
+    """
+    计算请求内容的指纹（相同指纹的请求会得到相同的结果）
+
+    图片按内容哈希参与计算，因此同一页图片出现在不同PDF、或以路径/字节两种形式传入时指纹相同。
+
+    Args:
+        messages: 消息列表
+        model: 实际使用的模型
+        temperature: 温度参数
+        max_tokens: 最大输出token（None表示不区分输出预算）
+        **kwargs: 其他请求参数（需可JSON序列化）
+
+    Returns:
+        str: sha256十六进制指纹
+    """
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "kwargs": kwargs,
+        "messages": [
+            {
+                "role": msg.role.value,
+                "content": msg.content,
+                "images": [
+                    hashlib.sha256(BaseLLMProvider._read_image_bytes(image)).hexdigest()
+                    for image in msg.images or []
+                ],
+            }
+            for msg in messages
+        ],
+    }
+    data = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    """一次进行中的请求"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.leader_deadline_error = False  # 失败是否源于执行者自己的截止时间（超时/取消）
+
+
+class SingleFlight:
+    """按键合并并发调用：同一键同时只执行一次，其余调用者等待并共享结果（或异常）
+
+    只合并"同时进行"的调用，结果不做持久缓存；调用结束后同一键会重新执行。
+    执行者因自己的截止时间超时或被取消而失败时，这个异常与等待者无关：等待者不共享它，
+    而是由其中一个接替执行（其余继续等待接替者的结果）。
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0   # 实际执行次数
+        self.shared = 0     # 共享其他调用结果的次数
+        self.takeovers = 0  # 执行者超时/取消后由等待者接替执行的次数
+
+    def do(self, key: str, fn: Callable[[], Any], deadline: Optional[Deadline] = None) -> Any:
+        """
+        执行 fn，或等待同一键正在进行的调用并返回其结果
+
+        Args:
+            key: 合并键
+            fn: 实际执行的调用
+            deadline: 本调用方的截止时间：等待其他调用结果时超时或取消只放弃等待，不影响正在执行的调用；
+                自己执行时，由它导致的失败不会共享给等待者
+
+        Returns:
+            Any: fn 的返回值（共享时为同一对象）
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is not None:
+                    leader = False
+                else:
+                    call = self._calls[key] = _Call()
+                    self.executed += 1
+                    leader = True
+
+            if leader:
+                return self._execute(key, call, fn, deadline)
+
+            if deadline is not None:
+                deadline.wait(call.done)
+            else:
+                call.done.wait()
+            with self._lock:
+                if call.error is not None and call.leader_deadline_error:
+                    # 执行者自己超时或被取消：接替执行（或等待其他等待者的接替结果）
+                    self.takeovers += 1
+                    continue
+                self.shared += 1
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+    def _execute(self, key: str, call: _Call, fn: Callable[[], Any], deadline: Optional[Deadline]) -> Any:
+        """作为执行者调用 fn，并把结果或异常交给等待者"""
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            call.leader_deadline_error = isinstance(e, (Cancelled, DeadlineExceeded)) or (
+                deadline is not None and deadline.wrap_error(e) is not None
+            )
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+# 进程内共享的默认分组：同一进程中的多个提取器/任务共享进行中的请求
+DEFAULT_GROUP = SingleFlight()
+
+
+class SingleFlightProvider(ProviderWrapper):
+    """合并相同并发请求的提供商包装
+
+    共享结果的调用方拿到的响应标记为 shared=True（这次调用没有产生费用，成本统计应计为0），
+    timings 为空（没有自己的网络请求）；usage 保留实际用量，截断判断等仍按真实输出token数进行。
+    """
+
+    def __init__(self, inner: BaseLLMProvider, group: Optional[SingleFlight] = None):
+        """
+        Args:
+            inner: 被包装的提供商
+            group: 合并分组（默认使用进程内共享的 DEFAULT_GROUP）
+        """
+        super().__init__(inner)
+        self.group = group or DEFAULT_GROUP
+
+    def chat(
+        self,
+        messages: List[Message],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        """相同请求进行中时等待并共享其结果"""
+        model = model or self.get_default_model()
+        # 截止时间不影响请求内容，不参与指纹计算
+        deadline = kwargs.pop("deadline", None)
+        key = request_fingerprint(messages, model, temperature, max_tokens, **kwargs)
+
+        owner = threading.get_ident()
+        result = self.group.do(key, lambda: (owner, self.inner.chat(
+            messages, model=model, temperature=temperature, max_tokens=max_tokens, deadline=deadline, **kwargs
+        )), deadline=deadline)
+        leader, response = result
+        if leader == owner:
+            return response
+        return dataclasses.replace(response, usage=dict(response.usage), timings={}, shared=True)
@@ -1,5 +1,6 @@
 """PDF解析模块"""
 
 from .pdf_parser import PDFParser
+from .render_cache import RenderCache
 
-__all__ = ['PDFParser']
+__all__ = ['PDFParser', 'RenderCache']
@@ -2,29 +2,104 @@
 
 import fitz  # PyMuPDF
 import hashlib
+import io
+import math
+import os
+import re
+import numpy as np
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, Union
+from PIL import Image
+from src.utils.metrics import span
+from .render_cache import RenderCache
+
+
+# 渲染颜色模式
+COLORSPACES = {
+    "rgb": fitz.csRGB,
+    "gray": fitz.csGRAY,
+}
+
+# 文本层中的选项标记（A. / B、/ C： / (D) 等）和题号（1. / 12、/ 第3题）
+OPTION_PATTERN = re.compile(r"(?m)(?:^|\s|\(|（)[A-H]\s*[\.．、:：\)）]")
+QUESTION_PATTERN = re.compile(r"(?m)^\s*(?:\d{1,3}\s*[\.．、\)）]|第\s*\d{1,3}\s*题)")
+
+# 非题目页关键词
+PAGE_KEYWORDS = {
+    "blank": ["空白页", "此页无试题", "此页为空", "本页无试题"],
+    "instruction": ["考试说明", "注意事项", "考生须知", "答题须知", "作答说明", "答题说明", "考试须知"],
+    "cover": ["准考证号", "考生姓名", "考试时间", "考试时长", "试卷类型", "密封线"],
+    "ad": ["扫码", "二维码", "关注公众号", "微信公众号", "添加微信", "课程咨询", "优惠", "报名热线"],
+}
+
+# analyze_page 结果中的原始PyMuPDF数据（供 locate_figures 复用），不随页面特征传给模型路由
+RAW_FEATURE_KEYS = ("image_infos", "drawings")
 
 
 class PDFParser:
     """PDF解析器 - 提取文本和图片"""
 
-    def __init__(self, image_output_dir: str = "data/images/questions"):
+    # 自适应DPI参数
+    MIN_DPI = 120
+    MAX_DPI = 300
+    DEFAULT_DPI = 200
+    DENSE_DPI = 220              # 矢量图/公式密集页面的最低DPI
+    TARGET_GLYPH_PX = 22         # 最小字号渲染后期望的像素高度
+    DENSE_DRAWING_COUNT = 200    # 矢量绘图路径数超过该值视为密集页面
+    MIN_IMAGE_AREA_RATIO = 0.05  # 嵌入图片占页面面积比例超过该值才参与DPI选择
+
+    # 本地图形定位参数（单位: PDF点）
+    MIN_FIGURE_SIZE = 15         # 图形区域最短边下限，过滤下划线、分隔线等
+    FIGURE_MERGE_GAP = 8         # 相距小于该值的绘图路径合并为同一图形
+    BACKGROUND_AREA_RATIO = 0.9  # 覆盖页面90%以上的图片视为背景/扫描底图
+
+    # 混合模式路由参数
+    MIN_TEXT_CHARS = 50          # 文本层字符数低于该值时走视觉识别
+    MAX_GARBLED_RATIO = 0.05     # 乱码字符比例超过该值视为文本层不可用
+
+    # 页边空白裁剪参数
+    MARGIN_INK_THRESHOLD = 235   # 任一通道低于该值视为内容
+    MARGIN_PADDING_PX = 16       # 内容边界外保留的像素
+
+    # 密集页面分块参数（单位: 像素）
+    TILE_MIN_QUESTIONS = 10      # 估计题目数达到该值时分块识别
+    TILE_QUESTIONS = 5           # 每块大约包含的题目数
+    MAX_TILES = 4
+    TILE_MIN_GAP_PX = 12         # 可作为切分位置的空白带最小高度
+    TILE_SEARCH_RATIO = 0.12     # 在目标切分位置上下该比例（占页面高度）范围内寻找空白带
+    TILE_OVERLAP_PX = 24         # 在空白带切分时相邻分块的重叠
+    TILE_FALLBACK_OVERLAP_RATIO = 0.06  # 找不到空白带硬切时的重叠（占页面高度）
+
+    def __init__(
+        self,
+        image_output_dir: str = "data/images/questions",
+        render_cache: Optional[RenderCache] = None,
+        render_cache_max_mb: int = 1024
+    ):
         """
         初始化PDF解析器
 
         Args:
             image_output_dir: 图片输出目录
+            render_cache: 页面渲染缓存（默认使用 image_output_dir/pages）
+            render_cache_max_mb: 默认渲染缓存的大小上限（MB）
         """
         self.image_output_dir = Path(image_output_dir)
         self.image_output_dir.mkdir(parents=True, exist_ok=True)
-
-    def extract_text(self, pdf_path: str) -> str:
+        self.render_cache = render_cache or RenderCache(
+            str(self.image_output_dir / "pages"),
+            max_bytes=render_cache_max_mb * 1024 * 1024
+        )
+        # 文件哈希缓存: (路径, mtime, 大小) -> 哈希，避免每页重复计算
+        self._hash_cache: Dict[Tuple[str, int, int], str] = {}
+
+    def extract_text(self, pdf_path: str, pages: Optional[List[int]] = None) -> str:
         """
         提取PDF中的所有文本
 
         Args:
             pdf_path: PDF文件路径
+            pages: 只提取这些页（页码从1开始，默认全部）
 
         Returns:
             str: 提取的文本内容
@@ -33,6 +108,8 @@ class PDFParser:
         text_content = []
 
         for page_num in range(len(doc)):
+            if pages is not None and page_num + 1 not in pages:
+                continue
             page = doc[page_num]
             text = page.get_text()
             if text.strip():
@@ -98,8 +175,19 @@ class PDFParser:
         Returns:
             str: 文件MD5哈希值
         """
-        with open(pdf_path, "rb") as f:
-            return hashlib.md5(f.read()).hexdigest()
+        stat = os.stat(pdf_path)
+        cache_key = (os.path.abspath(pdf_path), stat.st_mtime_ns, stat.st_size)
+        if cache_key in self._hash_cache:
+            return self._hash_cache[cache_key]
+
+        md5 = hashlib.md5()
+        with span("hash"), open(pdf_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                md5.update(chunk)
+
+        file_hash = md5.hexdigest()
+        self._hash_cache[cache_key] = file_hash
+        return file_hash
 
     def get_page_count(self, pdf_path: str) -> int:
         """
@@ -116,62 +204,739 @@ class PDFParser:
         doc.close()
         return page_count
 
-    def render_page_to_image(self, pdf_path: str, page_num: int, dpi: int = 200) -> str:
+    def analyze_page(self, page: "fitz.Page") -> Dict:
         """
-        将单页渲染为PNG图片
+        提取页面的本地特征（不调用LLM）
+
+        Args:
+            page: PyMuPDF页面对象
+
+        Returns:
+            Dict: 页面特征
+                {"text": 文本层内容, "text_chars": 文本层字符数, "min_font_size": 最小字号(pt),
+                 "option_count": 选项标记数, "question_marker_count": 题号数,
+                 "image_count": 嵌入图片数, "image_area_ratio": 图片面积占比,
+                 "image_dpi": 图片等效分辨率, "drawing_count": 矢量路径数,
+                 "image_infos": get_image_info 结果, "drawings": get_drawings 结果}
+                最后两项是原始数据，传给 locate_figures 可避免再次解析页面内容
+        """
+        page_area = max(page.rect.width * page.rect.height, 1.0)
+
+        # 文本层：字符数和最小字号（忽略<4pt的隐藏/噪声文本）
+        text_chars = 0
+        font_sizes = []
+        lines = []
+        for block in page.get_text("dict").get("blocks", []):
+            for line in block.get("lines", []):
+                line_text = "".join(text_span.get("text", "") for text_span in line.get("spans", []))
+                if line_text.strip():
+                    lines.append(line_text)
+                for text_span in line.get("spans", []):
+                    text = text_span.get("text", "").strip()
+                    if not text:
+                        continue
+                    text_chars += len(text)
+                    if text_span.get("size", 0) >= 4:
+                        font_sizes.append(text_span["size"])
+        text = "\n".join(lines)
+
+        # 嵌入图片：面积占比和按面积加权的等效DPI
+        image_area = 0.0
+        weighted_dpi = 0.0
+        image_infos = page.get_image_info()
+        for info in image_infos:
+            bbox = fitz.Rect(info["bbox"]) & page.rect
+            if bbox.is_empty or bbox.width <= 0:
+                continue
+            area = bbox.width * bbox.height
+            image_area += area
+            weighted_dpi += area * info["width"] / (bbox.width / 72)
+        drawings = page.get_drawings()
+
+        return {
+            "text": text,
+            "text_chars": text_chars,
+            "min_font_size": min(font_sizes) if font_sizes else None,
+            "option_count": len(OPTION_PATTERN.findall(text)),
+            "question_marker_count": len(QUESTION_PATTERN.findall(text)),
+            "image_count": len(image_infos),
+            "image_area_ratio": min(image_area / page_area, 1.0),
+            "image_dpi": weighted_dpi / image_area if image_area else None,
+            "drawing_count": len(drawings),
+            "image_infos": image_infos,
+            "drawings": drawings,
+        }
+
+    def choose_dpi(self, page: "fitz.Page", features: Optional[Dict] = None) -> int:
+        """
+        根据页面特征选择渲染DPI
+
+        规则：
+        1. 按最小字号计算，使最小的字渲染后约 TARGET_GLYPH_PX 像素高
+        2. 无文本层（扫描页）时按嵌入图片的原始分辨率渲染，不做无意义的放大
+        3. 含较大嵌入图片时，DPI不低于图片分辨率（最高到 DENSE_DPI）
+        4. 矢量绘图密集（几何图、公式）时不低于 DENSE_DPI
+        结果限制在 [MIN_DPI, MAX_DPI] 并取整到10的倍数（便于渲染缓存复用）
+
+        Args:
+            page: PyMuPDF页面对象
+            features: analyze_page 的结果（可选，避免重复计算）
+
+        Returns:
+            int: 渲染DPI
+        """
+        features = features or self.analyze_page(page)
+
+        if features["min_font_size"]:
+            dpi = self.TARGET_GLYPH_PX * 72 / features["min_font_size"]
+        elif features["image_dpi"]:
+            dpi = features["image_dpi"]
+        else:
+            dpi = self.DEFAULT_DPI
+
+        if features["image_dpi"] and features["image_area_ratio"] >= self.MIN_IMAGE_AREA_RATIO:
+            dpi = max(dpi, min(features["image_dpi"], self.DENSE_DPI))
+
+        if features["drawing_count"] >= self.DENSE_DRAWING_COUNT:
+            dpi = max(dpi, self.DENSE_DPI)
+
+        dpi = min(max(dpi, self.MIN_DPI), self.MAX_DPI)
+        return int(round(dpi / 10) * 10)
+
+    def measure_ink_density(self, page: "fitz.Page", dpi: int = 24) -> float:
+        """
+        低分辨率渲染页面，计算深色像素占比（用于识别空白页）
+
+        Args:
+            page: PyMuPDF页面对象
+            dpi: 检测用分辨率（很低即可）
+
+        Returns:
+            float: 深色像素比例 (0-1)
+        """
+        pix = self._render_pixmap(page, dpi, "gray")
+        pixels = np.frombuffer(pix.samples, dtype=np.uint8)
+        return float((pixels < 200).mean()) if pixels.size else 0.0
+
+    def classify_page(self, page: "fitz.Page", features: Optional[Dict] = None) -> Dict:
+        """
+        判断页面是否包含题目（封面、考试说明、空白页、广告页可跳过，不调用LLM）
+
+        判断顺序：
+        1. 文本层有选项标记（>=2个）或题号+选项 -> 题目页
+        2. 墨迹极少且几乎没有文字 -> 空白页
+        3. 文本层命中空白/说明/封面/广告关键词，且没有选项 -> 对应类型
+        4. 其他情况（包括没有文本层的扫描页）保守地视为题目页
+
+        Args:
+            page: PyMuPDF页面对象
+            features: analyze_page 的结果（可选）
+
+        Returns:
+            Dict: {"kind": "question/blank/instruction/cover/ad", "reason": 判断依据}
+        """
+        features = features or self.analyze_page(page)
+
+        if features["option_count"] >= 2:
+            return {"kind": "question", "reason": f"检测到{features['option_count']}个选项标记"}
+
+        if features["text_chars"] < 5:
+            ink_density = self.measure_ink_density(page)
+            if ink_density < 0.002:
+                return {"kind": "blank", "reason": f"几乎没有内容（墨迹占比{ink_density:.2%}）"}
+            return {"kind": "question", "reason": "无文本层，需视觉识别"}
+
+        text = features["text"]
+        for kind in ("blank", "instruction", "cover", "ad"):
+            matched = [keyword for keyword in PAGE_KEYWORDS[kind] if keyword in text]
+            if matched and not (kind != "blank" and features["question_marker_count"] >= 3):
+                return {"kind": kind, "reason": f"关键词: {', '.join(matched[:3])}，无选项"}
+
+        return {"kind": "question", "reason": "未命中非题目页规则"}
+
+    def filter_pages(
+        self,
+        pdf_path: str,
+        include_pages: Optional[List[int]] = None,
+        skip_pages: Optional[List[int]] = None
+    ) -> Tuple[List[int], List[Dict]]:
+        """
+        预筛选包含题目的页面
 
         Args:
             pdf_path: PDF文件路径
-            page_num: 页码（从0开始）
-            dpi: 渲染分辨率（默认200）
+            include_pages: 强制保留的页码（从1开始，优先级最高）
+            skip_pages: 强制跳过的页码（从1开始）
 
         Returns:
-            str: 图片保存路径
+            Tuple[List[int], List[Dict]]: (保留的页码列表, 跳过的页面报告)
+                报告格式: [{"page": 1, "kind": "cover", "reason": "..."}, ...]
         """
+        include_pages = set(include_pages or [])
+        skip_pages = set(skip_pages or [])
+
         doc = fitz.open(pdf_path)
-        page = doc[page_num]
+        kept, skipped = [], []
+        for page_num in range(len(doc)):
+            page_no = page_num + 1
+            if page_no in include_pages:
+                kept.append(page_no)
+                continue
+            if page_no in skip_pages:
+                skipped.append({"page": page_no, "kind": "manual", "reason": "手动指定跳过"})
+                continue
+
+            result = self.classify_page(doc[page_num])
+            if result["kind"] == "question":
+                kept.append(page_no)
+            else:
+                skipped.append({"page": page_no, **result})
+        doc.close()
 
-        # 计算缩放比例
-        zoom = dpi / 72
-        mat = fitz.Matrix(zoom, zoom)
-        pix = page.get_pixmap(matrix=mat)
+        return kept, skipped
+
+    def route_page(self, page: "fitz.Page", features: Optional[Dict] = None) -> Dict:
+        """
+        混合模式下为页面选择提取方式
+
+        - 文本层缺失、过短或乱码（字体编码损坏导致的替换字符/私用区字符）-> vision
+        - 页面包含图形区域（嵌入图片或矢量图形）-> vision
+        - 其余纯文本页 -> text（走便宜的文本提取）
+
+        Args:
+            page: PyMuPDF页面对象
+            features: analyze_page 的结果（可选）
+
+        Returns:
+            Dict: {"route": "text/vision", "reason": 判断依据}
+        """
+        features = features or self.analyze_page(page)
+
+        text = features["text"]
+        if features["text_chars"] < self.MIN_TEXT_CHARS:
+            return {"route": "vision", "reason": f"文本层过短（{features['text_chars']}字符）"}
+
+        garbled = sum(1 for ch in text if ch == "\ufffd" or "\ue000" <= ch <= "\uf8ff")
+        if garbled / max(len(text), 1) > self.MAX_GARBLED_RATIO:
+            return {"route": "vision", "reason": f"文本层乱码（{garbled}个异常字符）"}
+
+        figures = self.locate_figures(page, features=features)
+        if figures:
+            return {"route": "vision", "reason": f"包含{len(figures)}个图形区域"}
 
-        # 使用文件哈希生成唯一文件名
-        pdf_hash = self.get_file_hash(pdf_path)[:8]
-        image_filename = f"{pdf_hash}_page_{page_num + 1}.png"
+        return {"route": "text", "reason": "纯文本页"}
 
-        # 保存到pages子目录
-        pages_dir = self.image_output_dir / "pages"
-        pages_dir.mkdir(parents=True, exist_ok=True)
-        image_path = pages_dir / image_filename
+    def route_pages(self, pdf_path: str, pages: Optional[List[int]] = None) -> List[Dict]:
+        """
+        为每一页选择提取方式（见 route_page）
+
+        Args:
+            pdf_path: PDF文件路径
+            pages: 只处理这些页（页码从1开始，默认全部）
 
-        pix.save(str(image_path))
+        Returns:
+            List[Dict]: [{"page": 1, "route": "text", "reason": "...", "text": "页面文本"}, ...]
+        """
+        doc = fitz.open(pdf_path)
+        routes = []
+        for page_num in range(len(doc)):
+            if pages is not None and page_num + 1 not in pages:
+                continue
+            page = doc[page_num]
+            features = self.analyze_page(page)
+            routes.append({
+                "page": page_num + 1,
+                **self.route_page(page, features),
+                "text": features["text"]
+            })
         doc.close()
 
-        return str(image_path)
+        return routes
 
-    def render_all_pages(self, pdf_path: str, dpi: int = 200) -> List[Dict]:
+    def estimate_question_count(self, page: "fitz.Page", features: Optional[Dict] = None) -> Optional[int]:
         """
-        渲染所有页面为图片
+        根据文本层的题号和选项标记估计页面题目数（用于估算LLM输出长度）
+
+        Args:
+            page: PyMuPDF页面对象
+            features: analyze_page 的结果（可选，提供时复用其中的文本层）
+
+        Returns:
+            int: 估计的题目数；文本层过短（扫描件等）无法估计时返回None
+        """
+        text = features["text"] if features else page.get_text()
+        if len(text.strip()) < self.MIN_TEXT_CHARS:
+            return None
+        # 选项标记按每题4个折算，题号漏识别时仍能估出题量
+        return max(len(QUESTION_PATTERN.findall(text)), len(OPTION_PATTERN.findall(text)) // 4)
+
+    def locate_figures(
+        self,
+        page: "fitz.Page",
+        scale: Optional[float] = None,
+        features: Optional[Dict] = None
+    ) -> List[Dict]:
+        """
+        根据PDF结构定位页面中的候选图形区域（不依赖LLM猜测坐标）
+
+        栅格图片取自 get_image_info 的放置位置，矢量图形由 get_drawings 的路径
+        按间距聚类得到；两者相交或相邻时合并。区域按阅读顺序编号 F1, F2, ...
+
+        Args:
+            page: PyMuPDF页面对象
+            scale: 像素/PDF点比例（提供时同时返回渲染图上的像素坐标）
+            features: analyze_page 的结果（可选，提供时复用其中的图片信息和矢量路径）
+
+        Returns:
+            List[Dict]: 候选区域列表
+                [{"id": "F1", "kind": "image/drawing/mixed",
+                  "pdf_bbox": [x0, y0, x1, y1], "bbox": [x1, y1, x2, y2]}, ...]
+        """
+        page_rect = page.rect
+        page_area = max(page_rect.width * page_rect.height, 1.0)
+
+        # 栅格图片（跳过铺满页面的扫描底图/背景）
+        regions = []
+        image_infos = features["image_infos"] if features else page.get_image_info()
+        drawings = features["drawings"] if features else page.get_drawings()
+        for info in image_infos:
+            rect = self._clip_to_page(info["bbox"], page_rect)
+            if rect is None:
+                continue
+            if (rect[2] - rect[0]) * (rect[3] - rect[1]) >= self.BACKGROUND_AREA_RATIO * page_area:
+                continue
+            regions.append({"rect": rect, "kinds": {"image"}})
+
+        # 矢量绘图（跳过横贯页面的细线，如页眉线、分隔线）
+        # 注意：直线的矩形高或宽为0，fitz.Rect 会视为空矩形，因此这里用坐标元组计算
+        for drawing in drawings:
+            rect = self._clip_to_page(drawing["rect"], page_rect)
+            if rect is None:
+                continue
+            if rect[2] - rect[0] > 0.8 * page_rect.width and rect[3] - rect[1] < 3:
+                continue
+            regions.append({"rect": rect, "kinds": {"drawing"}})
+
+        regions = self._merge_regions(regions, self.FIGURE_MERGE_GAP)
+
+        figures = []
+        for region in regions:
+            x0, y0, x1, y1 = region["rect"]
+            if min(x1 - x0, y1 - y0) < self.MIN_FIGURE_SIZE:
+                continue
+            kinds = region["kinds"]
+            figures.append({
+                "kind": next(iter(kinds)) if len(kinds) == 1 else "mixed",
+                "pdf_bbox": [round(v, 1) for v in (x0, y0, x1, y1)]
+            })
+
+        # 按阅读顺序（从上到下、从左到右）编号
+        figures.sort(key=lambda f: (round(f["pdf_bbox"][1] / 10), f["pdf_bbox"][0]))
+        for index, figure in enumerate(figures, 1):
+            figure["id"] = f"F{index}"
+            if scale:
+                figure["bbox"] = [int(round(v * scale)) for v in figure["pdf_bbox"]]
+
+        return figures
+
+    @staticmethod
+    def _clip_to_page(bbox, page_rect: "fitz.Rect") -> Optional[Tuple[float, float, float, float]]:
+        """将矩形裁剪到页面范围内，完全在页面外时返回None"""
+        x0, y0 = max(bbox[0], page_rect.x0), max(bbox[1], page_rect.y0)
+        x1, y1 = min(bbox[2], page_rect.x1), min(bbox[3], page_rect.y1)
+        if x0 > x1 or y0 > y1:
+            return None
+        return (x0, y0, x1, y1)
+
+    @staticmethod
+    def _merge_regions(regions: List[Dict], gap: float) -> List[Dict]:
+        """合并相交或间距小于gap的矩形区域（重复扫描直到没有可合并的区域）"""
+        merged = True
+        while merged:
+            merged = False
+            clusters: List[Dict] = []
+            for region in sorted(regions, key=lambda r: r["rect"][1]):
+                x0, y0, x1, y1 = region["rect"]
+                for cluster in clusters:
+                    cx0, cy0, cx1, cy1 = cluster["rect"]
+                    if x0 - gap <= cx1 and cx0 <= x1 + gap and y0 - gap <= cy1 and cy0 <= y1 + gap:
+                        cluster["rect"] = (min(x0, cx0), min(y0, cy0), max(x1, cx1), max(y1, cy1))
+                        cluster["kinds"] |= region["kinds"]
+                        merged = True
+                        break
+                else:
+                    clusters.append({"rect": region["rect"], "kinds": set(region["kinds"])})
+            regions = clusters
+        return regions
+
+    def get_text_blocks(self, page: "fitz.Page", scale: Optional[float] = None) -> List[Dict]:
+        """
+        提取页面文本层的行级文字块（按阅读顺序编号 B1, B2, ...）
+
+        供"文本层辅助Vision"模式使用：模型只需按编号引用文字块返回题目结构，
+        题干和选项文字由本地根据文本层拼接，不再逐字转写。
+
+        Args:
+            page: PyMuPDF页面对象
+            scale: 像素/PDF点比例（提供时同时返回渲染图上的像素坐标）
+
+        Returns:
+            List[Dict]: 文字块列表
+                [{"id": "B1", "text": "1. 下列...", "pdf_bbox": [x0, y0, x1, y1], "bbox": [x1, y1, x2, y2]}, ...]
+        """
+        blocks = []
+        for block in page.get_text("dict", sort=True).get("blocks", []):
+            for line in block.get("lines", []):
+                text = "".join(text_span.get("text", "") for text_span in line.get("spans", [])).strip()
+                if not text:
+                    continue
+                entry = {
+                    "id": f"B{len(blocks) + 1}",
+                    "text": text,
+                    "pdf_bbox": [round(v, 1) for v in line["bbox"]]
+                }
+                if scale:
+                    entry["bbox"] = [int(round(v * scale)) for v in line["bbox"]]
+                blocks.append(entry)
+        return blocks
+
+    def render_page_to_image(
+        self,
+        pdf_path: str,
+        page_num: int,
+        dpi: int = 200,
+        colorspace: str = "rgb"
+    ) -> str:
+        """
+        将单页渲染为PNG图片（命中渲染缓存时直接复用）
 
         Args:
             pdf_path: PDF文件路径
+            page_num: 页码（从0开始）
             dpi: 渲染分辨率（默认200）
+            colorspace: 颜色模式（rgb/gray）
 
         Returns:
-            List[Dict]: 包含页码和图片路径的列表
-                [{"page": 1, "image_path": "xxx.png"}, ...]
+            str: 图片保存路径
         """
+        pdf_hash = self.get_file_hash(pdf_path)
+
         doc = fitz.open(pdf_path)
-        page_count = len(doc)
+        image_path = self._render_to_cache(doc[page_num], pdf_hash, page_num, dpi, colorspace)
+        doc.close()
+
+        return image_path
+
+    def render_page_to_bytes(
+        self,
+        pdf_path: str,
+        page_num: int,
+        dpi: int = 200,
+        colorspace: str = "rgb",
+        use_cache: bool = False
+    ) -> bytes:
+        """
+        将单页渲染为内存中的PNG字节
+
+        Args:
+            pdf_path: PDF文件路径
+            page_num: 页码（从0开始）
+            dpi: 渲染分辨率（默认200）
+            colorspace: 颜色模式（rgb/gray）
+            use_cache: 是否读写渲染缓存（默认不落盘）
+
+        Returns:
+            bytes: PNG编码的图片内容
+        """
+        pdf_hash = self.get_file_hash(pdf_path) if use_cache else None
+
+        doc = fitz.open(pdf_path)
+        image_bytes = self._render_bytes(doc[page_num], pdf_hash, page_num, dpi, colorspace)
         doc.close()
 
+        return image_bytes
+
+    def render_all_pages(
+        self,
+        pdf_path: str,
+        dpi: int = 200,
+        in_memory: bool = False,
+        colorspace: str = "rgb",
+        use_cache: bool = False,
+        adaptive_dpi: bool = False,
+        locate_figures: bool = False,
+        trim_margins: bool = False,
+        mask_bands: Tuple[float, float] = (0.0, 0.0),
+        pages: Optional[List[int]] = None,
+        text_blocks: bool = False,
+        page_features: bool = False
+    ) -> List[Dict]:
+        """
+        渲染所有页面为图片
+
+        Args:
+            pdf_path: PDF文件路径
+            dpi: 渲染分辨率（默认200；adaptive_dpi时忽略）
+            in_memory: 内存模式，页面只以PNG字节返回，不写入pages目录
+                （可直接传给LLM和ImageCropper；落盘仅用于调试）
+            colorspace: 颜色模式（rgb/gray）
+            use_cache: 内存模式下是否读写渲染缓存（磁盘模式始终使用缓存）
+            adaptive_dpi: 按页面特征逐页选择DPI（见 choose_dpi）
+            locate_figures: 同时定位候选图形区域，结果放在 "figure_regions"（见 locate_figures）
+            trim_margins: 裁掉页边空白后再上传（"image_bytes" 为裁剪后的图片，
+                "offset" 记录裁剪区域左上角在整页图上的像素坐标）
+            mask_bands: 检测内容边界时忽略的页眉/页脚带（占页面高度的比例，如 (0.05, 0.04)），
+                用于排除水印、页码；仅在 trim_margins 时生效
+            pages: 只渲染这些页（页码从1开始，默认全部，如 filter_pages 的结果）
+            text_blocks: 同时提取文本层文字块，结果放在 "text_blocks"（见 get_text_blocks）
+            page_features: 同时提取页面特征，结果放在 "features"（见 analyze_page，供模型路由打分）
+
+        Returns:
+            List[Dict]: 包含页码、图片和渲染比例的列表
+                磁盘模式: [{"page": 1, "image_path": "xxx.png", "dpi": 200, "scale": 2.78}, ...]
+                内存模式: [{"page": 1, "image_bytes": b"...", "image_path": None, ...}, ...]
+                scale 为每PDF点对应的像素数（像素坐标 / scale = PDF坐标）
+                offset 为上传图片左上角在整页图上的像素坐标（未裁剪时为 (0, 0)）
+                question_count 为按文本层估计的题目数（无文本层时为None，见 estimate_question_count）
+        """
+        pdf_hash = self.get_file_hash(pdf_path) if (use_cache or not in_memory) else None
+
+        with span("pdf_open"):
+            doc = fitz.open(pdf_path)
         results = []
-        for page_num in range(page_count):
-            image_path = self.render_page_to_image(pdf_path, page_num, dpi)
-            results.append({
-                "page": page_num + 1,
-                "image_path": image_path
-            })
+        for page_num in range(len(doc)):
+            if pages is not None and page_num + 1 not in pages:
+                continue
+            page = doc[page_num]
+            with span("analyze", page=page_num + 1):
+                # 页面特征（含矢量路径）每页只解析一次，DPI、图形区域、题目数和路由特征共用
+                features = self.analyze_page(page) if (adaptive_dpi or locate_figures or page_features) else None
+                page_dpi = self.choose_dpi(page, features) if adaptive_dpi else dpi
+                page_info = {
+                    "page": page_num + 1,
+                    "dpi": page_dpi,
+                    "scale": page_dpi / 72,
+                    "offset": (0, 0)
+                }
+                if locate_figures or page_features:
+                    figure_regions = self.locate_figures(page, page_info["scale"], features)
+                    if locate_figures:
+                        page_info["figure_regions"] = figure_regions
+                if text_blocks:
+                    page_info["text_blocks"] = self.get_text_blocks(page, page_info["scale"])
+                page_info["question_count"] = self.estimate_question_count(page, features)
+                if page_features:
+                    page_info["features"] = {
+                        name: value for name, value in features.items() if name not in RAW_FEATURE_KEYS
+                    }
+                    page_info["features"]["figure_count"] = len(figure_regions)
+
+            if in_memory and trim_margins and pdf_hash is None:
+                # 直接在渲染结果上检测边界，省去整页PNG编码
+                with span("render", page=page_num + 1):
+                    pix = self._render_pixmap(page, page_dpi, colorspace)
+                pixels = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+                page_info["image_bytes"], page_info["offset"] = self._trim_pixels(pixels, mask_bands)
+                page_info["image_path"] = None
+            else:
+                if in_memory:
+                    page_info["image_bytes"] = self._render_bytes(page, pdf_hash, page_num, page_dpi, colorspace)
+                    page_info["image_path"] = None
+                else:
+                    page_info["image_path"] = self._render_to_cache(page, pdf_hash, page_num, page_dpi, colorspace)
+                if trim_margins:
+                    page_info["image_bytes"], page_info["offset"] = self.trim_page_image(
+                        page_info.get("image_bytes") or page_info["image_path"],
+                        mask_bands
+                    )
+            results.append(page_info)
+        doc.close()
 
         return results
+
+    def trim_page_image(
+        self,
+        image: Union[str, bytes],
+        mask_bands: Tuple[float, float] = (0.0, 0.0)
+    ) -> Tuple[bytes, Tuple[int, int]]:
+        """
+        裁掉页面图片四周的空白（以及可选的页眉/页脚带）
+
+        Args:
+            image: 页面图片路径或PNG字节
+            mask_bands: 检测时忽略的顶部/底部带（占页面高度的比例）
+
+        Returns:
+            Tuple[bytes, Tuple[int, int]]: (裁剪后的PNG字节, 裁剪区域左上角在原图上的像素坐标)
+        """
+        source = io.BytesIO(image) if isinstance(image, (bytes, bytearray)) else image
+        with Image.open(source) as img:
+            pixels = np.asarray(img.convert("L") if img.mode not in ("L", "RGB") else img)
+        if pixels.ndim == 2:
+            pixels = pixels[:, :, None]
+        return self._trim_pixels(pixels, mask_bands)
+
+    def split_page_tiles(
+        self,
+        image: Union[str, bytes],
+        question_count: int,
+        questions_per_tile: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        将题目密集的页面图片切成若干水平分块（在题目之间的空白带处切分，相邻分块略有重叠）
+
+        分块数按估计题目数确定；每个目标切分位置附近寻找足够高的空白行带，
+        在空白带中间切开。找不到空白带时在目标位置硬切，并加大重叠，
+        被切开的题目由 QuestionExtractor.merge_tile_questions 去重。
+
+        Args:
+            image: 页面图片路径或PNG字节（上传给LLM的图片）
+            question_count: 估计的题目数
+            questions_per_tile: 每块大约包含的题目数（默认 TILE_QUESTIONS）
+
+        Returns:
+            List[Dict]: 分块列表（只有一块时表示无需分块）
+                [{"image_bytes": b"...", "offset": (0, y0), "size": (w, h)}, ...]
+                offset 为分块左上角在输入图片上的像素坐标
+        """
+        source = io.BytesIO(image) if isinstance(image, (bytes, bytearray)) else image
+        with Image.open(source) as img:
+            img.load()
+            page_img = img.copy()
+        width, height = page_img.size
+
+        tile_count = min(self.MAX_TILES, math.ceil(question_count / (questions_per_tile or self.TILE_QUESTIONS)))
+        if tile_count <= 1:
+            return [{"image_bytes": self._encode_image(page_img), "offset": (0, 0), "size": (width, height)}]
+
+        # 空白行：整行所有像素都足够浅
+        gray = np.asarray(page_img.convert("L"))
+        blank = gray.min(axis=1) >= self.MARGIN_INK_THRESHOLD
+        bands = self._blank_bands(blank, self.TILE_MIN_GAP_PX)
+
+        cuts = []  # (切分位置, 重叠像素)
+        search = int(height * self.TILE_SEARCH_RATIO)
+        for i in range(1, tile_count):
+            target = height * i // tile_count
+            nearby = [(abs((y0 + y1) // 2 - target), y0, y1) for y0, y1 in bands
+                      if abs((y0 + y1) // 2 - target) <= search and (y0 + y1) // 2 > (cuts[-1][0] if cuts else 0)]
+            if nearby:
+                _, y0, y1 = min(nearby)
+                cuts.append(((y0 + y1) // 2, self.TILE_OVERLAP_PX))
+            else:
+                cuts.append((target, int(height * self.TILE_FALLBACK_OVERLAP_RATIO)))
+
+        tiles = []
+        bounds = [(0, 0)] + cuts + [(height, 0)]
+        for (start, start_overlap), (end, end_overlap) in zip(bounds, bounds[1:]):
+            y0 = max(0, start - start_overlap)
+            y1 = min(height, end + end_overlap)
+            tile_img = page_img.crop((0, y0, width, y1))
+            tiles.append({"image_bytes": self._encode_image(tile_img), "offset": (0, y0), "size": (width, y1 - y0)})
+        page_img.close()
+        return tiles
+
+    @staticmethod
+    def _blank_bands(blank: np.ndarray, min_height: int) -> List[Tuple[int, int]]:
+        """找出连续空白行组成的水平带 [(起始行, 结束行), ...]，忽略高度不足的带"""
+        padded = np.concatenate(([False], blank, [False])).astype(np.int8)
+        edges = np.flatnonzero(np.diff(padded))
+        return [(int(y0), int(y1)) for y0, y1 in zip(edges[::2], edges[1::2]) if y1 - y0 >= min_height]
+
+    @staticmethod
+    def _encode_image(img: Image.Image) -> bytes:
+        """将PIL图片编码为PNG字节"""
+        buffer = io.BytesIO()
+        with span("encode"):
+            img.save(buffer, "PNG")
+        return buffer.getvalue()
+
+    def _trim_pixels(
+        self,
+        pixels: np.ndarray,
+        mask_bands: Tuple[float, float]
+    ) -> Tuple[bytes, Tuple[int, int]]:
+        """按内容边界裁剪像素数组 (H, W, C)，返回PNG字节和偏移"""
+        height, width = pixels.shape[:2]
+        top_band = int(height * mask_bands[0])
+        bottom_band = height - int(height * mask_bands[1])
+
+        # 任一通道足够深即视为内容（彩色文字/图形也能检出）
+        ink = pixels[top_band:bottom_band].min(axis=2) < self.MARGIN_INK_THRESHOLD
+        rows = np.flatnonzero(ink.any(axis=1))
+        if rows.size == 0:
+            # 空白页：保持原图
+            x0, y0, x1, y1 = 0, 0, width, height
+        else:
+            cols = np.flatnonzero(ink.any(axis=0))
+            pad = self.MARGIN_PADDING_PX
+            x0 = max(0, int(cols[0]) - pad)
+            x1 = min(width, int(cols[-1]) + 1 + pad)
+            y0 = max(top_band, top_band + int(rows[0]) - pad)
+            y1 = min(bottom_band, top_band + int(rows[-1]) + 1 + pad)
+
+        cropped = pixels[y0:y1, x0:x1]
+        if cropped.shape[2] == 1:
+            cropped = cropped[:, :, 0]
+        buffer = io.BytesIO()
+        with span("encode"):
+            Image.fromarray(np.ascontiguousarray(cropped)).save(buffer, "PNG")
+        return buffer.getvalue(), (x0, y0)
+
+    def _render_pixmap(self, page: "fitz.Page", dpi: int, colorspace: str = "rgb") -> "fitz.Pixmap":
+        """按指定DPI渲染页面"""
+        # 计算缩放比例
+        zoom = dpi / 72
+        mat = fitz.Matrix(zoom, zoom)
+        return page.get_pixmap(matrix=mat, colorspace=COLORSPACES[colorspace], alpha=False)
+
+    def _render_png(self, page: "fitz.Page", dpi: int, colorspace: str = "rgb") -> bytes:
+        """渲染页面并编码为PNG字节（分别记录 render/encode 耗时）"""
+        with span("render", page=page.number + 1):
+            pix = self._render_pixmap(page, dpi, colorspace)
+        with span("encode", page=page.number + 1):
+            return pix.tobytes("png")
+
+    @staticmethod
+    def _expected_pixel_size(page: "fitz.Page", dpi: int) -> Tuple[int, int]:
+        """计算页面按指定DPI渲染后的像素尺寸（用于校验缓存）"""
+        zoom = dpi / 72
+        irect = (page.rect * fitz.Matrix(zoom, zoom)).irect
+        return irect.width, irect.height
+
+    def _render_to_cache(
+        self,
+        page: "fitz.Page",
+        pdf_hash: str,
+        page_num: int,
+        dpi: int,
+        colorspace: str
+    ) -> str:
+        """渲染页面到缓存目录，命中缓存时直接返回已有文件"""
+        key = RenderCache.make_key(pdf_hash, page_num, dpi, colorspace)
+        cached = self.render_cache.get(key, self._expected_pixel_size(page, dpi))
+        if cached is not None:
+            return str(cached)
+
+        return str(self.render_cache.put(key, self._render_png(page, dpi, colorspace)))
+
+    def _render_bytes(
+        self,
+        page: "fitz.Page",
+        pdf_hash: Optional[str],
+        page_num: int,
+        dpi: int,
+        colorspace: str
+    ) -> bytes:
+        """渲染页面为PNG字节；提供pdf_hash时读写渲染缓存"""
+        if pdf_hash is None:
+            return self._render_png(page, dpi, colorspace)
+
+        key = RenderCache.make_key(pdf_hash, page_num, dpi, colorspace)
+        cached = self.render_cache.get_bytes(key, self._expected_pixel_size(page, dpi))
+        if cached is not None:
+            return cached
+
+        image_bytes = self._render_png(page, dpi, colorspace)
+        self.render_cache.put(key, image_bytes)
+        return image_bytes
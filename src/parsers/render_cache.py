@@ -0,0 +1,183 @@
+"""页面渲染缓存"""
+
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class RenderCache:
+    """页面渲染缓存 - 按PDF内容哈希、页码、DPI和颜色模式缓存PNG
+
+    缓存文件名包含完整的内容哈希和渲染参数，不同DPI/颜色模式互不覆盖。
+    读取时校验PNG文件头和像素尺寸，损坏或不完整的文件视为未命中；
+    总大小超过上限时按最近使用时间（mtime）淘汰最旧的文件。
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 1024 * 1024 * 1024):
+        """
+        初始化渲染缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存总大小上限（字节），<=0 表示不限制
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._total_bytes: Optional[int] = None  # 首次使用时统计
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(pdf_hash: str, page_num: int, dpi: int, colorspace: str = "rgb") -> str:
+        """
+        生成缓存键
+
+        Args:
+            pdf_hash: PDF文件完整内容哈希
+            page_num: 页码（从0开始）
+            dpi: 渲染分辨率
+            colorspace: 颜色模式（rgb/gray）
+
+        Returns:
+            str: 缓存键（同时用作文件名）
+        """
+        return f"{pdf_hash}_p{page_num + 1}_{dpi}dpi_{colorspace}"
+
+    def path_for(self, key: str) -> Path:
+        """缓存键对应的文件路径"""
+        return self.cache_dir / f"{key}.png"
+
+    def get(self, key: str, expected_size: Optional[Tuple[int, int]] = None) -> Optional[Path]:
+        """
+        查找有效的缓存文件
+
+        Args:
+            key: 缓存键
+            expected_size: 期望的像素尺寸 (width, height)，用于校验
+
+        Returns:
+            Path: 命中时返回文件路径，未命中或文件无效返回None
+        """
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                header = f.read(24)
+        except OSError:
+            return None
+
+        if not self._is_valid(header, expected_size):
+            self._remove(path)
+            return None
+
+        # 更新mtime，作为LRU淘汰依据
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def get_bytes(self, key: str, expected_size: Optional[Tuple[int, int]] = None) -> Optional[bytes]:
+        """查找缓存并返回PNG字节"""
+        path = self.get(key, expected_size)
+        if path is None:
+            return None
+        try:
+            return path.read_bytes()
+        except OSError:
+            return None
+
+    def put(self, key: str, data: bytes) -> Path:
+        """
+        写入缓存（先写临时文件再原子替换，避免留下半写的PNG）
+
+        Args:
+            key: 缓存键
+            data: PNG字节
+
+        Returns:
+            Path: 缓存文件路径
+        """
+        path = self.path_for(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        old_size = path.stat().st_size if path.exists() else 0
+
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += len(data) - old_size
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Optional[Path] = None) -> int:
+        """
+        按最近使用时间淘汰缓存，直到总大小不超过上限
+
+        Args:
+            keep: 不淘汰的文件（刚写入的缓存：mtime精度较粗或文件本身超过上限时，
+                它可能排在最旧的位置，不能刚写完就被删掉）
+
+        Returns:
+            int: 删除的文件数
+        """
+        if self.max_bytes <= 0:
+            return 0
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, _, size in self._scan())
+            if self._total_bytes <= self.max_bytes:
+                return 0
+
+            removed = 0
+            for path, _, size in sorted(self._scan(), key=lambda item: item[1]):
+                if self._total_bytes <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                self._total_bytes -= size
+                removed += 1
+            return removed
+
+    def _scan(self):
+        """列出缓存文件 (路径, mtime, 大小)"""
+        entries = []
+        for path in self.cache_dir.glob("*.png"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _remove(self, path: Path):
+        """删除无效的缓存文件"""
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    @staticmethod
+    def _is_valid(header: bytes, expected_size: Optional[Tuple[int, int]]) -> bool:
+        """校验PNG文件头，并从IHDR块读取尺寸（无需解码整张图片）"""
+        if len(header) < 24 or not header.startswith(PNG_SIGNATURE) or header[12:16] != b"IHDR":
+            return False
+        if expected_size is None:
+            return True
+        width, height = struct.unpack(">II", header[16:24])
+        return (width, height) == tuple(expected_size)
@@ -1,5 +1,25 @@
 """工具模块"""
 
-from .image_cropper import ImageCropper
+import importlib
 
-__all__ = ['ImageCropper']
+from .metrics import Metrics, DEFAULT_METRICS, span, configure_metrics
+from .profiling import StageProfiler, PROFILE_MODES, configure_profiling
+
+# ImageCropper 依赖 PyMuPDF/PIL/numpy，按需导入（只用指标的模块不必加载它们）
+_LAZY_ATTRS = {
+    'ImageCropper': '.image_cropper',
+    'PageImage': '.image_cropper',
+}
+
+__all__ = ['ImageCropper', 'PageImage', 'Metrics', 'DEFAULT_METRICS', 'span', 'configure_metrics',
+           'StageProfiler', 'PROFILE_MODES', 'configure_profiling']
+
+
+def __getattr__(name):
+    """延迟导入 ImageCropper（PEP 562）"""
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
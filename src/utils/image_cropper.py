@@ -1,27 +1,47 @@
 """图片裁剪工具"""
 
 import hashlib
+import io
+import os
+import threading
+import fitz  # PyMuPDF
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import List, Optional, Sequence, Tuple, Union
 from PIL import Image
 
 
+# 页面图片来源：文件路径、内存中的PNG字节或已解码的PIL图片
+PageImage = Union[str, bytes, Image.Image]
+
+# LLM返回bbox的坐标约定
+BBOX_ABSOLUTE = "absolute"  # 绝对像素坐标
+BBOX_UNIT = "unit"          # 0-1归一化坐标
+BBOX_PERMILLE = "permille"  # 0-1000坐标（通义千问、GLM-4V等常见）
+
+
 class ImageCropper:
     """图片裁剪工具 - 从页面图片中裁剪题目/选项图片"""
 
-    def __init__(self, output_dir: str = "src/web/static/images/questions"):
+    INK_THRESHOLD = 220        # 灰度低于该值视为墨迹
+    SEARCH_MARGIN_RATIO = 0.015  # 收紧bbox时向外搜索的范围（相对页面长边）
+
+    def __init__(self, output_dir: str = "src/web/static/images/questions", max_workers: int = 4):
         """
         初始化裁剪工具
 
         Args:
             output_dir: 裁剪图片的输出目录
+            max_workers: 批量裁剪时编码/写文件的线程数
         """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
 
     def crop_region(
         self,
-        source_image: str,
+        source_image: PageImage,
         bbox: List[int],
         padding: int = 10,
         prefix: str = "fig"
@@ -30,7 +50,7 @@ class ImageCropper:
         裁剪图片区域
 
         Args:
-            source_image: 源图片路径
+            source_image: 源图片（路径、PNG字节或PIL图片）
             bbox: 边界框 [x1, y1, x2, y2]
             padding: 边距（像素）
             prefix: 文件名前缀
@@ -39,34 +59,489 @@ class ImageCropper:
             str: 保存的图片路径，失败返回None
         """
         try:
-            img = Image.open(source_image)
-            width, height = img.size
+            img = self._open_image(source_image)
+            cropped = img.crop(self._padded_box(bbox, padding, img.size))
+            if img is not source_image:
+                img.close()
 
-            # 应用边距并确保不超出图片边界
-            x1 = max(0, bbox[0] - padding)
-            y1 = max(0, bbox[1] - padding)
-            x2 = min(width, bbox[2] + padding)
-            y2 = min(height, bbox[3] + padding)
+            return self._save_png(self._encode_png(cropped), prefix)
 
-            # 裁剪图片
-            cropped = img.crop((x1, y1, x2, y2))
+        except Exception as e:
+            print(f"裁剪图片失败: {e}")
+            return None
 
-            # 使用裁剪内容的MD5哈希作为文件名
-            img_bytes = cropped.tobytes()
-            content_hash = hashlib.md5(img_bytes).hexdigest()[:12]
-            filename = f"{prefix}_{content_hash}.png"
-            output_path = self.output_dir / filename
+    def crop_pdf_region(
+        self,
+        page: "fitz.Page",
+        pdf_bbox: Sequence[float],
+        dpi: int = 300,
+        padding: float = 3,
+        prefix: str = "fig"
+    ) -> Optional[str]:
+        """
+        直接从PDF渲染裁剪区域（矢量内容保持清晰，不需要整页图片）
 
-            # 保存图片
-            cropped.save(str(output_path), "PNG")
-            img.close()
+        Args:
+            page: PyMuPDF页面对象
+            pdf_bbox: PDF坐标系下的边界框 [x0, y0, x1, y1]（单位: 点）
+            dpi: 裁剪区域的渲染分辨率
+            padding: 边距（PDF点）
+            prefix: 文件名前缀
 
-            return str(output_path)
+        Returns:
+            str: 保存的图片路径，失败返回None
+        """
+        try:
+            png_bytes = self._render_pdf_clip(page, pdf_bbox, dpi, padding)
+            if png_bytes is None:
+                return None
+            return self._save_png(png_bytes, prefix)
 
         except Exception as e:
             print(f"裁剪图片失败: {e}")
             return None
 
+    def crop_page_figures(
+        self,
+        source_image: Optional[PageImage],
+        questions: List[dict],
+        padding: int = 10,
+        pdf_page: Optional["fitz.Page"] = None,
+        page_scale: Optional[float] = None,
+        clip_dpi: int = 300,
+        refine: bool = True,
+        offset: Tuple[int, int] = (0, 0)
+    ) -> List[dict]:
+        """
+        批量裁剪同一页所有题目/选项的图片
+
+        页面图片只解码一次，所有区域都从同一张解码后的图片裁剪；
+        PNG编码、哈希和写文件在线程池中并行完成。
+        LLM返回的bbox会先经过 refine_bboxes 归一化并收紧到墨迹范围。
+
+        Args:
+            source_image: 页面图片（路径、PNG字节或PIL图片；使用pdf_page时可为None）
+            questions: 同一页的题目列表（包含figure_bbox等字段）
+            padding: 裁剪边距（像素）
+            pdf_page: PDF页面对象。提供时直接从PDF按clip_dpi渲染裁剪区域（矢量清晰度）
+            page_scale: 页面渲染的像素/PDF点比例，用于将figure_bbox换算为PDF坐标
+            clip_dpi: PDF裁剪渲染分辨率
+            refine: 是否对LLM返回的bbox做坐标约定识别和空白收紧
+            offset: source_image 左上角在整页图上的像素坐标（上传前裁掉页边时不为0）。
+                LLM返回的bbox基于source_image，处理后统一换算为整页像素坐标
+
+        Returns:
+            List[dict]: 更新后的题目列表（添加了图片路径，figure_bbox为整页像素坐标）
+        """
+        # 收集本页所有待裁剪区域: (题目/选项, 路径字段, 文件名前缀)
+        jobs = []
+        for q in questions:
+            if q.get('has_figure') and q.get('figure_bbox'):
+                jobs.append((q, 'question_image_path', "q"))
+            for option in q.get('options') or []:
+                if option.get('has_figure') and option.get('figure_bbox'):
+                    jobs.append((option, 'option_image_path', f"opt_{option.get('key', 'x')}"))
+
+        if not jobs:
+            return questions
+
+        # 裁剪（PyMuPDF/PIL对象在当前线程中访问）
+        crops = []
+        page_img = None
+        try:
+            # 修正LLM返回的bbox（本地检测的区域已是精确坐标，跳过）
+            llm_items = [item for item, _, _ in jobs if not item.get('figure_pdf_bbox')]
+            if refine and llm_items:
+                if source_image is not None:
+                    page_img = self._open_image(source_image)
+                    page_img.load()
+                    self.refine_bboxes(llm_items, page_img.size, np.asarray(page_img.convert("L")))
+                elif pdf_page is not None and page_scale:
+                    size = (int(pdf_page.rect.width * page_scale), int(pdf_page.rect.height * page_scale))
+                    self.refine_bboxes(llm_items, size)
+
+            # 换算为整页像素坐标
+            if offset != (0, 0):
+                for item in llm_items:
+                    if self._is_bbox(item.get('figure_bbox')):
+                        item['figure_bbox'] = self.shift_bbox(item['figure_bbox'], offset)
+
+            for item, field, prefix in jobs:
+                if not item.get('figure_bbox'):
+                    continue
+                try:
+                    pdf_bbox = self._item_pdf_bbox(item, pdf_page, page_scale)
+                    if pdf_bbox is not None:
+                        pdf_padding = padding / page_scale if page_scale else 3
+                        crop = self._render_pdf_clip(pdf_page, pdf_bbox, clip_dpi, pdf_padding)
+                    elif source_image is not None:
+                        if page_img is None:
+                            page_img = self._open_image(source_image)
+                            page_img.load()
+                        image_bbox = self.shift_bbox(item['figure_bbox'], (-offset[0], -offset[1]))
+                        crop = page_img.crop(self._padded_box(image_bbox, padding, page_img.size))
+                    else:
+                        crop = None
+                except Exception as e:
+                    print(f"裁剪图片失败: {e}")
+                    crop = None
+                if crop is not None:
+                    crops.append((item, field, prefix, crop))
+        finally:
+            if page_img is not None and page_img is not source_image:
+                page_img.close()
+
+        # 编码、哈希、写文件
+        def save(crop_job) -> Tuple[dict, str, Optional[str]]:
+            item, field, prefix, crop = crop_job
+            try:
+                png_bytes = crop if isinstance(crop, bytes) else self._encode_png(crop)
+                return item, field, self._save_png(png_bytes, prefix)
+            except Exception as e:
+                print(f"保存裁剪图片失败: {e}")
+                return item, field, None
+
+        if len(crops) > 1 and self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(crops))) as executor:
+                results = list(executor.map(save, crops))
+        else:
+            results = [save(crop_job) for crop_job in crops]
+
+        for item, field, output_path in results:
+            if output_path:
+                item[field] = self.get_web_path(output_path)
+
+        return questions
+
+    def map_tile_bboxes(
+        self,
+        questions: List[dict],
+        tile_image: PageImage,
+        tile_offset: Tuple[int, int]
+    ) -> List[dict]:
+        """
+        将分块识别得到的LLM bbox修正后换算到整张上传图片的坐标（原地修改）
+
+        坐标约定识别和墨迹收紧必须基于分块自身的尺寸和像素进行，
+        因此分块结果在合并前先在这里处理，之后 crop_page_figures 应传 refine=False。
+
+        Args:
+            questions: 分块识别出的题目列表
+            tile_image: 分块图片（路径、PNG字节或PIL图片）
+            tile_offset: 分块左上角在上传图片上的像素坐标
+
+        Returns:
+            List[dict]: 更新后的题目列表
+        """
+        items = []
+        for q in questions:
+            for item in [q] + list(q.get('options') or []):
+                if item.get('has_figure') and item.get('figure_bbox') and not item.get('figure_pdf_bbox'):
+                    items.append(item)
+        if not items:
+            return questions
+
+        tile_img = self._open_image(tile_image)
+        try:
+            tile_img.load()
+            self.refine_bboxes(items, tile_img.size, np.asarray(tile_img.convert("L")))
+        finally:
+            if tile_img is not tile_image:
+                tile_img.close()
+
+        for item in items:
+            if item.get('figure_bbox'):
+                item['figure_bbox'] = self.shift_bbox(item['figure_bbox'], tile_offset)
+        return questions
+
+    def refine_bboxes(
+        self,
+        items: List[dict],
+        size: Tuple[int, int],
+        gray: Optional[np.ndarray] = None,
+        bbox_scale: str = "auto"
+    ):
+        """
+        修正同一页LLM返回的figure_bbox（原地修改）
+
+        1. 识别坐标约定（绝对像素 / 0-1 / 0-1000），换算为页面像素坐标
+        2. 提供灰度图时，将bbox收紧到墨迹边界（松散的bbox去掉空白，截断的bbox向外补全）
+
+        Args:
+            items: 含figure_bbox的题目/选项
+            size: 页面图片尺寸 (width, height)
+            gray: 页面灰度图（numpy数组，可选）
+            bbox_scale: 坐标约定，"auto" 表示自动识别
+        """
+        for item in items:
+            if not self._is_bbox(item.get('figure_bbox')):
+                item['figure_bbox'] = None
+        items = [item for item in items if item['figure_bbox']]
+        if not items:
+            return
+
+        bboxes = [item['figure_bbox'] for item in items]
+        if bbox_scale == "auto":
+            bbox_scale = self.detect_bbox_scale(bboxes, size, gray)
+
+        for item in items:
+            bbox = self.normalize_bbox(item['figure_bbox'], size, bbox_scale)
+            if gray is not None:
+                bbox = self.tighten_bbox(gray, bbox)
+            item['figure_bbox'] = bbox
+
+    def detect_bbox_scale(
+        self,
+        bboxes: List[Sequence[float]],
+        size: Tuple[int, int],
+        gray: Optional[np.ndarray] = None
+    ) -> str:
+        """
+        识别一页bbox的坐标约定（按整页判断，比单个bbox更可靠）
+
+        - 所有值 <= 1：0-1归一化
+        - 存在值 > 1000，或图片长宽都不超过1000：绝对像素
+        - 其余情况两种解释都可能：有灰度图时选择与墨迹边界更吻合的解释
+          （bbox与收紧后bbox的IoU更高），否则按绝对像素处理
+
+        Args:
+            bboxes: 同一页的bbox列表
+            size: 页面图片尺寸 (width, height)
+            gray: 页面灰度图（可选）
+
+        Returns:
+            str: absolute / unit / permille
+        """
+        values = np.asarray(bboxes, dtype=float)
+        width, height = size
+        if values.max() <= 1.0:
+            return BBOX_UNIT
+        if values.max() > 1000 or (width <= 1000 and height <= 1000):
+            return BBOX_ABSOLUTE
+        if gray is None:
+            return BBOX_ABSOLUTE
+
+        scores = {
+            scale: sum(self._bbox_fit_score(gray, self.normalize_bbox(bbox, size, scale)) for bbox in bboxes)
+            for scale in (BBOX_ABSOLUTE, BBOX_PERMILLE)
+        }
+        # 提示词要求绝对坐标，0-1000需要明显更吻合才采用
+        if scores[BBOX_PERMILLE] > scores[BBOX_ABSOLUTE] + 0.1 * len(bboxes):
+            return BBOX_PERMILLE
+        return BBOX_ABSOLUTE
+
+    @staticmethod
+    def normalize_bbox(bbox: Sequence[float], size: Tuple[int, int], bbox_scale: str = BBOX_ABSOLUTE) -> List[int]:
+        """
+        将bbox换算为页面像素坐标，并修正坐标顺序、裁剪到图片范围内
+
+        Args:
+            bbox: [x1, y1, x2, y2]
+            size: 页面图片尺寸 (width, height)
+            bbox_scale: 坐标约定（absolute/unit/permille）
+
+        Returns:
+            List[int]: 像素坐标 [x1, y1, x2, y2]
+        """
+        width, height = size
+        factor = {BBOX_UNIT: 1.0, BBOX_PERMILLE: 1000.0}.get(bbox_scale)
+        coords = np.asarray(bbox[:4], dtype=float)
+        if factor:
+            coords = coords / factor * np.array([width, height, width, height])
+
+        x1, x2 = sorted((coords[0], coords[2]))
+        y1, y2 = sorted((coords[1], coords[3]))
+        return [
+            int(np.clip(np.floor(x1), 0, width)),
+            int(np.clip(np.floor(y1), 0, height)),
+            int(np.clip(np.ceil(x2), 0, width)),
+            int(np.clip(np.ceil(y2), 0, height))
+        ]
+
+    def tighten_bbox(self, gray: np.ndarray, bbox: Sequence[int], margin: Optional[int] = None) -> List[int]:
+        """
+        将bbox收紧到墨迹边界
+
+        先取bbox内部墨迹的外接矩形（去掉空白）；若墨迹贴住bbox边缘（图形被截断），
+        则在搜索范围内向外扩展，直到遇到空白行/列为止。
+
+        Args:
+            gray: 页面灰度图
+            bbox: 像素坐标 [x1, y1, x2, y2]
+            margin: 向外搜索的像素范围（默认按页面长边的 SEARCH_MARGIN_RATIO）
+
+        Returns:
+            List[int]: 收紧后的像素坐标；bbox内没有墨迹时原样返回
+        """
+        height, width = gray.shape[:2]
+        if margin is None:
+            margin = int(max(width, height) * self.SEARCH_MARGIN_RATIO)
+
+        x1, y1, x2, y2 = bbox
+        if x2 <= x1 or y2 <= y1:
+            return list(bbox)
+
+        # 搜索窗口及原bbox在窗口中的位置
+        sx1, sy1 = max(0, x1 - margin), max(0, y1 - margin)
+        sx2, sy2 = min(width, x2 + margin), min(height, y2 + margin)
+        ink = gray[sy1:sy2, sx1:sx2] < self.INK_THRESHOLD
+        r0, r1, c0, c1 = y1 - sy1, y2 - sy1, x1 - sx1, x2 - sx1
+
+        inner = ink[r0:r1, c0:c1]
+        inner_rows = np.flatnonzero(inner.any(axis=1))
+        if inner_rows.size == 0:
+            return list(bbox)
+        inner_cols = np.flatnonzero(inner.any(axis=0))
+        top, bottom = r0 + inner_rows[0], r0 + inner_rows[-1]
+        left, right = c0 + inner_cols[0], c0 + inner_cols[-1]
+
+        # 墨迹贴边时沿连续的墨迹行向外扩展
+        rows = ink[:, left:right + 1].any(axis=1)
+        if top == r0:
+            blank = np.flatnonzero(~rows[:top])
+            top = blank[-1] + 1 if blank.size else 0
+        if bottom == r1 - 1:
+            blank = np.flatnonzero(~rows[bottom + 1:])
+            bottom = bottom + blank[0] if blank.size else len(rows) - 1
+
+        cols = ink[top:bottom + 1].any(axis=0)
+        if left == c0:
+            blank = np.flatnonzero(~cols[:left])
+            left = blank[-1] + 1 if blank.size else 0
+        if right == c1 - 1:
+            blank = np.flatnonzero(~cols[right + 1:])
+            right = right + blank[0] if blank.size else len(cols) - 1
+
+        return [int(sx1 + left), int(sy1 + top), int(sx1 + right + 1), int(sy1 + bottom + 1)]
+
+    def _bbox_fit_score(self, gray: np.ndarray, bbox: Sequence[int]) -> float:
+        """bbox与墨迹的吻合程度：与收紧后的bbox的IoU（空白区域或截断内容得分低）"""
+        x1, y1, x2, y2 = bbox
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            return 0.0
+        if not (gray[y1:y2, x1:x2] < self.INK_THRESHOLD).any():
+            return 0.0
+        tx1, ty1, tx2, ty2 = self.tighten_bbox(gray, bbox)
+        inter_w = max(0, min(x2, tx2) - max(x1, tx1))
+        inter_h = max(0, min(y2, ty2) - max(y1, ty1))
+        inter = inter_w * inter_h
+        union = (x2 - x1) * (y2 - y1) + (tx2 - tx1) * (ty2 - ty1) - inter
+        return inter / union if union else 0.0
+
+    @staticmethod
+    def _is_bbox(bbox) -> bool:
+        """检查是否为有效的 [x1, y1, x2, y2] 数值列表"""
+        return (
+            isinstance(bbox, (list, tuple))
+            and len(bbox) >= 4
+            and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in bbox[:4])
+        )
+
+    @staticmethod
+    def shift_bbox(bbox: Sequence[float], offset: Tuple[int, int]) -> List[float]:
+        """平移bbox: [x1 + dx, y1 + dy, x2 + dx, y2 + dy]"""
+        dx, dy = offset
+        return [bbox[0] + dx, bbox[1] + dy, bbox[2] + dx, bbox[3] + dy]
+
+    @staticmethod
+    def pixel_to_pdf_bbox(bbox: Sequence[float], scale: float) -> List[float]:
+        """
+        将渲染图上的像素坐标转换为PDF坐标
+
+        Args:
+            bbox: 像素坐标 [x1, y1, x2, y2]
+            scale: 像素/PDF点比例（渲染DPI / 72）
+
+        Returns:
+            List[float]: PDF坐标 [x0, y0, x1, y1]
+        """
+        return [v / scale for v in bbox]
+
+    def _item_pdf_bbox(
+        self,
+        item: dict,
+        pdf_page: Optional["fitz.Page"],
+        page_scale: Optional[float]
+    ) -> Optional[List[float]]:
+        """PDF裁剪模式下题目/选项图片区域的PDF坐标（无法换算时返回None）"""
+        if pdf_page is None:
+            return None
+        if item.get('figure_pdf_bbox'):
+            return item['figure_pdf_bbox']
+        if page_scale:
+            return self.pixel_to_pdf_bbox(item['figure_bbox'], page_scale)
+        return None
+
+    @staticmethod
+    def _render_pdf_clip(
+        page: "fitz.Page",
+        pdf_bbox: Sequence[float],
+        dpi: int,
+        padding: float
+    ) -> Optional[bytes]:
+        """按clip区域渲染PDF页面，返回PNG字节"""
+        clip = fitz.Rect(
+            pdf_bbox[0] - padding,
+            pdf_bbox[1] - padding,
+            pdf_bbox[2] + padding,
+            pdf_bbox[3] + padding
+        ) & page.rect
+        if clip.is_empty:
+            return None
+
+        zoom = dpi / 72
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
+        return pix.tobytes("png")
+
+    @staticmethod
+    def _padded_box(bbox: Sequence[float], padding: int, size: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        """应用边距并确保不超出图片边界"""
+        width, height = size
+        return (
+            max(0, int(bbox[0]) - padding),
+            max(0, int(bbox[1]) - padding),
+            min(width, int(bbox[2]) + padding),
+            min(height, int(bbox[3]) + padding)
+        )
+
+    @staticmethod
+    def _encode_png(img: Image.Image) -> bytes:
+        """将图片编码为PNG字节"""
+        buffer = io.BytesIO()
+        img.save(buffer, "PNG")
+        return buffer.getvalue()
+
+    def _save_png(self, png_bytes: bytes, prefix: str) -> str:
+        """
+        保存PNG，文件名使用编码后内容的MD5哈希（相同内容只写一次）
+
+        先写临时文件再原子替换，避免留下半写的图片（写入中途被中断时删除临时文件）。
+        """
+        content_hash = hashlib.md5(png_bytes).hexdigest()[:12]
+        output_path = self.output_dir / f"{prefix}_{content_hash}.png"
+        if output_path.exists():
+            return str(output_path)
+
+        tmp_path = output_path.with_name(f"{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(png_bytes)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        return str(output_path)
+
+    @staticmethod
+    def _open_image(source_image: PageImage) -> Image.Image:
+        """打开页面图片（PIL图片直接复用，字节在内存中解码）"""
+        if isinstance(source_image, Image.Image):
+            return source_image
+        if isinstance(source_image, (bytes, bytearray)):
+            return Image.open(io.BytesIO(source_image))
+        return Image.open(source_image)
+
     def get_web_path(self, file_path: str) -> str:
         """
         将文件系统路径转换为Web路径
@@ -92,35 +567,38 @@ class ImageCropper:
 
     def process_question_figures(
         self,
-        source_image: str,
+        source_image: Optional[PageImage],
         question_data: dict,
-        padding: int = 10
+        padding: int = 10,
+        pdf_page: Optional["fitz.Page"] = None,
+        page_scale: Optional[float] = None,
+        clip_dpi: int = 300,
+        offset: Tuple[int, int] = (0, 0)
     ) -> dict:
         """
         处理题目中的所有图片区域
 
+        同一页有多道题目时，优先使用 crop_page_figures 一次处理整页。
+
         Args:
-            source_image: 页面图片路径
+            source_image: 页面图片（路径、PNG字节或PIL图片；使用pdf_page时可为None）
             question_data: 题目数据（包含figure_bbox等字段）
-            padding: 裁剪边距
+            padding: 裁剪边距（像素）
+            pdf_page: PDF页面对象。提供时直接从PDF按clip_dpi渲染裁剪区域（矢量清晰度）
+            page_scale: 页面渲染的像素/PDF点比例，用于将figure_bbox换算为PDF坐标
+            clip_dpi: PDF裁剪渲染分辨率
+            offset: source_image 左上角在整页图上的像素坐标
 
         Returns:
             dict: 更新后的题目数据（添加了图片路径）
         """
-        # 处理题干图片
-        if question_data.get('has_figure') and question_data.get('figure_bbox'):
-            bbox = question_data['figure_bbox']
-            cropped_path = self.crop_region(source_image, bbox, padding, "q")
-            if cropped_path:
-                question_data['question_image_path'] = self.get_web_path(cropped_path)
-
-        # 处理选项图片
-        if 'options' in question_data:
-            for option in question_data['options']:
-                if option.get('has_figure') and option.get('figure_bbox'):
-                    bbox = option['figure_bbox']
-                    cropped_path = self.crop_region(source_image, bbox, padding, f"opt_{option.get('key', 'x')}")
-                    if cropped_path:
-                        option['option_image_path'] = self.get_web_path(cropped_path)
-
+        self.crop_page_figures(
+            source_image,
+            [question_data],
+            padding=padding,
+            pdf_page=pdf_page,
+            page_scale=page_scale,
+            clip_dpi=clip_dpi,
+            offset=offset
+        )
         return question_data
@@ -0,0 +1,289 @@
+"""分阶段计时与指标输出（JSONL明细 + Prometheus文本格式汇总）"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, TextIO, Tuple
+
+
+# 汇总到Prometheus时保留的标签（页码等高基数标签只出现在JSONL明细中）
+PROMETHEUS_LABELS = ("pdf_hash", "provider", "model", "scope", "kind")
+
+METRIC_PREFIX = "exam_extractor"
+
+
+class Metrics:
+    """分阶段计时（span）、计数器和仪表盘指标
+
+    - span: 记录一个阶段的耗时，标签为进程级标签（set_tags，如 pdf_hash）、
+      当前线程的标签（tags 上下文，如 page）与调用时传入的标签的合并
+    - record: 记录已在别处测得的耗时（如LLM调用中的排队等待和网络时间）
+    - count / gauge: 计数器（累加）和仪表盘（取最新值）
+
+    每条记录即时追加到JSONL文件；flush 时把各阶段的次数/总耗时/最大耗时、计数器和
+    仪表盘写成Prometheus文本格式（可由 node_exporter 的 textfile collector 采集）。
+    未配置任何输出时所有方法都是空操作，不影响正常运行的性能。
+    """
+
+    def __init__(self, jsonl_path: Optional[str] = None, prom_path: Optional[str] = None):
+        """
+        初始化指标
+
+        Args:
+            jsonl_path: JSONL明细文件路径（追加写入）
+            prom_path: Prometheus文本格式汇总文件路径（flush 时覆盖写入）
+        """
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._file: Optional[TextIO] = None
+        self.jsonl_path: Optional[str] = None
+        self.prom_path: Optional[str] = None
+        self.base_tags: Dict[str, str] = {}
+        self.profiler = None  # 按阶段的CPU/内存分析器（见 profiling.StageProfiler）
+        self.reset()
+        self.configure(jsonl_path, prom_path)
+
+    @property
+    def enabled(self) -> bool:
+        """是否配置了输出"""
+        return bool(self.jsonl_path or self.prom_path)
+
+    def configure(self, jsonl_path: Optional[str] = None, prom_path: Optional[str] = None):
+        """
+        设置输出文件（都为None时关闭指标）
+
+        Args:
+            jsonl_path: JSONL明细文件路径
+            prom_path: Prometheus文本格式汇总文件路径
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.jsonl_path = jsonl_path
+            self.prom_path = prom_path
+            if jsonl_path:
+                os.makedirs(os.path.dirname(os.path.abspath(jsonl_path)), exist_ok=True)
+                self._file = open(jsonl_path, "a", encoding="utf-8")
+
+    def reset(self):
+        """清空汇总数据（处理下一个PDF前调用）"""
+        with self._lock:
+            self._stages: Dict[Tuple, list] = {}     # (阶段, 标签) -> [次数, 总耗时, 最大耗时]
+            self._counters: Dict[Tuple, float] = {}
+            self._gauges: Dict[Tuple, float] = {}
+
+    def set_tags(self, **tags):
+        """设置进程级标签（所有线程的记录都带上，值为None时删除）"""
+        for name, value in tags.items():
+            if value is None:
+                self.base_tags.pop(name, None)
+            else:
+                self.base_tags[name] = str(value)
+
+    @contextmanager
+    def tags(self, **tags):
+        """在当前线程内附加标签（可嵌套，如每页处理时附加 page）"""
+        previous = getattr(self._local, "tags", {})
+        self._local.tags = {**previous, **{name: str(value) for name, value in tags.items() if value is not None}}
+        try:
+            yield
+        finally:
+            self._local.tags = previous
+
+    @contextmanager
+    def span(self, name: str, **tags):
+        """
+        记录一个阶段的耗时（阶段内抛出异常时记录异常类型后继续抛出）
+
+        设置了 profiler 时同时对该阶段做CPU/内存分析。
+
+        Args:
+            name: 阶段名称（如 render、llm、crop）
+            **tags: 附加标签
+        """
+        if self.profiler is not None:
+            with self.profiler.stage(name), self._timed(name, tags):
+                yield
+        else:
+            with self._timed(name, tags):
+                yield
+
+    @contextmanager
+    def _timed(self, name: str, tags: Dict):
+        """计时并记录（未配置输出时不计时）"""
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, error=error, **tags)
+
+    def record(self, name: str, seconds: float, error: Optional[str] = None, **tags):
+        """
+        记录一次已测得的耗时
+
+        Args:
+            name: 阶段名称
+            seconds: 耗时（秒）
+            error: 失败时的异常类型
+            **tags: 附加标签
+        """
+        if not self.enabled:
+            return
+        merged = self._merge_tags(tags)
+        entry = {"ts": round(time.time(), 3), "type": "span", "name": name,
+                 "seconds": round(seconds, 6), "tags": merged}
+        if error:
+            entry["error"] = error
+
+        key = (name, self._prometheus_labels(merged))
+        with self._lock:
+            stats = self._stages.setdefault(key, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            self._write(entry)
+
+    def count(self, name: str, value: float = 1, **tags):
+        """累加计数器（如 tokens、cost_usd、deadline_misses）"""
+        if not self.enabled:
+            return
+        merged = self._merge_tags(tags)
+        key = (name, self._prometheus_labels(merged))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._write({"ts": round(time.time(), 3), "type": "counter", "name": name,
+                         "value": value, "tags": merged})
+
+    def gauge(self, name: str, value: float, **tags):
+        """设置仪表盘指标（如 concurrency_limit）"""
+        if not self.enabled:
+            return
+        merged = self._merge_tags(tags)
+        key = (name, self._prometheus_labels(merged))
+        with self._lock:
+            self._gauges[key] = value
+            self._write({"ts": round(time.time(), 3), "type": "gauge", "name": name,
+                         "value": value, "tags": merged})
+
+    def summary(self) -> Dict[str, Dict]:
+        """各阶段汇总 {阶段: {"count", "total", "max"}}（合并所有标签）"""
+        result: Dict[str, Dict] = {}
+        with self._lock:
+            for (name, _), (count, total, longest) in self._stages.items():
+                stage = result.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+                stage["count"] += count
+                stage["total"] += total
+                stage["max"] = max(stage["max"], longest)
+        return result
+
+    def print_summary(self):
+        """输出各阶段耗时汇总"""
+        stages = self.summary()
+        if not stages:
+            return
+        print("  阶段耗时:")
+        for name, stage in sorted(stages.items(), key=lambda item: -item[1]["total"]):
+            print(f"    - {name}: {stage['total']:.2f}s（{stage['count']} 次，"
+                  f"平均 {stage['total'] / stage['count'] * 1000:.1f}ms，最长 {stage['max'] * 1000:.1f}ms）")
+
+    def flush(self):
+        """刷新JSONL并写出Prometheus汇总文件（先写临时文件再原子替换）"""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            if not self.prom_path:
+                return
+            text = self._format_prometheus()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.prom_path)), exist_ok=True)
+        tmp_path = f"{self.prom_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, self.prom_path)
+
+    def _format_prometheus(self) -> str:
+        """生成Prometheus文本格式（调用方持有锁）"""
+        lines = [
+            f"# HELP {METRIC_PREFIX}_stage_seconds Time spent per pipeline stage",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds summary",
+        ]
+        for (name, labels), (count, total, _) in sorted(self._stages.items()):
+            label_text = self._format_labels((("stage", name),) + labels)
+            lines.append(f"{METRIC_PREFIX}_stage_seconds_sum{label_text} {total:.6f}")
+            lines.append(f"{METRIC_PREFIX}_stage_seconds_count{label_text} {count}")
+
+        lines.append(f"# HELP {METRIC_PREFIX}_stage_seconds_max Longest single occurrence per pipeline stage")
+        lines.append(f"# TYPE {METRIC_PREFIX}_stage_seconds_max gauge")
+        for (name, labels), (_, _, longest) in sorted(self._stages.items()):
+            lines.append(f"{METRIC_PREFIX}_stage_seconds_max{self._format_labels((('stage', name),) + labels)} {longest:.6f}")
+
+        for metric_type, values, suffix in (("counter", self._counters, "_total"), ("gauge", self._gauges, "")):
+            for name in sorted({name for name, _ in values}):
+                metric = f"{METRIC_PREFIX}_{name}{suffix}"
+                lines.append(f"# TYPE {metric} {metric_type}")
+                for (value_name, labels), value in sorted(values.items()):
+                    if value_name == name:
+                        # repr 保留完整精度（:g 只有6位有效数字，大计数会被截断成 1.23457e+06）
+                        lines.append(f"{metric}{self._format_labels(labels)} {float(value)!r}")
+        return "\n".join(lines) + "\n"
+
+    def _merge_tags(self, tags: Dict) -> Dict[str, str]:
+        """合并进程级、线程级和调用时的标签"""
+        merged = {**self.base_tags, **getattr(self._local, "tags", {})}
+        merged.update({name: str(value) for name, value in tags.items() if value is not None})
+        return merged
+
+    @staticmethod
+    def _prometheus_labels(tags: Dict[str, str]) -> Tuple:
+        """汇总用的低基数标签"""
+        return tuple((name, tags[name]) for name in PROMETHEUS_LABELS if name in tags)
+
+    @staticmethod
+    def _format_labels(labels: Tuple) -> str:
+        """格式化为 {name="value",...}"""
+        if not labels:
+            return ""
+        escaped = []
+        for name, value in labels:
+            value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            escaped.append(f'{name}="{value}"')
+        return "{" + ",".join(escaped) + "}"
+
+    def _write(self, entry: Dict):
+        """追加一行JSONL（调用方持有锁）"""
+        if self._file is not None:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def close(self):
+        """写出汇总并关闭文件"""
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# 进程级默认指标（各模块通过 span() 记录，由入口脚本 configure_metrics() 启用）
+DEFAULT_METRICS = Metrics()
+
+
+def span(name: str, **tags):
+    """在默认指标上记录一个阶段的耗时（参见 Metrics.span）"""
+    return DEFAULT_METRICS.span(name, **tags)
+
+
+def configure_metrics(jsonl_path: Optional[str] = None, prom_path: Optional[str] = None) -> Metrics:
+    """设置默认指标的输出文件（参见 Metrics.configure）"""
+    DEFAULT_METRICS.configure(jsonl_path, prom_path)
+    return DEFAULT_METRICS
@@ -0,0 +1,286 @@
+"""按阶段的CPU/内存分析（--profile cpu|mem，挂在 metrics 的 span 上）"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from .metrics import DEFAULT_METRICS
+
+
+PROFILE_MODES = ("cpu", "mem")
+
+
+class StageProfiler:
+    """按流水线阶段（span 名称）汇总的CPU/内存分析
+
+    - cpu: 每个阶段用 cProfile 分析，同名阶段（不同页面、不同线程）的结果合并，
+      输出 <阶段>.prof（可用 snakeviz / pstats 查看）和按累计耗时排序的前N个函数
+    - mem: 用 tracemalloc 在阶段开始和结束时各取一次快照，按代码行累计阶段内的
+      净分配（阶段结束时仍未释放的内存），输出每个阶段净分配最多的前N行，
+      以及整个运行的峰值内存
+
+    cProfile 只分析启动它的线程，且同一线程内同时只能有一个分析器生效：阶段嵌套时
+    （如 render 嵌在 analyze 的页面循环中）先暂停外层阶段的分析器，内层结束后恢复，
+    因此外层阶段的结果不包含内层阶段的耗时。mem 模式同样报告独占值：同一线程内嵌套
+    阶段的净分配从外层阶段中减去，各阶段相加不会重复计算。tracemalloc 统计的是整个进程，多线程
+    并发处理时阶段内的分配会包含其他线程同时产生的分配，只适合看趋势和热点位置；
+    需要精确归因时用 --workers 1 运行。
+
+    分析本身开销较大（mem 模式尤其明显），只应在排查性能问题时开启。
+    """
+
+    def __init__(self, mode: str, output_dir: str = "profiles", top_n: int = 25, frames: int = 1):
+        """
+        初始化分析器
+
+        Args:
+            mode: 分析模式（cpu/mem）
+            output_dir: 输出目录
+            top_n: 报告中每个阶段列出的函数/代码行数
+            frames: mem 模式下每次分配记录的调用栈深度
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"不支持的分析模式: {mode}，可选: {', '.join(PROFILE_MODES)}")
+
+        self.mode = mode
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.frames = frames
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._cpu_stats: Dict[str, pstats.Stats] = {}
+        self._mem_stats: Dict[str, Dict] = {}        # 阶段 -> {代码位置: [净分配字节, 分配次数]}
+        self._stage_counts: Dict[str, int] = {}
+        self._skipped = 0
+        self._started_tracemalloc = False
+
+    def start(self):
+        """开始分析（mem 模式启动 tracemalloc）"""
+        if self.mode == "mem" and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracemalloc = True
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        分析一个阶段
+
+        Args:
+            name: 阶段名称（与 metrics span 名称一致）
+        """
+        if self.mode == "cpu":
+            with self._cpu_stage(name):
+                yield
+        else:
+            with self._mem_stage(name):
+                yield
+
+    @contextmanager
+    def _cpu_stage(self, name: str):
+        """cProfile 分析一个阶段（嵌套时暂停外层）"""
+        stack: List[cProfile.Profile] = self._local.__dict__.setdefault("stack", [])
+        profile = cProfile.Profile()
+        if stack:
+            stack[-1].disable()
+        try:
+            profile.enable()
+        except ValueError:
+            # 其他分析工具已在运行（Python 3.12+ 同一时刻只允许一个分析器）
+            with self._lock:
+                self._skipped += 1
+            if stack:
+                stack[-1].enable()
+            yield
+            return
+
+        stack.append(profile)
+        try:
+            yield
+        finally:
+            profile.disable()
+            stack.pop()
+            if stack:
+                stack[-1].enable()
+            self._merge_cpu(name, profile)
+
+    def _merge_cpu(self, name: str, profile: cProfile.Profile):
+        """合并同名阶段的分析结果"""
+        with self._lock:
+            self._stage_counts[name] = self._stage_counts.get(name, 0) + 1
+            if name in self._cpu_stats:
+                self._cpu_stats[name].add(profile)
+            else:
+                self._cpu_stats[name] = pstats.Stats(profile)
+
+    @contextmanager
+    def _mem_stage(self, name: str):
+        """tracemalloc 统计一个阶段的净分配（减去嵌套阶段的部分）"""
+        if not tracemalloc.is_tracing():
+            yield
+            return
+
+        # 栈中每层记录该阶段内已结束的子阶段的净分配 {代码位置: [字节, 次数]}
+        stack: List[Dict] = self._local.__dict__.setdefault("mem_stack", [])
+        children: Dict = {}
+        before = self._snapshot()
+        stack.append(children)
+        try:
+            yield
+        finally:
+            stack.pop()
+            after = self._snapshot()
+            diffs = after.compare_to(before, "traceback" if self.frames > 1 else "lineno")
+            inclusive = {
+                diff.traceback: (diff.size_diff, diff.count_diff)
+                for diff in diffs if diff.size_diff or diff.count_diff
+            }
+            if stack:
+                _accumulate(stack[-1], inclusive)
+            with self._lock:
+                self._stage_counts[name] = self._stage_counts.get(name, 0) + 1
+                stage = self._mem_stats.setdefault(name, {})
+                for traceback in set(inclusive) | set(children):
+                    size, count = inclusive.get(traceback, (0, 0))
+                    child_size, child_count = children.get(traceback, (0, 0))
+                    if size == child_size and count == child_count:
+                        continue
+                    entry = stage.setdefault(traceback, [0, 0])
+                    entry[0] += size - child_size
+                    entry[1] += count - child_count
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        """取快照并排除 tracemalloc 和导入机制自身的分配"""
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+
+    def write_reports(self, label: Optional[str] = None) -> List[str]:
+        """
+        写出分析结果
+
+        Args:
+            label: 报告标题中的说明（如PDF文件名）
+
+        Returns:
+            List[str]: 写出的文件路径
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.mode == "cpu":
+            return self._write_cpu_reports(label)
+        return self._write_mem_report(label)
+
+    def _write_cpu_reports(self, label: Optional[str]) -> List[str]:
+        """每个阶段一个 .prof 文件 + 汇总文本报告"""
+        paths = []
+        report = io.StringIO()
+        report.write(f"CPU分析报告{f'（{label}）' if label else ''}\n")
+        if self._skipped:
+            report.write(f"因其他分析工具运行而跳过 {self._skipped} 个阶段\n")
+
+        with self._lock:
+            stages = sorted(self._cpu_stats.items(), key=lambda item: -item[1].total_tt)
+            for name, stats in stages:
+                prof_path = os.path.join(self.output_dir, f"{_safe_name(name)}.prof")
+                stats.dump_stats(prof_path)
+                paths.append(prof_path)
+
+                report.write(f"\n{'=' * 80}\n阶段 {name}: {self._stage_counts.get(name, 0)} 次，"
+                             f"合计 {stats.total_tt:.3f}s\n{'=' * 80}\n")
+                stats.stream = report
+                stats.sort_stats("cumulative").print_stats(self.top_n)
+
+        report_path = os.path.join(self.output_dir, "cpu_report.txt")
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(report.getvalue())
+        return [report_path] + paths
+
+    def _write_mem_report(self, label: Optional[str]) -> List[str]:
+        """按阶段列出净分配最多的代码位置（独占值，不含嵌套阶段）"""
+        lines = [f"内存分析报告{f'（{label}）' if label else ''}"]
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            lines.append(f"当前占用 {_format_size(current)}，峰值 {_format_size(peak)}")
+
+        with self._lock:
+            totals = {name: sum(size for size, _ in stage.values()) for name, stage in self._mem_stats.items()}
+            for name in sorted(self._mem_stats, key=lambda stage_name: -totals[stage_name]):
+                stage = self._mem_stats[name]
+                lines.append("")
+                lines.append("=" * 80)
+                lines.append(f"阶段 {name}: {self._stage_counts.get(name, 0)} 次，"
+                             f"净分配 {_format_size(totals[name])}（不含嵌套阶段）")
+                lines.append("=" * 80)
+                top = sorted(stage.items(), key=lambda item: -abs(item[1][0]))[:self.top_n]
+                for index, (traceback, (size, count)) in enumerate(top, 1):
+                    lines.append(f"#{index}: {_format_size(size)}（{count:+d} 块）")
+                    for frame_line in traceback.format():
+                        lines.append(f"    {frame_line}")
+
+        report_path = os.path.join(self.output_dir, "memory_report.txt")
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return [report_path]
+
+    def stop(self):
+        """停止分析（只停止由本分析器启动的 tracemalloc）"""
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+
+def configure_profiling(mode: Optional[str], output_dir: str = "profiles", top_n: int = 25) -> Optional[StageProfiler]:
+    """
+    在默认指标的 span 上启用按阶段分析（mode 为None时关闭）
+
+    Args:
+        mode: 分析模式（cpu/mem）
+        output_dir: 输出目录
+        top_n: 报告中每个阶段列出的函数/代码行数
+
+    Returns:
+        StageProfiler: 已启动的分析器，未启用时返回None
+    """
+    if DEFAULT_METRICS.profiler is not None:
+        DEFAULT_METRICS.profiler.stop()
+        DEFAULT_METRICS.profiler = None
+    if not mode:
+        return None
+
+    profiler = StageProfiler(mode, output_dir=output_dir, top_n=top_n)
+    profiler.start()
+    DEFAULT_METRICS.profiler = profiler
+    return profiler
+
+
+def _accumulate(target: Dict, diffs: Dict):
+    """把 {代码位置: (字节, 次数)} 累加到 target"""
+    for traceback, (size, count) in diffs.items():
+        entry = target.setdefault(traceback, [0, 0])
+        entry[0] += size
+        entry[1] += count
+
+
+def _safe_name(name: str) -> str:
+    """阶段名称转为文件名"""
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+def _format_size(size: int) -> str:
+    """字节数转为可读格式（保留正负号）"""
+    if abs(size) < 1024:
+        return f"{size} B"
+    value = size / 1024
+    for unit in ("KiB", "MiB"):
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
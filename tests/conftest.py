@@ -0,0 +1,7 @@
+"""测试公共配置"""
+
+import os
+import sys
+
+# 与 scripts/ 下的脚本一致：把项目根目录加入导入路径（直接运行 pytest 时也能导入 src）
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
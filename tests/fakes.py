@@ -0,0 +1,62 @@
+"""测试用的LLM提供商"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.llm import BaseLLMProvider, LLMResponse, Message
+
+
+class FakeProvider(BaseLLMProvider):
+    """按顺序返回预设响应（或抛出预设异常）的提供商"""
+
+    def __init__(self, responses=None, delay: float = 0.0, api_key: str = "test-key", **kwargs):
+        """
+        Args:
+            responses: 依次返回的 LLMResponse 或异常（用完后重复最后一个）
+            delay: 每次调用前等待的秒数（有截止时间时可被取消）
+            api_key: API密钥
+        """
+        super().__init__(api_key, **kwargs)
+        self.responses = list(responses or [self.response()])
+        self.delay = delay
+        self.calls: List[Dict] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def response(content: str = '{"questions": []}', completion_tokens: int = 10,
+                 finish_reason: str = "stop", shared: bool = False) -> LLMResponse:
+        """构造一个响应"""
+        return LLMResponse(
+            content=content,
+            model="fake-model",
+            usage={"prompt_tokens": 100, "completion_tokens": completion_tokens,
+                   "total_tokens": 100 + completion_tokens},
+            finish_reason=finish_reason,
+            shared=shared
+        )
+
+    def chat(self, messages: List[Message], model: Optional[str] = None, temperature: float = 0.7,
+             max_tokens: int = 2048, **kwargs) -> LLMResponse:
+        deadline = kwargs.get("deadline")
+        with self._lock:
+            self.calls.append({"model": model, "max_tokens": max_tokens})
+            index = min(len(self.calls), len(self.responses)) - 1
+        if self.delay:
+            if deadline is not None:
+                deadline.sleep(self.delay)
+            else:
+                time.sleep(self.delay)
+        result = self.responses[index]
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def supports_vision(self) -> bool:
+        return True
+
+    def get_default_model(self) -> str:
+        return "fake-model"
+
+    def estimate_cost(self, usage: Dict[str, int], model: Optional[str] = None) -> float:
+        return usage.get("prompt_tokens", 0) / 1_000_000 + usage.get("completion_tokens", 0) / 1_000_000
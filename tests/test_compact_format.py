@@ -0,0 +1,41 @@
+"""紧凑输出格式解析测试"""
+
+import json
+
+from src.extractors import QuestionExtractor
+from tests.fakes import FakeProvider
+
+
+def make_extractor():
+    return QuestionExtractor(response_format="compact", llm=FakeProvider())
+
+
+COMPACT_QUESTION = {
+    "t": "1+1=?", "y": "s",
+    "o": [{"k": "A", "t": "1"}, {"k": "B", "t": "2", "c": 1}],
+    "a": "B",
+}
+
+
+def test_omitted_c_is_false_when_answer_given():
+    questions = make_extractor()._parse_response(json.dumps({"q": [COMPACT_QUESTION]}))
+    assert [opt["is_correct"] for opt in questions[0]["options"]] == [False, True]
+    assert questions[0]["question_type"] == "single_choice"
+
+
+def test_omitted_c_is_unknown_without_answer():
+    item = {"t": "题目", "y": "m", "o": [{"k": "A", "t": "甲"}, {"k": "B", "t": "乙"}]}
+    questions = make_extractor()._parse_response(json.dumps({"q": [item]}))
+    assert [opt["is_correct"] for opt in questions[0]["options"]] == [None, None]
+
+
+def test_bare_compact_list_is_decoded():
+    questions = make_extractor()._parse_response(json.dumps([COMPACT_QUESTION]))
+    assert questions[0]["question_text"] == "1+1=?"
+    assert questions[0]["correct_answer"] == "B"
+    assert questions[0]["options"][1]["is_correct"] is True
+
+
+def test_standard_list_is_unchanged():
+    item = {"question_text": "题目", "question_type": "single_choice", "options": []}
+    assert make_extractor()._parse_response(json.dumps([item])) == [item]
@@ -0,0 +1,76 @@
+"""自适应并发（AIMD）测试"""
+
+from src.llm import AIMDLimiter, AdaptiveConcurrencyProvider, Message, MessageRole
+from tests.fakes import FakeProvider
+from tests.test_llm_errors import FakeAPIError
+
+
+def complete(limiter, count, latency=1.0):
+    """完成 count 个成功请求"""
+    for _ in range(count):
+        limiter.release(limiter.acquire(), latency=latency)
+
+
+def test_additive_increase():
+    limiter = AIMDLimiter(initial=2, max_limit=4)
+    # 每个成功请求 +1/limit：2 -> 2.5 -> 2.9 -> 3.24
+    complete(limiter, 2)
+    assert limiter.limit == 2
+    complete(limiter, 1)
+    assert limiter.limit == 3
+    complete(limiter, 20)
+    assert limiter.limit == 4
+
+
+def test_one_decrease_per_batch_of_in_flight_requests():
+    limiter = AIMDLimiter(initial=8)
+    epochs = [limiter.acquire() for _ in range(4)]
+    for epoch in epochs:
+        limiter.release(epoch, throttled=True)
+    # 同一批在途请求被限流只下调一次
+    assert limiter.limit == 4
+    assert limiter.throttled == 4
+
+    limiter.release(limiter.acquire(), throttled=True)
+    assert limiter.limit == 2
+
+
+def test_latency_spike_decreases_limit():
+    limiter = AIMDLimiter(initial=8, latency_tolerance=2.0)
+    complete(limiter, AIMDLimiter.WARMUP_SAMPLES, latency=1.0)
+    before = limiter.limit
+    limiter.release(limiter.acquire(), latency=5.0)
+    assert limiter.limit < before
+    assert limiter.latency_spikes == 1
+
+
+def test_provider_retries_rate_limited_requests():
+    inner = FakeProvider([
+        FakeAPIError("Rate limit reached", 429, headers={"retry-after-ms": "10"}),
+        FakeProvider.response(),
+    ])
+    limiter = AIMDLimiter(initial=4)
+    provider = AdaptiveConcurrencyProvider(inner, limiter, backoff=0.01)
+
+    response = provider.chat([Message(role=MessageRole.USER, content="hi")])
+
+    assert response.content == FakeProvider.response().content
+    assert len(inner.calls) == 2
+    assert limiter.stats()["throttled"] == 1
+    assert limiter.in_flight == 0
+
+
+def test_limit_recovers_after_lasting_latency_shift():
+    limiter = AIMDLimiter(initial=8, max_limit=16)
+    complete(limiter, 20, latency=1.0)
+    before = limiter.limit
+
+    # 上游延迟持续变为原来的5倍：先下调，基线跟上后不再判为突增
+    complete(limiter, 10, latency=5.0)
+    lowered = limiter.limit
+    assert lowered < before
+    assert limiter.stats()["latency_baseline"] > 2.5
+
+    complete(limiter, 60, latency=5.0)
+    assert limiter.limit > lowered
+    assert limiter.limit >= before
@@ -0,0 +1,46 @@
+"""截止时间与取消测试"""
+
+import time
+
+import pytest
+
+from src.llm.deadline import Cancelled, Deadline, DeadlineExceeded
+
+
+def test_child_takes_earlier_deadline_and_its_scope():
+    document = Deadline(0.5, scope="document")
+    request = document.child(60)
+    assert request.remaining() <= 0.5
+    assert request.scope == "document"
+
+    request = Deadline(60, scope="document").child(0.5)
+    assert request.remaining() <= 0.5
+    assert request.scope == "request"
+
+
+def test_cancel_is_shared_with_children():
+    document = Deadline()
+    request = document.child(10)
+    document.cancel()
+    assert request.cancelled
+    with pytest.raises(Cancelled):
+        request.check()
+
+
+def test_sleep_stops_at_deadline():
+    deadline = Deadline(0.05, scope="request")
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded) as info:
+        deadline.sleep(5)
+    assert time.monotonic() - start < 1
+    assert info.value.scope == "request"
+
+
+def test_wrap_error_attributes_failures_to_deadline():
+    deadline = Deadline(10, scope="request")
+    assert deadline.wrap_error(ValueError("bad request")) is None
+    assert isinstance(deadline.wrap_error(TimeoutError("read timed out")), DeadlineExceeded)
+
+    deadline.cancel()
+    # SDK把请求钩子抛出的异常包装成连接错误时，按截止时间的状态归因
+    assert isinstance(deadline.wrap_error(ConnectionError("connection aborted")), Cancelled)
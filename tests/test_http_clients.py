@@ -0,0 +1,40 @@
+"""HTTP客户端注册表测试"""
+
+import pytest
+
+from src.llm.http_clients import HTTPClientRegistry
+
+httpx = pytest.importorskip("httpx")
+
+
+def test_clients_are_reused_per_endpoint_and_key():
+    registry = HTTPClientRegistry()
+    try:
+        first = registry.get("openai", None, "key-a", httpx.Client)
+        assert registry.get("openai", None, "key-a", httpx.Client) is first
+        assert registry.get("openai", None, "key-b", httpx.Client) is not first
+        assert registry.get("openai", "https://example.com/v1", "key-a", httpx.Client) is not first
+        assert registry.stats()["reused"] == 1
+    finally:
+        registry.close_all()
+
+
+def test_configure_retires_old_clients_and_close_all_closes_them():
+    registry = HTTPClientRegistry()
+    old = registry.get("openai", None, "key", httpx.Client)
+
+    registry.configure(read_timeout=5.0)
+    new = registry.get("openai", None, "key", httpx.Client)
+    assert new is not old
+    # 旧客户端可能仍被SDK实例持有，配置变化时不立即关闭
+    assert not old.is_closed
+    assert registry.stats()["retired"] == 1
+
+    # 相同配置不会替换客户端
+    registry.configure(read_timeout=5.0)
+    assert registry.get("openai", None, "key", httpx.Client) is new
+
+    registry.close_all()
+    assert old.is_closed
+    assert new.is_closed
+    assert registry.stats()["retired"] == 0
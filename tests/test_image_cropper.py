@@ -0,0 +1,65 @@
+"""图片裁剪（bbox修正与坐标换算）测试"""
+
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.utils.image_cropper import BBOX_ABSOLUTE, BBOX_PERMILLE, BBOX_UNIT, ImageCropper
+
+
+def page_with_figure(size=(2000, 1500), box=(400, 300, 800, 600)):
+    """白色页面上一个黑色矩形图形（灰度数组）"""
+    width, height = size
+    gray = np.full((height, width), 255, dtype=np.uint8)
+    x1, y1, x2, y2 = box
+    gray[y1:y2, x1:x2] = 0
+    return gray
+
+
+@pytest.fixture
+def cropper(tmp_path):
+    return ImageCropper(output_dir=str(tmp_path))
+
+
+def test_normalize_bbox_conventions():
+    size = (2000, 1000)
+    assert ImageCropper.normalize_bbox([0.1, 0.2, 0.3, 0.4], size, BBOX_UNIT) == [200, 200, 600, 400]
+    assert ImageCropper.normalize_bbox([100, 200, 300, 400], size, BBOX_PERMILLE) == [200, 200, 600, 400]
+    # 坐标顺序颠倒和越界时修正
+    assert ImageCropper.normalize_bbox([300, 400, -10, 5000], size, BBOX_ABSOLUTE) == [0, 400, 300, 1000]
+
+
+def test_detect_bbox_scale(cropper):
+    gray = page_with_figure()
+    size = (gray.shape[1], gray.shape[0])
+    assert cropper.detect_bbox_scale([[0.2, 0.2, 0.4, 0.4]], size, gray) == BBOX_UNIT
+    assert cropper.detect_bbox_scale([[400, 300, 800, 600]], size, gray) == BBOX_ABSOLUTE
+    # 按0-1000解释才落在图形上
+    assert cropper.detect_bbox_scale([[200, 200, 400, 400]], size, gray) == BBOX_PERMILLE
+    # 没有灰度图时按提示词要求的绝对坐标处理
+    assert cropper.detect_bbox_scale([[200, 200, 400, 400]], size) == BBOX_ABSOLUTE
+
+
+def test_refine_tightens_loose_bbox(cropper):
+    gray = page_with_figure()
+    items = [{"figure_bbox": [380, 280, 820, 640]}, {"figure_bbox": "invalid"}]
+    cropper.refine_bboxes(items, (gray.shape[1], gray.shape[0]), gray)
+    assert items[0]["figure_bbox"] == [400, 300, 800, 600]
+    assert items[1]["figure_bbox"] is None
+
+
+def test_map_tile_bboxes_shifts_to_page_coordinates(cropper):
+    tile = Image.fromarray(page_with_figure(size=(600, 400), box=(100, 50, 300, 200)))
+    buffer = io.BytesIO()
+    tile.save(buffer, format="PNG")
+    questions = [{"has_figure": True, "figure_bbox": [90, 40, 310, 210], "options": []}]
+
+    cropper.map_tile_bboxes(questions, buffer.getvalue(), (0, 700))
+
+    assert questions[0]["figure_bbox"] == [100, 750, 300, 900]
+
+
+def test_pixel_to_pdf_bbox():
+    assert ImageCropper.pixel_to_pdf_bbox([200, 400, 600, 800], 2.0) == pytest.approx([100, 200, 300, 400])
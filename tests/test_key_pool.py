@@ -0,0 +1,55 @@
+"""API密钥池测试"""
+
+import pytest
+
+from src.llm import KeyPoolProvider, Message, MessageRole
+from tests.fakes import FakeProvider
+from tests.test_llm_errors import FakeAPIError
+
+
+MESSAGES = [Message(role=MessageRole.USER, content="hi")]
+
+
+def test_requests_are_spread_across_keys():
+    providers = [FakeProvider(api_key=f"key-{index}") for index in range(3)]
+    pool = KeyPoolProvider(providers)
+    for _ in range(6):
+        pool.chat(MESSAGES)
+    assert [len(provider.calls) for provider in providers] == [2, 2, 2]
+
+
+def test_quota_error_quarantines_key_and_retries_on_another():
+    exhausted = FakeProvider([FakeAPIError("You exceeded your current quota", 429, code="insufficient_quota")],
+                             api_key="key-exhausted")
+    healthy = FakeProvider(api_key="key-healthy")
+    pool = KeyPoolProvider([exhausted, healthy])
+
+    for _ in range(3):
+        pool.chat(MESSAGES)
+
+    stats = {item["key"]: item for item in pool.stats()}
+    assert stats["...sted"]["quarantined"]
+    assert len(exhausted.calls) == 1
+    assert len(healthy.calls) == 3
+
+
+def test_rate_limited_key_cools_down():
+    limited = FakeProvider([FakeAPIError("Rate limit reached", 429, headers={"retry-after": "60"}),
+                            FakeProvider.response()], api_key="key-limited")
+    healthy = FakeProvider(api_key="key-healthy")
+    pool = KeyPoolProvider([limited, healthy])
+
+    for _ in range(3):
+        pool.chat(MESSAGES)
+
+    stats = {item["key"]: item for item in pool.stats()}
+    assert stats["...ited"]["rate_limited"] == 1
+    assert not stats["...ited"]["quarantined"]
+    # 冷却期内不再分配给被限流的密钥
+    assert len(limited.calls) == 1
+
+
+def test_all_keys_quarantined_raises():
+    pool = KeyPoolProvider([FakeProvider([FakeAPIError("payment required", 402)], api_key="key-a")])
+    with pytest.raises(RuntimeError):
+        pool.chat(MESSAGES)
@@ -0,0 +1,55 @@
+"""LLM错误分类测试"""
+
+import pytest
+
+from src.llm.errors import is_quota_error, is_rate_limit_error, retry_after
+
+
+class FakeAPIError(Exception):
+    """模拟SDK的API异常（status_code、code、body 与 openai/zhipuai 的异常属性一致）"""
+
+    def __init__(self, message, status_code=None, code=None, body=None, headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        if code is not None:
+            self.code = code
+        if body is not None:
+            self.body = body
+        self.response = type("FakeResponse", (), {"status_code": status_code, "headers": headers or {}})()
+
+
+@pytest.mark.parametrize("error", [
+    FakeAPIError("You exceeded your current quota, please check your plan and billing details.",
+                 429, code="insufficient_quota"),
+    FakeAPIError("Error code: 429", 429, body={"error": {"code": "1113", "message": "您的账户已欠费，请充值后重试"}}),
+    FakeAPIError("Your credit balance is too low to access the API.", 400),
+    FakeAPIError("payment required", 402),
+])
+def test_quota_errors(error):
+    assert is_quota_error(error)
+    assert not is_rate_limit_error(error)
+
+
+@pytest.mark.parametrize("error", [
+    FakeAPIError("Rate limit reached for gpt-4o", 429, code="rate_limit_exceeded"),
+    FakeAPIError("Allocated quota exceeded, please increase your quota limit.", 429,
+                 body={"code": "Throttling.AllocationQuota"}),
+    FakeAPIError("<400> Throttling.AllocationQuota: Allocated quota exceeded"),
+    FakeAPIError("quota", 429),
+    FakeAPIError("Error code: 429", 429, body={"error": {"code": "1302", "message": "您当前使用该API的并发数过高"}}),
+])
+def test_rate_limit_errors(error):
+    assert is_rate_limit_error(error)
+    assert not is_quota_error(error)
+
+
+def test_codes_are_matched_as_whole_tokens():
+    error = FakeAPIError("upstream request 81113a failed: billing service unavailable", 500)
+    assert not is_quota_error(error)
+    assert not is_rate_limit_error(error)
+
+
+def test_retry_after_headers():
+    assert retry_after(FakeAPIError("slow down", 429, headers={"retry-after-ms": "1500"})) == 1.5
+    assert retry_after(FakeAPIError("slow down", 429, headers={"retry-after": "3"})) == 3.0
+    assert retry_after(FakeAPIError("slow down", 429)) is None
@@ -0,0 +1,15 @@
+"""指标汇总测试"""
+
+from src.utils.metrics import METRIC_PREFIX, Metrics
+
+
+def test_prometheus_keeps_full_precision(tmp_path):
+    prom_path = tmp_path / "metrics.prom"
+    metrics = Metrics(prom_path=str(prom_path))
+    metrics.count("tokens", 1234567)
+    metrics.count("tokens", 1)
+    metrics.gauge("cost_usd", 0.1 + 0.2)
+    metrics.flush()
+    text = prom_path.read_text(encoding="utf-8")
+    assert f"{METRIC_PREFIX}_tokens_total 1234568.0\n" in text
+    assert f"{METRIC_PREFIX}_cost_usd 0.30000000000000004\n" in text
@@ -0,0 +1,36 @@
+"""模型路由测试"""
+
+from src.extractors import ModelRouter
+
+
+def make_router():
+    return ModelRouter("cheap", "strong", threshold=0.5)
+
+
+def test_plain_punctuation_is_not_formula():
+    router = make_router()
+    text = "考试时间 2024/06/07，满分100%，详见 http://exam.example.com/a_b?x=1+2。" * 5
+    score, reasons = router.score({"text": text})
+    assert score == 0
+    assert reasons == []
+
+
+def test_math_symbols_raise_score():
+    router = make_router()
+    score, reasons = router.score({"text": "已知∠A=30°，AB⊥CD，求√3×π的值。" * 5})
+    assert score > 0
+    assert reasons[0].startswith("公式符号")
+
+
+def test_expects_questions_from_markers():
+    router = make_router()
+    assert router.expects_questions({"question_marker_count": 2})
+    assert router.expects_questions({"option_count": 4})
+    assert router.expects_questions({"text": "1. 下列说法正确的是\nA. 甲 B. 乙"})
+
+
+def test_no_markers_means_no_expected_questions():
+    router = make_router()
+    assert not router.expects_questions({"text": "考生须知：请用黑色签字笔作答。", "question_count": None})
+    # 扫描件没有文本层，无从判断
+    assert not router.expects_questions({"vision": True, "text_chars": 0})
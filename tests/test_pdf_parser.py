@@ -0,0 +1,40 @@
+"""PDF页面分析测试"""
+
+import fitz
+
+from src.parsers import PDFParser
+from src.parsers.pdf_parser import RAW_FEATURE_KEYS
+
+
+def make_pdf(path):
+    """一页选择题，带一个矢量图形"""
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "1. Which figure is a triangle?\nA. one  B. two  C. three  D. four", fontsize=11)
+    page.draw_polyline([(100, 200), (200, 200), (150, 120), (100, 200)])
+    doc.save(str(path))
+    doc.close()
+
+
+def test_render_all_pages_parses_drawings_once(tmp_path, monkeypatch):
+    pdf_path = tmp_path / "exam.pdf"
+    make_pdf(pdf_path)
+    calls = []
+    get_drawings = fitz.Page.get_drawings
+
+    def counted_get_drawings(page, *args, **kwargs):
+        calls.append(page.number)
+        return get_drawings(page, *args, **kwargs)
+
+    monkeypatch.setattr(fitz.Page, "get_drawings", counted_get_drawings)
+
+    pages = PDFParser().render_all_pages(
+        str(pdf_path), in_memory=True, adaptive_dpi=True, locate_figures=True, page_features=True
+    )
+
+    assert calls == [0]
+    page = pages[0]
+    assert len(page["figure_regions"]) == 1
+    assert page["features"]["figure_count"] == 1
+    assert page["question_count"] == 1
+    assert not set(RAW_FEATURE_KEYS) & set(page["features"])
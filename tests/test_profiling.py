@@ -0,0 +1,24 @@
+"""按阶段内存分析测试"""
+
+import tracemalloc
+
+from src.utils.profiling import StageProfiler
+
+
+def test_mem_stages_report_exclusive_allocations(tmp_path):
+    profiler = StageProfiler("mem", output_dir=str(tmp_path))
+    profiler.start()
+    keep = []
+    try:
+        with profiler.stage("page"):
+            keep.append(bytearray(200_000))
+            with profiler.stage("render"):
+                keep.append(bytearray(1_000_000))
+    finally:
+        profiler.stop()
+
+    totals = {name: sum(size for size, _ in stage.values()) for name, stage in profiler._mem_stats.items()}
+    assert 900_000 < totals["render"] < 1_100_000
+    # 外层阶段不再重复计入 render 的分配
+    assert 100_000 < totals["page"] < 300_000
+    assert not tracemalloc.is_tracing()
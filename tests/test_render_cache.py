@@ -0,0 +1,30 @@
+"""页面渲染缓存测试"""
+
+import os
+import struct
+
+from src.parsers.render_cache import PNG_SIGNATURE, RenderCache
+
+
+def fake_png(width: int, height: int, size: int) -> bytes:
+    """只有文件头和IHDR尺寸的PNG（缓存只校验这部分）"""
+    header = PNG_SIGNATURE + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height)
+    return header + b"\0" * (size - len(header))
+
+
+def test_put_keeps_new_entry_when_older_mtime(tmp_path):
+    cache = RenderCache(str(tmp_path), max_bytes=150)
+    old = cache.put("old", fake_png(1, 1, 100))
+    # 旧文件的mtime晚于接下来写入的新文件（时钟回拨、粗精度文件系统等情况）
+    future = os.path.getmtime(old) + 3600
+    os.utime(old, (future, future))
+    cache.put("new", fake_png(2, 2, 100))
+    assert cache.get("new", (2, 2)) is not None
+    assert cache.get("old") is None
+
+
+def test_put_keeps_entry_larger_than_limit(tmp_path):
+    cache = RenderCache(str(tmp_path), max_bytes=50)
+    path = cache.put("big", fake_png(3, 3, 100))
+    assert path.exists()
+    assert cache.get_bytes("big", (3, 3)) is not None
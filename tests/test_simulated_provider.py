@@ -0,0 +1,25 @@
+"""基准测试模拟服务商测试"""
+
+from benchmarks.simulated_provider import SimulatedProvider
+from src.llm import Message, MessageRole
+
+
+MESSAGES = [Message(role=MessageRole.USER, content="提取题目")]
+
+
+def make_provider():
+    return SimulatedProvider(latency=0, jitter=0, tokens_per_second=0)
+
+
+def test_full_output_stops_normally():
+    response = make_provider().chat(MESSAGES, model="sim", max_tokens=100000)
+    assert response.finish_reason == "stop"
+    assert not response.truncated
+
+
+def test_output_clamped_to_max_tokens_is_truncated():
+    response = make_provider().chat(MESSAGES, model="sim", max_tokens=50)
+    assert response.finish_reason == "length"
+    assert response.truncated
+    assert response.usage["completion_tokens"] == 50
+    assert len(response.content) == 100
@@ -0,0 +1,117 @@
+"""请求合并（single-flight）测试"""
+
+import threading
+import time
+
+import pytest
+
+from src.llm import Message, MessageRole
+from src.llm.deadline import Deadline, DeadlineExceeded
+from src.llm.singleflight import SingleFlight, SingleFlightProvider, request_fingerprint
+from tests.fakes import FakeProvider
+
+
+MESSAGES = [Message(role=MessageRole.USER, content="提取题目", images=[b"\x89PNG fake page"])]
+
+
+def run_concurrently(*targets):
+    """同时启动多个线程并等待结束"""
+    threads = [threading.Thread(target=target) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+
+def test_fingerprint_hashes_image_content():
+    same_bytes = [Message(role=MessageRole.USER, content="提取题目", images=[b"\x89PNG fake page"])]
+    other_bytes = [Message(role=MessageRole.USER, content="提取题目", images=[b"\x89PNG other page"])]
+    assert request_fingerprint(MESSAGES, "m", 0.3, 100) == request_fingerprint(same_bytes, "m", 0.3, 100)
+    assert request_fingerprint(MESSAGES, "m", 0.3, 100) != request_fingerprint(other_bytes, "m", 0.3, 100)
+
+
+def test_followers_share_result_with_real_usage():
+    inner = FakeProvider([FakeProvider.response(completion_tokens=100, finish_reason="length")], delay=0.2)
+    provider = SingleFlightProvider(inner, SingleFlight())
+    responses = []
+
+    def call():
+        responses.append(provider.chat(MESSAGES, max_tokens=100))
+
+    run_concurrently(call, call, call)
+
+    assert len(inner.calls) == 1
+    assert sorted(r.shared for r in responses) == [False, True, True]
+    for response in responses:
+        # 共享的响应保留真实用量，调用方据此判断截断
+        assert response.usage["completion_tokens"] == 100
+        assert response.truncated
+    assert all(r.timings == {} for r in responses if r.shared)
+
+
+def test_extractor_retries_truncated_shared_response_without_cost():
+    from src.extractors import QuestionExtractor
+
+    inner = FakeProvider([
+        FakeProvider.response(completion_tokens=1000, finish_reason="length", shared=True),
+        FakeProvider.response(completion_tokens=1200),
+    ])
+    extractor = QuestionExtractor(llm=inner, request_timeout=5)
+
+    response = extractor._chat(MESSAGES, max_tokens=1000)
+
+    assert [call["max_tokens"] for call in inner.calls] == [1000, 2000]
+    assert response.usage["completion_tokens"] == 1200
+    # 共享的响应不计成本，只计入重试的那次调用
+    assert extractor.total_cost == pytest.approx(inner.estimate_cost(response.usage))
+
+
+def test_waiter_takes_over_when_leader_deadline_expires():
+    group = SingleFlight()
+    results = {}
+
+    def leader():
+        deadline = Deadline(0.1, scope="request")
+        try:
+            group.do("key", lambda: deadline.sleep(1.0), deadline=deadline)
+        except DeadlineExceeded as e:
+            results["leader"] = e
+
+    def follower():
+        time.sleep(0.02)
+        results["follower"] = group.do("key", lambda: "follower result", deadline=Deadline(5))
+
+    run_concurrently(leader, follower)
+
+    assert isinstance(results["leader"], DeadlineExceeded)
+    assert results["follower"] == "follower result"
+    assert group.executed == 2
+    assert group.takeovers == 1
+    assert group.shared == 0
+
+
+def test_other_errors_are_shared():
+    group = SingleFlight()
+    calls = []
+    errors = []
+
+    def failing():
+        calls.append(1)
+        time.sleep(0.1)
+        raise ValueError("bad request")
+
+    def call():
+        try:
+            group.do("key", failing, deadline=Deadline(5))
+        except ValueError as e:
+            errors.append(e)
+
+    def late_call():
+        time.sleep(0.02)
+        call()
+
+    run_concurrently(call, late_call)
+
+    assert len(calls) == 1
+    assert len(errors) == 2
+    assert group.shared == 1